@@ -0,0 +1,19 @@
+""" receivers of item_published signals for contentstore """
+from django.conf import settings
+from django.dispatch import receiver
+
+from xmodule.modulestore.django import SignalHandler
+
+
+@receiver(SignalHandler.item_published)
+def listen_for_item_publish(sender, usage_key, **kwargs):  # pylint: disable=unused-argument
+    """
+    Update the courseware search index for the published item outside of the publish request
+    """
+    if settings.FEATURES.get('ENABLE_COURSEWARE_INDEX', False):
+        # Import tasks here to avoid a circular import.
+        from .tasks import update_search_index
+
+        # Celery's delayed tasks can't take keys, so pass them as strings. Old mongo usage keys
+        # don't include the course run, so the course key is passed as well.
+        update_search_index.delay(unicode(usage_key.course_key), unicode(usage_key))
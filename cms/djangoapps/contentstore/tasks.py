@@ -3,16 +3,34 @@ This file contains celery tasks for contentstore views
 """
 
 from celery.task import task
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.exceptions import SuspiciousOperation
+from django.core.files.storage import default_storage
+from django.utils.translation import ugettext as _
 import json
 import logging
+import os
+import shutil
+import tarfile
+from path import path
+from tempfile import mkdtemp
+from xmodule.contentstore.django import contentstore
 from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.courseware_index import CoursewareSearchIndexer
+from xmodule.modulestore.xml_importer import ImportManager, import_course_from_xml, import_library_from_xml
+from xmodule.modulestore import COURSE_ROOT, LIBRARY_ROOT
 from xmodule.course_module import CourseFields
 
 from xmodule.modulestore.exceptions import DuplicateCourseError, ItemNotFoundError
-from course_action_state.models import CourseRerunState
+from course_action_state.models import CourseRerunState, CourseImportState
 from contentstore.utils import initialize_permissions
-from opaque_keys.edx.keys import CourseKey
+from openedx.core.lib.extract_tar import safetar_extractall
+from opaque_keys.edx.keys import CourseKey, UsageKey
+from opaque_keys.edx.locator import LibraryLocator
+
+
+LOGGER = logging.getLogger(__name__)
 
 
 @task()
@@ -66,3 +84,104 @@ def deserialize_fields(json_fields):
     for field_name, value in fields.iteritems():
         fields[field_name] = getattr(CourseFields, field_name).from_json(value)
     return fields
+
+
+@task()
+def update_search_index(course_id, usage_id):
+    """
+    Updates the courseware search index for an item and its children after they are published.
+    """
+    usage_key = UsageKey.from_string(usage_id).map_into_course(CourseKey.from_string(course_id))
+    # Only documents whose content changed since the last index are sent to the search engine
+    CoursewareSearchIndexer.do_publish_index(modulestore(), usage_key)
+
+
+@task()
+def import_olx(user_id, course_key_string, archive_key, archive_name):
+    """
+    Imports the uploaded course or library archive stored as `archive_key` in the default
+    storage in a new celery task.
+
+    Progress and errors are recorded in CourseImportState for the Studio import page to poll.
+    The stored archive, and the local copy it is extracted from, are removed once the import is over.
+    """
+    courselike_key = CourseKey.from_string(course_key_string)
+    if isinstance(courselike_key, LibraryLocator):
+        root_name = LIBRARY_ROOT
+        import_func = import_library_from_xml
+    else:
+        root_name = COURSE_ROOT
+        import_func = import_course_from_xml
+
+    data_root = path(settings.GITHUB_REPO_ROOT)
+    course_dir = path(mkdtemp(dir=data_root))
+    archive_path = course_dir / archive_name
+    states = CourseImportState.objects.State
+
+    try:
+        CourseImportState.objects.progressed(courselike_key, states.EXTRACTING)
+        source = default_storage.open(archive_key, 'rb')
+        try:
+            with open(archive_path, 'wb') as archive:
+                shutil.copyfileobj(source, archive)
+        finally:
+            source.close()
+        tar_file = tarfile.open(archive_path)
+        try:
+            safetar_extractall(tar_file, (course_dir + '/').encode('utf-8'))
+        except SuspiciousOperation as exc:
+            CourseImportState.objects.failed(
+                courselike_key, u'{0} {1}'.format(_('Unsafe tar file. Aborting import.'), exc.args[0])
+            )
+            return "unsafe tar file"
+        finally:
+            tar_file.close()
+        LOGGER.info("Course import %s: Uploaded file %s extracted", courselike_key, archive_name)
+
+        # find the root file of the package
+        CourseImportState.objects.progressed(courselike_key, states.VERIFYING)
+        dirpath = None
+        for candidate, _dirnames, filenames in os.walk(course_dir):
+            if root_name in filenames:
+                dirpath = candidate
+                break
+        if not dirpath:
+            CourseImportState.objects.failed(
+                courselike_key, _('Could not find the {0} file in the package.').format(root_name)
+            )
+            return "missing " + root_name
+
+        dirpath = os.path.relpath(dirpath, data_root)
+        LOGGER.debug('found %s at %s', root_name, dirpath)
+        LOGGER.info("Course import %s: Extracted file verified", courselike_key)
+
+        stage_states = {
+            ImportManager.STAGE_STATIC_ASSETS: states.IMPORTING_STATIC_ASSETS,
+            ImportManager.STAGE_MODULES: states.IMPORTING_MODULES,
+            ImportManager.STAGE_DRAFTS: states.IMPORTING_DRAFTS,
+        }
+        import_func(
+            modulestore(), user_id,
+            data_root, [dirpath],
+            load_error_modules=False,
+            static_content_store=contentstore(),
+            target_id=courselike_key,
+            progress_callback=lambda stage: CourseImportState.objects.progressed(courselike_key, stage_states[stage]),
+        )
+
+        # The search index is brought up to date by the course_published signal the import sends.
+        CourseImportState.objects.succeeded(courselike_key)
+        LOGGER.info("Course import %s: Course import successful", courselike_key)
+        return "succeeded"
+
+    # catch all exceptions so we can update the state and report the error to the user.
+    except Exception as exc:  # pylint: disable=broad-except
+        LOGGER.exception(u'Course Import Error')
+        CourseImportState.objects.failed(courselike_key, unicode(exc))
+        return "exception: " + unicode(exc)
+
+    finally:
+        default_storage.delete(archive_key)
+        if course_dir.isdir():
+            shutil.rmtree(course_dir)
+            LOGGER.info("Course import %s: Temp data cleared", courselike_key)
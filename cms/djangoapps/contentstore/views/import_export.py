@@ -13,9 +13,12 @@ from tempfile import mkdtemp
 
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.exceptions import SuspiciousOperation, PermissionDenied
+from django.core.exceptions import PermissionDenied
+from django.core.files import File
+from django.core.files.storage import default_storage
 from django.core.files.temp import NamedTemporaryFile
 from django.core.servers.basehttp import FileWrapper
+from django.db import transaction
 from django.http import HttpResponse, HttpResponseNotFound
 from django.utils.translation import ugettext as _
 from django.views.decorators.http import require_http_methods, require_GET
@@ -27,16 +30,16 @@ from xmodule.exceptions import SerializationError
 from xmodule.modulestore.django import modulestore
 from opaque_keys.edx.keys import CourseKey
 from opaque_keys.edx.locator import LibraryLocator
-from xmodule.modulestore.xml_importer import import_course_from_xml, import_library_from_xml
 from xmodule.modulestore.xml_exporter import export_course_to_xml, export_library_to_xml
-from xmodule.modulestore import COURSE_ROOT, LIBRARY_ROOT
 
 from student.auth import has_course_author_access
 
-from openedx.core.lib.extract_tar import safetar_extractall
+from course_action_state.managers import CourseActionStateItemNotFoundError
+from course_action_state.models import CourseImportState
 from util.json_request import JsonResponse
 from util.views import ensure_valid_course_key
 
+from contentstore.tasks import import_olx
 from contentstore.utils import reverse_course_url, reverse_usage_url, reverse_library_url
 
 
@@ -71,23 +74,17 @@ def import_handler(request, course_key_string):
     courselike_key = CourseKey.from_string(course_key_string)
     library = isinstance(courselike_key, LibraryLocator)
     if library:
-        root_name = LIBRARY_ROOT
         successful_url = reverse_library_url('library_handler', courselike_key)
         context_name = 'context_library'
         courselike_module = modulestore().get_library(courselike_key)
-        import_func = import_library_from_xml
     else:
-        root_name = COURSE_ROOT
         successful_url = reverse_course_url('course_handler', courselike_key)
         context_name = 'context_course'
         courselike_module = modulestore().get_course(courselike_key)
-        import_func = import_course_from_xml
-    return _import_handler(
-        request, courselike_key, root_name, successful_url, context_name, courselike_module, import_func
-    )
+    return _import_handler(request, courselike_key, successful_url, context_name, courselike_module)
 
 
-def _import_handler(request, courselike_key, root_name, successful_url, context_name, courselike_module, import_func):
+def _import_handler(request, courselike_key, successful_url, context_name, courselike_module):
     """
     Parameterized function containing the meat of import_handler.
     """
@@ -105,12 +102,21 @@ def _import_handler(request, courselike_key, root_name, successful_url, context_
                 course_dir = data_root / subdir
                 filename = request.FILES['course-data'].name
 
-                # Use sessions to keep info about import progress
-                session_status = request.session.setdefault("import_status", {})
-                courselike_string = unicode(courselike_key) + filename
-                _save_request_status(request, courselike_string, 0)
+                # Get upload chunks byte ranges
+                try:
+                    matches = CONTENT_RE.search(request.META["HTTP_CONTENT_RANGE"])
+                    content_range = matches.groupdict()
+                except KeyError:    # Single chunk
+                    # no Content-Range header, so make one that will work
+                    content_range = {'start': 0, 'stop': 1, 'end': 2}
+
+                if int(content_range['start']) == 0:
+                    # Keep info about import progress where the import task can update it. This is
+                    # committed right away, since the task may update it before the request is over.
+                    with transaction.commit_on_success():
+                        CourseImportState.objects.initiated(courselike_key, request.user, filename)
                 if not filename.endswith('.tar.gz'):
-                    _save_request_status(request, courselike_string, -1)
+                    CourseImportState.objects.failed(courselike_key, _('We only support uploading a .tar.gz file.'))
                     return JsonResponse(
                         {
                             'ErrMsg': _('We only support uploading a .tar.gz file.'),
@@ -120,19 +126,18 @@ def _import_handler(request, courselike_key, root_name, successful_url, context_
                     )
 
                 temp_filepath = course_dir / filename
+                if int(content_range['start']) != 0 and not temp_filepath.exists():
+                    # The last request sometimes comes twice. This happens because nginx
+                    # sends a 499 error code when the response takes too long. The upload
+                    # is over and its archive handed to the import task, so leave the
+                    # import state alone and report it.
+                    return _import_status_response(courselike_key, filename)
+
                 if not course_dir.isdir():
                     os.mkdir(course_dir)
 
                 logging.debug('importing course to {0}'.format(temp_filepath))
 
-                # Get upload chunks byte ranges
-                try:
-                    matches = CONTENT_RE.search(request.META["HTTP_CONTENT_RANGE"])
-                    content_range = matches.groupdict()
-                except KeyError:    # Single chunk
-                    # no Content-Range header, so make one that will work
-                    content_range = {'start': 0, 'stop': 1, 'end': 2}
-
                 # stream out the uploaded files in chunks to disk
                 if int(content_range['start']) == 0:
                     mode = "wb+"
@@ -143,7 +148,7 @@ def _import_handler(request, courselike_key, root_name, successful_url, context_
                     # This shouldn't happen, even if different instances are handling
                     # the same session, but it's always better to catch errors earlier.
                     if size < int(content_range['start']):
-                        _save_request_status(request, courselike_string, -1)
+                        CourseImportState.objects.failed(courselike_key, _('File upload corrupted. Please try again'))
                         log.warning(
                             "Reported range %s does not match size downloaded so far %s",
                             content_range['start'],
@@ -179,122 +184,38 @@ def _import_handler(request, courselike_key, root_name, successful_url, context_
                             "thumbnailUrl": ""
                         }]
                     })
-            # Send errors to client with stage at which error occurred.
-            except Exception as exception:  # pylint: disable=broad-except
-                _save_request_status(request, courselike_string, -1)
-                if course_dir.isdir():
-                    shutil.rmtree(course_dir)
-                    log.info("Course import %s: Temp data cleared", courselike_key)
-
-                log.exception(
-                    "error importing course"
-                )
-                return JsonResponse(
-                    {
-                        'ErrMsg': str(exception),
-                        'Stage': -1
-                    },
-                    status=400
-                )
 
-            # try-finally block for proper clean up after receiving last chunk.
-            try:
                 # This was the last chunk.
                 log.info("Course import %s: Upload complete", courselike_key)
-                _save_request_status(request, courselike_string, 1)
-
-                tar_file = tarfile.open(temp_filepath)
-                try:
-                    safetar_extractall(tar_file, (course_dir + '/').encode('utf-8'))
-                except SuspiciousOperation as exc:
-                    _save_request_status(request, courselike_string, -1)
-                    return JsonResponse(
-                        {
-                            'ErrMsg': 'Unsafe tar file. Aborting import.',
-                            'SuspiciousFileOperationMsg': exc.args[0],
-                            'Stage': -1
-                        },
-                        status=400
-                    )
-                finally:
-                    tar_file.close()
-
-                log.info("Course import %s: Uploaded file extracted", courselike_key)
-                _save_request_status(request, courselike_string, 2)
-
-                # find the 'course.xml' file
-                def get_all_files(directory):
-                    """
-                    For each file in the directory, yield a 2-tuple of (file-name,
-                    directory-path)
-                    """
-                    for dirpath, _dirnames, filenames in os.walk(directory):
-                        for filename in filenames:
-                            yield (filename, dirpath)
-
-                def get_dir_for_fname(directory, filename):
-                    """
-                    Returns the dirpath for the first file found in the directory
-                    with the given name.  If there is no file in the directory with
-                    the specified name, return None.
-                    """
-                    for fname, dirpath in get_all_files(directory):
-                        if fname == filename:
-                            return dirpath
-                    return None
-
-                dirpath = get_dir_for_fname(course_dir, root_name)
-                if not dirpath:
-                    _save_request_status(request, courselike_string, -2)
-                    return JsonResponse(
-                        {
-                            'ErrMsg': _('Could not find the {0} file in the package.').format(root_name),
-                            'Stage': -2
-                        },
-                        status=415
+                # The import task may run on another host, so it gets the archive from shared storage.
+                with open(temp_filepath, 'rb') as archive:
+                    archive_key = default_storage.save(
+                        u'olx_import/{0}/{1}'.format(subdir, filename), File(archive)
                     )
+                shutil.rmtree(course_dir)
 
-                dirpath = os.path.relpath(dirpath, data_root)
-                logging.debug('found %s at %s', root_name, dirpath)
-
-                log.info("Course import %s: Extracted file verified", courselike_key)
-                _save_request_status(request, courselike_string, 3)
-
-                courselike_items = import_func(
-                    modulestore(), request.user.id,
-                    settings.GITHUB_REPO_ROOT, [dirpath],
-                    load_error_modules=False,
-                    static_content_store=contentstore(),
-                    target_id=courselike_key
-                )
-
-                new_location = courselike_items[0].location
-                logging.debug('new course at %s', new_location)
-
-                log.info("Course import %s: Course import successful", courselike_key)
-                _save_request_status(request, courselike_string, 4)
+                # Extracting, verifying and importing the package happens in the import task, which
+                # deletes the stored archive when it is done. The import page polls import_status_handler.
+                import_olx.delay(request.user.id, unicode(courselike_key), archive_key, filename)
 
             # Send errors to client with stage at which error occurred.
-            except Exception as exception:   # pylint: disable=broad-except
+            except Exception as exception:  # pylint: disable=broad-except
+                CourseImportState.objects.failed(courselike_key, str(exception))
+                if course_dir.isdir():
+                    shutil.rmtree(course_dir)
+                    log.info("Course import %s: Temp data cleared", courselike_key)
+
                 log.exception(
                     "error importing course"
                 )
                 return JsonResponse(
                     {
                         'ErrMsg': str(exception),
-                        'Stage': -session_status[courselike_string]
+                        'Stage': -1
                     },
                     status=400
                 )
 
-            finally:
-                if course_dir.isdir():
-                    shutil.rmtree(course_dir)
-                    log.info("Course import %s: Temp data cleared", courselike_key)
-                # set failed stage number with negative sign in case of unsuccessful import
-                if session_status[courselike_string] != 4:
-                    _save_request_status(request, courselike_string, -abs(session_status[courselike_string]))
-
             return JsonResponse({'Status': 'OK'})
     elif request.method == 'GET':  # assume html
         status_url = reverse_course_url(
@@ -310,18 +231,6 @@ def _import_handler(request, courselike_key, root_name, successful_url, context_
         return HttpResponseNotFound()
 
 
-def _save_request_status(request, key, status):
-    """
-    Save import status for a course in request session
-    """
-    session_status = request.session.get('import_status')
-    if session_status is None:
-        session_status = request.session.setdefault("import_status", {})
-
-    session_status[key] = status
-    request.session.save()
-
-
 # pylint: disable=unused-argument
 @require_GET
 @ensure_csrf_cookie
@@ -338,18 +247,25 @@ def import_status_handler(request, course_key_string, filename=None):
         3 : Importing to mongo
         4 : Import successful
 
+    along with the message of the error, if the import failed.
     """
     course_key = CourseKey.from_string(course_key_string)
     if not has_course_author_access(request.user, course_key):
         raise PermissionDenied()
 
+    return _import_status_response(course_key, filename)
+
+
+def _import_status_response(course_key, filename):
+    """
+    Return the JsonResponse reporting the status of the import of `filename` into `course_key`.
+    """
     try:
-        session_status = request.session["import_status"]
-        status = session_status[course_key_string + filename]
-    except KeyError:
-        status = 0
+        state = CourseImportState.objects.find_first(course_key=course_key, filename=filename)
+    except CourseActionStateItemNotFoundError:
+        return JsonResponse({"ImportStatus": 0})
 
-    return JsonResponse({"ImportStatus": status})
+    return JsonResponse({"ImportStatus": state.stage, "Message": state.message})
 
 
 def create_export_tarball(course_module, course_key, context):
@@ -363,14 +279,14 @@ def create_export_tarball(course_module, course_key, context):
     root_dir = path(mkdtemp())
 
     try:
-        if isinstance(course_key, LibraryLocator):
-            export_library_to_xml(modulestore(), contentstore(), course_key, root_dir, name)
-        else:
-            export_course_to_xml(modulestore(), contentstore(), course_module.id, root_dir, name)
-
         logging.debug(u'tar file being generated at %s', export_file.name)
+        # The course assets go straight from the contentstore into the tarball; only the
+        # xml is written to root_dir on its way in.
         with tarfile.open(name=export_file.name, mode='w:gz') as tar_file:
-            tar_file.add(root_dir / name, arcname=name)
+            if isinstance(course_key, LibraryLocator):
+                export_library_to_xml(modulestore(), contentstore(), course_key, root_dir, name, tar_file)
+            else:
+                export_course_to_xml(modulestore(), contentstore(), course_module.id, root_dir, name, tar_file)
 
     except SerializationError as exc:
         log.exception(u'There was an error exporting %s', course_key)
@@ -15,7 +15,7 @@ from contentstore.views.item import create_xblock_info, VisibilityState
 from course_action_state.models import CourseRerunState
 from util.date_utils import get_default_time_display
 from xmodule.modulestore import ModuleStoreEnum
-from xmodule.modulestore.courseware_index import CoursewareSearchIndexer
+from xmodule.modulestore.courseware_index import CoursewareSearchIndexer, DOCUMENT_TYPE, INDEX_NAME
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory, LibraryFactory
@@ -27,6 +27,7 @@ from django.conf import settings
 from django.core.exceptions import PermissionDenied
 from django.utils.translation import ugettext as _
 from search.api import perform_search
+from search.search_engine_base import SearchEngine
 import pytz
 
 
@@ -588,6 +589,53 @@ class TestCourseReIndex(CourseTestCase):
             course_id=unicode(self.course.id))
         self.assertEqual(response['total'], 1)
 
+    def test_publish_indexes_changed_content(self):
+        """
+        Test publishing updates the index, sending only documents that changed
+        """
+        CoursewareSearchIndexer.do_course_reindex(modulestore(), self.course.id)
+        self.assertEqual(CoursewareSearchIndexer.do_publish_index(modulestore(), self.course.id), 0)
+        self.assertEqual(CoursewareSearchIndexer.do_publish_index(modulestore(), self.vertical.location), 0)
+
+        self.html.data = "<div>This is my revised HTML content</div>"
+        modulestore().update_item(self.html, self.user.id)
+        modulestore().publish(self.html.location, self.user.id)
+
+        response = perform_search(
+            "revised",
+            user=self.user,
+            size=10,
+            from_=0,
+            course_id=unicode(self.course.id))
+        self.assertEqual(response['total'], 1)
+        self.assertEqual(CoursewareSearchIndexer.do_publish_index(modulestore(), self.course.id), 0)
+
+    def test_publish_removes_missing_content(self):
+        """
+        Test indexing a published item removes the documents indexed within it which
+        it no longer contains, and leaves the rest of the course alone
+        """
+        CoursewareSearchIndexer.do_course_reindex(modulestore(), self.course.id)
+        searcher = SearchEngine.get_search_engine(INDEX_NAME)
+        # pylint: disable=protected-access
+        indexed_documents = CoursewareSearchIndexer._indexed_documents(searcher, self.course.id)
+        html_document = indexed_documents[unicode(self.html.location)]
+        vertical_id = html_document['ancestors'][-1]
+        searcher.index(DOCUMENT_TYPE, [
+            dict(html_document, id='removed_html'),
+            dict(html_document, id='other_html', ancestors=html_document['ancestors'][:-1]),
+        ])
+
+        CoursewareSearchIndexer.do_publish_index(modulestore(), self.vertical.location)
+        indexed_documents = CoursewareSearchIndexer._indexed_documents(searcher, self.course.id)
+        self.assertNotIn('removed_html', indexed_documents)
+        self.assertIn('other_html', indexed_documents)
+        self.assertIn(unicode(self.html.location), indexed_documents)
+        self.assertEqual(vertical_id, unicode(self.vertical.location))
+
+        CoursewareSearchIndexer.do_course_reindex(modulestore(), self.course.id)
+        self.assertNotIn('other_html', CoursewareSearchIndexer._indexed_documents(searcher, self.course.id))
+
     @mock.patch('xmodule.video_module.VideoDescriptor.index_dictionary')
     def test_indexing_video_error_responses(self, mock_index_dictionary):
         """
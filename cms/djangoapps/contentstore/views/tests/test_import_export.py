@@ -12,8 +12,10 @@ import tempfile
 from path import path
 from uuid import uuid4
 
+from django.core.files.storage import default_storage
 from django.test.utils import override_settings
 from django.conf import settings
+from mock import patch
 from xmodule.contentstore.django import contentstore
 from xmodule.modulestore.xml_exporter import export_library_to_xml
 from xmodule.modulestore.xml_importer import import_library_from_xml
@@ -22,6 +24,7 @@ from contentstore.utils import reverse_course_url
 
 from xmodule.modulestore.tests.factories import ItemFactory, LibraryFactory
 
+from contentstore.tasks import import_olx
 from contentstore.tests.utils import CourseTestCase
 from openedx.core.lib.extract_tar import safetar_extractall
 from student import auth
@@ -87,7 +90,7 @@ class ImportTestCase(CourseTestCase):
                     "name": self.bad_tar,
                     "course-data": [btar]
                 })
-        self.assertEquals(resp.status_code, 415)
+        self.assertEquals(resp.status_code, 200)
         # Check that `import_status` returns the appropriate stage (i.e., the
         # stage at which import failed).
         resp_status = self.client.get(
@@ -98,7 +101,9 @@ class ImportTestCase(CourseTestCase):
             )
         )
 
-        self.assertEquals(json.loads(resp_status.content)["ImportStatus"], -2)
+        import_status = json.loads(resp_status.content)
+        self.assertEquals(import_status["ImportStatus"], -2)
+        self.assertIn("Could not find the course.xml file", import_status["Message"])
 
     def test_with_coursexml(self):
         """
@@ -110,6 +115,57 @@ class ImportTestCase(CourseTestCase):
             resp = self.client.post(self.url, args)
 
         self.assertEquals(resp.status_code, 200)
+        resp_status = self.client.get(
+            reverse_course_url(
+                'import_status_handler',
+                self.course.id,
+                kwargs={'filename': os.path.split(self.good_tar)[1]}
+            )
+        )
+        self.assertEquals(json.loads(resp_status.content)["ImportStatus"], 4)
+
+    def test_archive_passed_through_storage(self):
+        """
+        Check that the import task gets the archive from the default storage,
+        and deletes it from there once the import is over.
+        """
+        with patch('contentstore.views.import_export.import_olx.delay') as mock_delay:
+            with open(self.good_tar) as gtar:
+                self.client.post(self.url, {"name": self.good_tar, "course-data": [gtar]})
+
+        __, course_key_string, archive_key, archive_name = mock_delay.call_args[0]
+        self.assertEquals(archive_name, "good.tar.gz")
+        self.assertTrue(default_storage.exists(archive_key))
+
+        import_olx(self.user.id, course_key_string, archive_key, archive_name)
+        self.assertFalse(default_storage.exists(archive_key))
+
+    def test_repeated_last_chunk(self):
+        """
+        Check that the last chunk of an upload coming twice leaves the status
+        of the finished import alone.
+        """
+        size = os.path.getsize(self.good_tar)
+        with open(self.good_tar) as gtar:
+            self.client.post(self.url, {"name": self.good_tar, "course-data": [gtar]})
+        with open(self.good_tar) as gtar:
+            gtar.seek(size // 2)
+            resp = self.client.post(
+                self.url,
+                {"name": self.good_tar, "course-data": [gtar]},
+                HTTP_CONTENT_RANGE="bytes {0}-{1}/{2}".format(size // 2, size - 1, size)
+            )
+
+        self.assertEquals(resp.status_code, 200)
+        self.assertEquals(json.loads(resp.content)["ImportStatus"], 4)
+        resp_status = self.client.get(
+            reverse_course_url(
+                'import_status_handler',
+                self.course.id,
+                kwargs={'filename': os.path.split(self.good_tar)[1]}
+            )
+        )
+        self.assertEquals(json.loads(resp_status.content)["ImportStatus"], 4)
 
     def test_import_in_existing_course(self):
         """
@@ -218,7 +274,7 @@ class ImportTestCase(CourseTestCase):
         outside or directly in the working directory,
             'special files' (character device, block device or FIFOs),
 
-        all raise exceptions/400s.
+        all fail the import at the unpacking stage.
         """
 
         def try_tar(tarpath):
@@ -226,8 +282,18 @@ class ImportTestCase(CourseTestCase):
             with open(tarpath) as tar:
                 args = {"name": tarpath, "course-data": [tar]}
                 resp = self.client.post(self.url, args)
-            self.assertEquals(resp.status_code, 400)
-            self.assertTrue("SuspiciousFileOperation" in resp.content)
+            self.assertEquals(resp.status_code, 200)
+            # The import task records the stage at which it stopped and why
+            resp_status = self.client.get(
+                reverse_course_url(
+                    'import_status_handler',
+                    self.course.id,
+                    kwargs={'filename': os.path.split(tarpath)[1]}
+                )
+            )
+            import_status = json.loads(resp_status.content)
+            self.assertEquals(import_status["ImportStatus"], -1)
+            self.assertIn("Unsafe tar file", import_status["Message"])
 
         try_tar(self._fifo_tar())
         try_tar(self._symlink_tar())
@@ -246,6 +246,11 @@ TEMPLATE_LOADERS = (
     'django.template.loaders.app_directories.Loader',
 )
 
+# Assets too large to keep in memcached can be cached on local disk by the
+# StaticContentServer middleware instead, e.g.
+#   {'ROOT_PATH': '/tmp/edx-asset-cache', 'MAX_SIZE': 1024 * 1024 * 1024}
+STATIC_CONTENT_DISK_CACHE = None
+
 MIDDLEWARE_CLASSES = (
     'request_cache.middleware.RequestCache',
     'django.middleware.cache.UpdateCacheMiddleware',
@@ -730,6 +735,7 @@ INSTALLED_APPS = (
     'edx_jsme',    # Molecular Structure
 
     'openedx.core.djangoapps.content.course_structures',
+    'openedx.core.djangoapps.content.course_overviews',
 )
 
 
@@ -60,12 +60,10 @@ define([
                                 else {
                                     alert(gettext('Your import has failed.') + '\n\n' + errMsg);
                                 }
+                                Import.stopGetStatus = true;
                                 chooseBtn.html(gettext('Choose new file')).show();
                                 bar.hide();
                             }
-                            Import.stopGetStatus = true;
-                            chooseBtn.html(gettext('Choose new file')).show();
-                            bar.hide();
                         });
                     });
                 } else {
@@ -87,11 +85,6 @@ define([
                 }
                 if (percentInt >= doneAt) {
                     bar.hide();
-                    // Start feedback with delay so that current stage of import properly updates in session
-                    setTimeout(
-                        function () { Import.startServerFeedback(feedbackUrl.replace('fillerName', file.name));},
-                        3000
-                    );
                 } else {
                     bar.show();
                     fill.width(percentVal).html(percentVal);
@@ -100,7 +93,9 @@ define([
             done: function(event, data){
                 bar.hide();
                 window.onbeforeunload = null;
-                Import.displayFinishedImport();
+                // The upload is complete; the import itself carries on in the background on the server.
+                Import.okayToNavigateAway = true;
+                Import.startServerFeedback(feedbackUrl.replace('fillerName', file.name));
             },
             start: function(event) {
                 window.onbeforeunload = function() {
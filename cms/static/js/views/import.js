@@ -46,8 +46,9 @@ define(
          * @param {int} timeout Number of milliseconds to wait in between ajax calls
          *     for new updates.
          * @param {int} stage Starting stage.
+         * @param {string} message Error message reported by the server, if any.
          */
-        var getStatus = function (url, timeout, stage) {
+        var getStatus = function (url, timeout, stage, message) {
             var currentStage = stage || 0;
             if (currentStage > 1) { CourseImport.okayToNavigateAway = true; }
             if (CourseImport.stopGetStatus) { return ;}
@@ -58,7 +59,7 @@ define(
                 $('.view-import .choose-file-button').html(gettext("Choose new file")).show();
             } else if (currentStage < 0) {
                 // Failed
-                var errMsg = gettext("Error importing course");
+                var errMsg = message || gettext("Error importing course");
                 var failedStage = Math.abs(currentStage);
                 CourseImport.stageError(failedStage, errMsg);
                 $('.view-import .choose-file-button').html(gettext("Choose new file")).show();
@@ -71,7 +72,7 @@ define(
             $.getJSON(url,
                 function (data) {
                     setTimeout(function () {
-                        getStatus(url, time, data.ImportStatus);
+                        getStatus(url, time, data.ImportStatus, data.Message);
                     }, time);
                 }
             );
@@ -169,7 +170,7 @@ define(
                                 $('.view-import .choose-file-button').hide();
                                 var time = 1000;
                                 setTimeout(function () {
-                                    getStatus(url, time, data.ImportStatus);
+                                    getStatus(url, time, data.ImportStatus, data.Message);
                                 }, time);
                             }
                         }
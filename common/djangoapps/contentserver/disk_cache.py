@@ -0,0 +1,162 @@
+"""
+A local on-disk cache for static assets that are too large to keep in memcached.
+"""
+
+import errno
+import hashlib
+import logging
+import os
+import tempfile
+import time
+
+from xmodule.contentstore.content import StaticContentStream
+
+log = logging.getLogger(__name__)
+
+# Seconds after which a lock or temporary file left by a copy that never
+# finished is ignored, and removed by the next eviction
+FILL_LOCK_TIMEOUT = 15 * 60
+
+
+class AssetDiskCache(object):
+    """
+    Keeps copies of large assets in files under `root_path`, so that they
+    don't have to be read back out of GridFS on every request.
+
+    Files are named for the asset's location and last modified time, so an
+    asset that is replaced is never served from a stale copy. Once the
+    files take up more than `max_size` bytes, the least recently used ones
+    are removed.
+    """
+    def __init__(self, root_path, max_size):
+        self.root_path = root_path
+        self.max_size = max_size
+        if not os.path.isdir(self.root_path):
+            os.makedirs(self.root_path)
+
+    def _path(self, content):
+        """
+        Return the path of the cache file for `content`.
+        """
+        key = u"{}@{}".format(content.location, content.last_modified_at.isoformat())
+        return os.path.join(self.root_path, hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+    def get(self, content):
+        """
+        Return a StaticContentStream reading `content` from the cache, or
+        None if it isn't cached.
+        """
+        path = self._path(content)
+        try:
+            cached_file = open(path, 'rb')
+        except IOError:
+            return None
+
+        # Record the use, so that this file is evicted last
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+        return StaticContentStream(
+            content.location, content.name, content.content_type, cached_file,
+            last_modified_at=content.last_modified_at, thumbnail_location=content.thumbnail_location,
+            import_path=content.import_path, length=content.length, locked=content.locked,
+            content_digest=content.content_digest,
+        )
+
+    def fill(self, content):
+        """
+        Copy all of the data of `content` (a StaticContentStream) into the
+        cache. Return whether it was copied: it isn't if `content` is too large
+        to cache, or if another thread or process is already copying it.
+
+        The data is written to a temporary file, which only replaces the cache
+        file once all of it has been copied. While that happens, a lock file
+        keeps other callers from copying the same asset; one left behind by a
+        process that died is ignored after FILL_LOCK_TIMEOUT seconds.
+        """
+        if content.length > self.max_size:
+            return False
+
+        path = self._path(content)
+        lock_path = os.path.join(self.root_path, '.{}.lock'.format(os.path.basename(path)))
+        if not self._lock(lock_path):
+            return False
+        try:
+            temp_fd, temp_path = tempfile.mkstemp(dir=self.root_path, prefix='.')
+            try:
+                with os.fdopen(temp_fd, 'wb') as temp_file:
+                    for chunk in content.stream_data():
+                        temp_file.write(chunk)
+                os.rename(temp_path, path)
+            except Exception:
+                os.remove(temp_path)
+                raise
+        finally:
+            try:
+                os.remove(lock_path)
+            except OSError:
+                # Taken over and released by another caller
+                pass
+
+        self._evict()
+        return True
+
+    def _lock(self, lock_path):
+        """
+        Create the lock file `lock_path`, taking it over if it was abandoned.
+        Return False if someone else holds it.
+        """
+        try:
+            os.close(os.open(lock_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL))
+            return True
+        except OSError as error:
+            if error.errno != errno.EEXIST:
+                raise
+
+        try:
+            abandoned = time.time() - os.stat(lock_path).st_mtime > FILL_LOCK_TIMEOUT
+        except OSError:
+            # Released in the meantime; leave the asset to whoever comes next
+            return False
+        if abandoned:
+            # At worst, two callers that both take over the lock copy the asset twice
+            os.utime(lock_path, None)
+        return abandoned
+
+    def _evict(self):
+        """
+        Remove the least recently used files until the cache fits in max_size,
+        and the lock and temporary files of copies that never finished.
+        """
+        entries = []
+        total_size = 0
+        now = time.time()
+        for name in os.listdir(self.root_path):
+            try:
+                stat = os.stat(os.path.join(self.root_path, name))
+            except OSError:
+                # Removed by another process
+                continue
+            if name.startswith('.'):
+                # Lock and temporary files. A copy still going on keeps writing
+                # to its temporary file, and its lock is taken over after
+                # FILL_LOCK_TIMEOUT anyway.
+                if now - stat.st_mtime > FILL_LOCK_TIMEOUT:
+                    try:
+                        os.remove(os.path.join(self.root_path, name))
+                    except OSError:
+                        pass
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+            total_size += stat.st_size
+
+        for __, size, name in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(os.path.join(self.root_path, name))
+            except OSError:
+                log.warning("Could not remove cached asset file %s", name, exc_info=True)
+            total_size -= size
@@ -3,7 +3,9 @@ Middleware to serve assets.
 """
 
 import logging
+import threading
 
+from django.conf import settings
 from django.http import (
     HttpResponse, HttpResponseNotModified, HttpResponseForbidden
 )
@@ -15,6 +17,7 @@ from xmodule.modulestore import InvalidLocationError
 from opaque_keys import InvalidKeyError
 from opaque_keys.edx.locator import AssetLocator
 from cache_toolbox.core import get_cached_content, set_cached_content
+from contentserver.disk_cache import AssetDiskCache
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.exceptions import NotFoundError
 
@@ -23,6 +26,30 @@ from xmodule.exceptions import NotFoundError
 
 log = logging.getLogger(__name__)
 
+# Assets at least this large aren't kept in memcached
+MAX_CACHED_CONTENT_SIZE = 1048576
+
+# Most assets one process copies to the disk cache at the same time
+MAX_PENDING_DISK_CACHE_FILLS = 4
+
+_ASSET_DISK_CACHE = None
+
+# Locations of the assets this process is copying to the disk cache
+_PENDING_DISK_CACHE_FILLS = set()
+_PENDING_DISK_CACHE_FILLS_LOCK = threading.Lock()
+
+
+def get_asset_disk_cache():
+    """
+    Return the AssetDiskCache configured by settings.STATIC_CONTENT_DISK_CACHE,
+    or None if there isn't one.
+    """
+    global _ASSET_DISK_CACHE  # pylint: disable=global-statement
+    config = settings.STATIC_CONTENT_DISK_CACHE
+    if _ASSET_DISK_CACHE is None and config:
+        _ASSET_DISK_CACHE = AssetDiskCache(config['ROOT_PATH'], config['MAX_SIZE'])
+    return _ASSET_DISK_CACHE
+
 
 class StaticContentServer(object):
     def process_request(self, request):
@@ -39,6 +66,9 @@ class StaticContentServer(object):
                 response.status_code = 400
                 return response
 
+            # set if the asset is to be copied into the disk cache once we know it is served
+            disk_cache_to_fill = None
+
             # first look in our cache so we don't have to round-trip to the DB
             content = get_cached_content(loc)
             if content is None:
@@ -53,10 +83,18 @@ class StaticContentServer(object):
                 # since we fetched it from DB, let's cache it going forward, but only if it's < 1MB
                 # this is because I haven't been able to find a means to stream data out of memcached
                 if content.length is not None:
-                    if content.length < 1048576:
+                    if content.length < MAX_CACHED_CONTENT_SIZE:
                         # since we've queried as a stream, let's read in the stream into memory to set in cache
                         content = content.copy_to_in_mem()
                         set_cached_content(content)
+                    else:
+                        # larger assets can be kept on local disk instead
+                        disk_cache = get_asset_disk_cache()
+                        cached_content = disk_cache.get(content) if disk_cache is not None else None
+                        if cached_content is not None:
+                            content = cached_content
+                        elif disk_cache is not None and content.length <= disk_cache.max_size:
+                            disk_cache_to_fill = disk_cache
             else:
                 # NOP here, but we may wish to add a "cache-hit" counter in the future
                 pass
@@ -86,6 +124,19 @@ class StaticContentServer(object):
                 if if_modified_since == last_modified_at_str:
                     return HttpResponseNotModified()
 
+            # likewise if the client's copy has the same digest as the content
+            # (content cached before digests were recorded won't have one)
+            content_digest = getattr(content, 'content_digest', None)
+            etag = '"{}"'.format(content_digest) if content_digest else None
+            if etag is not None and request.META.get('HTTP_IF_NONE_MATCH') == etag:
+                return HttpResponseNotModified()
+
+            # The asset is served from the contentstore this time, and copied in
+            # the background so that neither this response nor a small range
+            # waits for the whole asset to be copied
+            if disk_cache_to_fill is not None:
+                self._fill_disk_cache_in_background(disk_cache_to_fill, loc)
+
             # *** File streaming within a byte range ***
             # If a Range is provided, parse Range attribute of the request
             # Add Content-Range in the response if Range is structurally correct
@@ -94,10 +145,6 @@ class StaticContentServer(object):
             # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.35
             response = None
             if request.META.get('HTTP_RANGE'):
-                # Data from cache (StaticContent) has no easy byte management, so we use the DB instead (StaticContentStream)
-                if type(content) == StaticContent:
-                    content = AssetManager.find(loc, as_stream=True)
-
                 header_value = request.META['HTTP_RANGE']
                 try:
                     unit, ranges = parse_range_header(header_value, content.length)
@@ -143,9 +190,49 @@ class StaticContentServer(object):
             response['Accept-Ranges'] = 'bytes'
             response['Content-Type'] = content.content_type
             response['Last-Modified'] = last_modified_at_str
+            if etag is not None:
+                response['ETag'] = etag
 
             return response
 
+    def _fill_disk_cache_in_background(self, disk_cache, location):
+        """
+        Start a thread that copies the asset at `location` into `disk_cache`.
+
+        Nothing is started if this process is already copying that asset, or
+        MAX_PENDING_DISK_CACHE_FILLS assets: a later request will copy it.
+        """
+        with _PENDING_DISK_CACHE_FILLS_LOCK:
+            if location in _PENDING_DISK_CACHE_FILLS or len(_PENDING_DISK_CACHE_FILLS) >= MAX_PENDING_DISK_CACHE_FILLS:
+                return
+            _PENDING_DISK_CACHE_FILLS.add(location)
+        thread = threading.Thread(target=_fill_pending_asset_disk_cache, args=(disk_cache, location))
+        thread.daemon = True
+        thread.start()
+
+
+def _fill_pending_asset_disk_cache(disk_cache, location):
+    """
+    Copy the asset at `location` into `disk_cache`, then let this process copy it again.
+    """
+    try:
+        fill_asset_disk_cache(disk_cache, location)
+    finally:
+        with _PENDING_DISK_CACHE_FILLS_LOCK:
+            _PENDING_DISK_CACHE_FILLS.discard(location)
+
+
+def fill_asset_disk_cache(disk_cache, location):
+    """
+    Copy the asset at `location` from the contentstore into `disk_cache`,
+    unless another thread or process is already doing so. Failures are only
+    logged, since the asset can still be served from the contentstore.
+    """
+    try:
+        disk_cache.fill(AssetManager.find(location, as_stream=True))
+    except Exception:  # pylint: disable=broad-except
+        log.warning(u"Could not cache asset %s on disk", unicode(location), exc_info=True)
+
 
 def parse_range_header(header_value, content_length):
     """
@@ -3,11 +3,18 @@ Tests for StaticContentServer
 """
 import copy
 import ddt
+import errno
 import logging
+import os
+import shutil
+import tempfile
+import time
 import unittest
+from mock import patch
 from uuid import uuid4
 
 from django.conf import settings
+from django.core.cache import cache
 from django.test.client import Client
 from django.test.utils import override_settings
 
@@ -17,7 +24,8 @@ from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 from xmodule.modulestore import ModuleStoreEnum
 from xmodule.modulestore.xml_importer import import_course_from_xml
 
-from contentserver.middleware import parse_range_header
+from contentserver.disk_cache import AssetDiskCache, FILL_LOCK_TIMEOUT
+from contentserver.middleware import parse_range_header, _PENDING_DISK_CACHE_FILLS
 from student.models import CourseEnrollment
 
 log = logging.getLogger(__name__)
@@ -28,6 +36,19 @@ TEST_DATA_CONTENTSTORE['DOC_STORE_CONFIG']['db'] = 'test_xcontent_%s' % uuid4().
 TEST_DATA_DIR = settings.COMMON_TEST_DATA_ROOT
 
 
+class ForegroundThread(object):
+    """
+    Stands in for threading.Thread, running the target when the thread is started.
+    """
+    def __init__(self, target, args=()):
+        self.target = target
+        self.args = args
+        self.daemon = False
+
+    def start(self):  # pylint: disable=missing-docstring
+        self.target(*self.args)
+
+
 @ddt.ddt
 @override_settings(CONTENTSTORE=TEST_DATA_CONTENTSTORE)
 class ContentStoreToyCourseTest(ModuleStoreTestCase):
@@ -192,6 +213,163 @@ class ContentStoreToyCourseTest(ModuleStoreTestCase):
         )
         self.assertEqual(resp.status_code, 416)
 
+    def test_etag(self):
+        """
+        Test that assets are served with an ETag, and that a request whose
+        If-None-Match matches it gets a 304 Not Modified.
+        """
+        resp = self.client.get(self.url_unlocked)
+        self.assertEqual(resp.status_code, 200)
+        etag = resp['ETag']
+
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH='"some-other-digest"')
+        self.assertEqual(resp.status_code, 200)
+
+    def _use_disk_cache(self):
+        """
+        Make assets too large for memcached, and copy them to a fresh disk
+        cache in the foreground. Return the directory of the disk cache.
+        """
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        cache.clear()
+        for patcher in (
+                patch('contentserver.middleware.MAX_CACHED_CONTENT_SIZE', 0),
+                patch('contentserver.middleware._ASSET_DISK_CACHE', None),
+                patch('contentserver.middleware.threading.Thread', ForegroundThread),
+                override_settings(STATIC_CONTENT_DISK_CACHE={'ROOT_PATH': cache_dir, 'MAX_SIZE': 1024 * 1024}),
+        ):
+            patcher.__enter__()
+            self.addCleanup(patcher.__exit__, None, None, None)
+        return cache_dir
+
+    def test_disk_cache(self):
+        """
+        Test that assets too large for memcached are cached on disk, and
+        served from there for full and range requests.
+        """
+        cache_dir = self._use_disk_cache()
+        resp = self.client.get(self.url_unlocked)
+        self.assertEqual(resp.status_code, 200)
+        data = resp.content
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+        with patch('contentserver.middleware.AssetManager.find') as mock_find:
+            mock_find.return_value = self.contentstore.find(self.unlocked_asset, as_stream=True)
+            resp = self.client.get(self.url_unlocked)
+            self.assertEqual(resp.content, data)
+
+            resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=1-3')
+            self.assertEqual(resp.status_code, 206)
+            self.assertEqual(resp.content, data[1:4])
+
+    def test_disk_cache_range_request_miss(self):
+        """
+        Test that a range request for an asset that isn't on disk yet is served
+        from the contentstore and caches the whole asset, so that later
+        requests are served from disk.
+        """
+        data = self.contentstore.find(self.unlocked_asset).data
+
+        cache_dir = self._use_disk_cache()
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=0-1')
+        self.assertEqual(resp.status_code, 206)
+        self.assertEqual(resp.content, data[0:2])
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+        with patch('contentserver.middleware.AssetDiskCache.fill') as mock_fill:
+            resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=2-4')
+            self.assertEqual(resp.status_code, 206)
+            self.assertEqual(resp.content, data[2:5])
+            resp = self.client.get(self.url_unlocked)
+            self.assertEqual(resp.content, data)
+        self.assertFalse(mock_fill.called)
+
+    def test_disk_cache_not_filled_for_refused_requests(self):
+        """
+        Test that requests for locked assets that are refused, and requests
+        answered with a 304, don't copy the asset to disk.
+        """
+        cache_dir = self._use_disk_cache()
+        resp = self.client.get(self.url_locked)
+        self.assertEqual(resp.status_code, 403)
+
+        last_modified = self.contentstore.find(self.unlocked_asset).last_modified_at
+        resp = self.client.get(
+            self.url_unlocked,
+            HTTP_IF_MODIFIED_SINCE=last_modified.strftime("%a, %d-%b-%Y %H:%M:%S GMT")
+        )
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(os.listdir(cache_dir), [])
+
+    def test_disk_cache_fills_limited(self):
+        """
+        Test that a process doesn't copy more assets to disk at the same time
+        than MAX_PENDING_DISK_CACHE_FILLS, and lets the ones it copied be
+        copied again.
+        """
+        cache_dir = self._use_disk_cache()
+        with patch('contentserver.middleware.MAX_PENDING_DISK_CACHE_FILLS', 0):
+            resp = self.client.get(self.url_unlocked)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(os.listdir(cache_dir), [])
+
+        self.client.get(self.url_unlocked)
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+        self.assertFalse(_PENDING_DISK_CACHE_FILLS)
+
+    def test_disk_cache_removes_abandoned_files(self):
+        """
+        Test that lock and temporary files left by copies that never finished
+        are removed once they are older than FILL_LOCK_TIMEOUT.
+        """
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        disk_cache = AssetDiskCache(cache_dir, 1024 * 1024)
+        abandoned_path = os.path.join(cache_dir, '.abandoned')
+        recent_path = os.path.join(cache_dir, '.recent')
+        for temp_path in (abandoned_path, recent_path):
+            with open(temp_path, 'wb') as temp_file:
+                temp_file.write('partial copy')
+        abandoned_at = time.time() - FILL_LOCK_TIMEOUT - 1
+        os.utime(abandoned_path, (abandoned_at, abandoned_at))
+
+        self.assertTrue(disk_cache.fill(self.contentstore.find(self.unlocked_asset, as_stream=True)))
+        self.assertFalse(os.path.exists(abandoned_path))
+        self.assertTrue(os.path.exists(recent_path))
+
+    def test_disk_cache_fill_in_progress(self):
+        """
+        Test that an asset that is already being copied to disk isn't copied
+        again.
+        """
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        disk_cache = AssetDiskCache(cache_dir, 1024 * 1024)
+        content = self.contentstore.find(self.unlocked_asset, as_stream=True)
+
+        with patch('contentserver.disk_cache.os.open', side_effect=OSError(errno.EEXIST, 'File exists')):
+            self.assertFalse(disk_cache.fill(content))
+        self.assertIsNone(disk_cache.get(content))
+
+        self.assertTrue(disk_cache.fill(content))
+        self.assertIsNotNone(disk_cache.get(content))
+
+    def test_range_request_cached_content(self):
+        """
+        Test that range requests for content cached in memory are served
+        without going back to the contentstore.
+        """
+        self.client.get(self.url_unlocked)
+        with patch('contentserver.middleware.AssetManager.find') as mock_find:
+            resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=0-1')
+        self.assertEqual(resp.status_code, 206)
+        self.assertEqual(len(resp.content), 2)
+        self.assertFalse(mock_find.called)
+
 
 @ddt.ddt
 class ParseRangeHeaderTestCase(unittest.TestCase):
@@ -147,6 +147,81 @@ class CourseRerunUIStateManager(CourseActionUIStateManager):
         )
 
 
+class CourseImportUIStateManager(CourseActionUIStateManager):
+    """
+    A concrete model Manager for the Import Action.
+    """
+    ACTION = "import"
+
+    class State(object):
+        """
+        An Enum class for maintaining the list of possible states for Imports.
+        """
+        UPLOADING = "uploading"
+        EXTRACTING = "extracting"
+        VERIFYING = "verifying"
+        IMPORTING_STATIC_ASSETS = "importing_static_assets"
+        IMPORTING_MODULES = "importing_modules"
+        IMPORTING_DRAFTS = "importing_drafts"
+        FAILED = "failed"
+        SUCCEEDED = "succeeded"
+
+    # The stage of the Studio import page that each state belongs to. A failed
+    # import is reported as the negated stage at which it failed.
+    STAGES = {
+        State.UPLOADING: 0,
+        State.EXTRACTING: 1,
+        State.VERIFYING: 2,
+        State.IMPORTING_STATIC_ASSETS: 3,
+        State.IMPORTING_MODULES: 3,
+        State.IMPORTING_DRAFTS: 3,
+        State.SUCCEEDED: 4,
+    }
+
+    def initiated(self, course_key, user, filename):
+        """
+        To be called when the given user starts uploading `filename` to import into the given course.
+        """
+        self.update_state(
+            course_key=course_key,
+            new_state=self.State.UPLOADING,
+            user=user,
+            allow_not_found=True,
+            filename=filename,
+            stage=self.STAGES[self.State.UPLOADING],
+        )
+
+    def progressed(self, course_key, new_state):
+        """
+        To be called when an existing import for the given course moves on to `new_state`.
+        """
+        self.update_state(
+            course_key=course_key,
+            new_state=new_state,
+            stage=self.STAGES[new_state],
+        )
+
+    def succeeded(self, course_key):
+        """
+        To be called when an existing import for the given course has successfully completed.
+        """
+        self.progressed(course_key, self.State.SUCCEEDED)
+
+    def failed(self, course_key, message):
+        """
+        To be called when an existing import for the given course has failed, with a
+        message for the user.
+        """
+        stage = self.find_first(course_key=course_key).stage
+        self.update_state(
+            course_key=course_key,
+            new_state=self.State.FAILED,
+            message=message[:self.model.MAX_MESSAGE_LENGTH],  # truncate to fit
+            # Failures while uploading are reported as failures to unpack, as they always were.
+            stage=-max(abs(stage), 1),
+        )
+
+
 class CourseActionStateItemNotFoundError(Exception):
     """An exception class for errors specific to Course Action states."""
     pass
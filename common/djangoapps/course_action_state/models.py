@@ -12,7 +12,9 @@ file and check it in at the same time as your model changes. To do that,
 from django.contrib.auth.models import User
 from django.db import models
 from xmodule_django.models import CourseKeyField
-from course_action_state.managers import CourseActionStateManager, CourseRerunUIStateManager
+from course_action_state.managers import (
+    CourseActionStateManager, CourseRerunUIStateManager, CourseImportUIStateManager
+)
 
 
 class CourseActionState(models.Model):
@@ -119,3 +121,25 @@ class CourseRerunState(CourseActionUIState):
     # MANAGERS
     # Override the abstract class' manager with a Rerun-specific manager that inherits from the base class' manager.
     objects = CourseRerunUIStateManager()
+
+
+class CourseImportState(CourseActionUIState):
+    """
+    A concrete django model for maintaining state specifically for the Action Course Import.
+    """
+    class Meta:
+        """
+        Only a single import can be in progress for a course_key; starting a new
+        one takes over the entry of the previous one.
+        """
+        unique_together = ("course_key", "action")
+
+    # FIELDS
+    # Name of the uploaded archive being imported
+    filename = models.CharField(max_length=255, default="", blank=True)
+
+    # Stage of the import, as reported to the Studio import page (see CourseImportUIStateManager.STAGES)
+    stage = models.IntegerField(default=0)
+
+    # MANAGERS
+    objects = CourseImportUIStateManager()
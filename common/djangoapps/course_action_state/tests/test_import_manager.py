@@ -0,0 +1,64 @@
+"""
+Tests specific to the CourseImportState Model and Manager.
+"""
+
+from django.test import TestCase
+from opaque_keys.edx.locations import CourseLocator
+from course_action_state.models import CourseImportState
+from course_action_state.managers import CourseImportUIStateManager
+from student.tests.factories import UserFactory
+
+
+class TestCourseImportStateManager(TestCase):
+    """
+    Test class for testing the CourseImportUIStateManager.
+    """
+    def setUp(self):
+        self.course_key = CourseLocator("test_org", "test_course_num", "test_run")
+        self.user = UserFactory()
+        self.filename = "course.tar.gz"
+        CourseImportState.objects.initiated(self.course_key, self.user, self.filename)
+
+    def get_import_state(self):
+        """
+        Gets the import state object for self.course_key and self.filename.
+        """
+        return CourseImportState.objects.find_first(course_key=self.course_key, filename=self.filename)
+
+    def test_import_initiated(self):
+        import_state = self.get_import_state()
+        self.assertEqual(import_state.state, CourseImportUIStateManager.State.UPLOADING)
+        self.assertEqual(import_state.stage, 0)
+        self.assertEqual(import_state.created_user, self.user)
+
+    def test_import_progressed(self):
+        CourseImportState.objects.progressed(self.course_key, CourseImportUIStateManager.State.VERIFYING)
+        self.assertEqual(self.get_import_state().stage, 2)
+        CourseImportState.objects.progressed(self.course_key, CourseImportUIStateManager.State.IMPORTING_DRAFTS)
+        self.assertEqual(self.get_import_state().stage, 3)
+        CourseImportState.objects.succeeded(self.course_key)
+        import_state = self.get_import_state()
+        self.assertEqual(import_state.state, CourseImportUIStateManager.State.SUCCEEDED)
+        self.assertEqual(import_state.stage, 4)
+
+    def test_import_failed(self):
+        CourseImportState.objects.progressed(self.course_key, CourseImportUIStateManager.State.VERIFYING)
+        CourseImportState.objects.failed(self.course_key, "no course.xml")
+        import_state = self.get_import_state()
+        self.assertEqual(import_state.state, CourseImportUIStateManager.State.FAILED)
+        self.assertEqual(import_state.stage, -2)
+        self.assertEqual(import_state.message, "no course.xml")
+
+    def test_upload_failed(self):
+        # Failures while uploading are reported at the unpacking stage
+        CourseImportState.objects.failed(self.course_key, "upload corrupted")
+        self.assertEqual(self.get_import_state().stage, -1)
+
+    def test_new_import_replaces_previous_one(self):
+        CourseImportState.objects.failed(self.course_key, "upload corrupted")
+        CourseImportState.objects.initiated(self.course_key, self.user, "other.tar.gz")
+        self.assertEqual(CourseImportState.objects.find_all(course_key=self.course_key).count(), 1)
+        import_state = CourseImportState.objects.find_first(course_key=self.course_key)
+        self.assertEqual(import_state.filename, "other.tar.gz")
+        self.assertEqual(import_state.stage, 0)
+        self.assertEqual(import_state.message, "")
@@ -6,12 +6,12 @@ from ddt import ddt, data
 from django.test import TestCase
 from collections import namedtuple
 from opaque_keys.edx.locations import CourseLocator
-from course_action_state.models import CourseRerunState
+from course_action_state.models import CourseRerunState, CourseImportState
 from course_action_state.managers import CourseActionStateItemNotFoundError
 
 
 # Sequence of Action models to be tested with ddt.
-COURSE_ACTION_STATES = (CourseRerunState, )
+COURSE_ACTION_STATES = (CourseRerunState, CourseImportState)
 
 
 class TestCourseActionStateManagerBase(TestCase):
@@ -0,0 +1,63 @@
+"""
+Monkey-patch `django.db.transaction` to send a signal after each commit
+
+Django 1.4 has no way to run code once a transaction has committed
+(`transaction.on_commit` only arrives in Django 1.9). Work that must wait
+until the data it refers to is visible to other connections, such as
+invalidating a cache, can connect to `post_commit` instead.
+
+Affected Methods:
+    - commit
+
+TransactionMiddleware, commit_on_success and commit_manually all commit
+through `django.db.transaction.commit` [0], so patching the module
+attribute covers them. The implicit commits Django makes outside of
+managed transactions (`commit_unless_managed`) don't go through it, and
+send nothing: their writes are visible as soon as they are made.
+
+[0] https://github.com/django/django/blob/1.4.8/django/db/transaction.py#L140
+"""
+from django.db import transaction
+from django.dispatch import Signal
+
+import monkey_patch
+
+# Sent with the alias of the database (`using`) after a successful commit
+post_commit = Signal(providing_args=['using'])  # pylint: disable=invalid-name
+
+
+def is_patched():
+    """
+    Check if the transaction module has been monkey-patched
+    """
+    return monkey_patch.is_patched(transaction, 'commit')
+
+
+def patch():
+    """
+    Monkey-patch the commit function
+
+    Affected Methods:
+        - commit
+    """
+    if is_patched():
+        return True
+
+    commit = transaction.commit
+
+    def commit_and_send_post_commit(using=None):
+        """
+        Commit, then send post_commit
+        """
+        commit(using=using)
+        post_commit.send(sender=None, using=using)
+
+    monkey_patch.patch(transaction, 'commit', commit_and_send_post_commit)
+    return is_patched()
+
+
+def unpatch():
+    """
+    Un-monkey-patch the commit function
+    """
+    return monkey_patch.unpatch(transaction, 'commit')
@@ -0,0 +1,70 @@
+"""
+Test methods exposed in common/djangoapps/monkey_patch/django_db_transaction.py
+
+Verify that `django.db.transaction.commit` sends `post_commit` once the
+commit has succeeded while patched, and only then.
+"""
+from unittest import TestCase
+
+from django.db import DatabaseError, transaction
+from mock import patch as mock_patch
+
+from monkey_patch.django_db_transaction import is_patched, patch, post_commit, unpatch
+
+
+class MonkeyPatchTest(TestCase):
+    """
+    Test the post_commit signal sent by the patched commit
+    """
+    def setUp(self):
+        super(MonkeyPatchTest, self).setUp()
+        # Stand in for the (unpatched) commit, without touching any real database
+        self.commits = []
+        self.commit_error = None
+        commit_patcher = mock_patch('django.db.transaction.commit', new=self._commit)
+        commit_patcher.start()
+        self.addCleanup(commit_patcher.stop)
+
+        self.received = []
+        post_commit.connect(self._receiver)
+        self.addCleanup(post_commit.disconnect, self._receiver)
+
+    def _commit(self, using=None):
+        """
+        Record the commits made
+        """
+        if self.commit_error is not None:
+            raise self.commit_error
+        self.commits.append(using)
+
+    def _receiver(self, sender, **kwargs):  # pylint: disable=unused-argument
+        """
+        Record the post_commit signals sent
+        """
+        self.received.append(kwargs['using'])
+
+    def test_patch_unpatch(self):
+        self.assertFalse(is_patched())
+        self.assertTrue(patch())
+        self.assertTrue(patch())
+        self.assertTrue(unpatch())
+        self.assertFalse(is_patched())
+        self.assertEqual(transaction.commit, self._commit)
+
+    def test_post_commit_sent(self):
+        transaction.commit(using='default')
+        self.assertEqual(self.received, [])
+
+        patch()
+        self.addCleanup(unpatch)
+        transaction.commit(using='default')
+        self.assertEqual(self.commits, ['default', 'default'])
+        self.assertEqual(self.received, ['default'])
+
+    def test_no_post_commit_on_failure(self):
+        self.commit_error = DatabaseError()
+        patch()
+        self.addCleanup(unpatch)
+        with self.assertRaises(DatabaseError):
+            transaction.commit()
+        self.assertEqual(self.received, [])
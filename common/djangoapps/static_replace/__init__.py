@@ -1,5 +1,6 @@
 import logging
 import re
+from weakref import WeakKeyDictionary
 
 from staticfiles.storage import staticfiles_storage
 from staticfiles import finders
@@ -11,6 +12,16 @@ from xmodule.contentstore.content import StaticContent
 
 log = logging.getLogger(__name__)
 
+# Compiled _url_replace_regex patterns, by prefix.
+_URL_REPLACE_PATTERNS = {}
+
+# Memoized staticfiles_storage lookups: {storage: {path: url}}.
+# Collected static files don't change while the process is running, but checking
+# whether one exists hits the disk (or S3) every time. Only paths that are static
+# files are memoized, so the memo can't grow beyond the set of collected files;
+# misses (typically course assets) are looked up every time.
+_STATICFILES_URLS = WeakKeyDictionary()
+
 
 def _url_replace_regex(prefix):
     """
@@ -28,6 +39,44 @@ def _url_replace_regex(prefix):
         """.format(prefix=prefix)
 
 
+def _url_replace_pattern(prefix):
+    """
+    Return _url_replace_regex(prefix), compiled once per process.
+    """
+    pattern = _URL_REPLACE_PATTERNS.get(prefix)
+    if pattern is None:
+        pattern = _URL_REPLACE_PATTERNS[prefix] = re.compile(_url_replace_regex(prefix))
+    return pattern
+
+
+def _static_prefix_regex(data_dir=None):
+    """
+    Match the prefix of static urls, excluding those already pointing into `data_dir`.
+    """
+    return u'(?:{static_url}|/static/)(?!{data_dir})'.format(
+        static_url=settings.STATIC_URL,
+        data_dir=data_dir
+    )
+
+
+def staticfiles_url(path):
+    """
+    Return the staticfiles_storage url of `path`, or None if it isn't a collected static file.
+
+    Found urls are memoized for the life of the process, except in DEBUG mode, where
+    static files may change under us.  Errors raised by the storage are not
+    memoized, and are left to the caller.
+    """
+    if settings.DEBUG:
+        return staticfiles_storage.url(path) if staticfiles_storage.exists(path) else None
+
+    urls = _STATICFILES_URLS.setdefault(staticfiles_storage, {})
+    url = urls.get(path)
+    if url is None and staticfiles_storage.exists(path):
+        url = urls[path] = staticfiles_storage.url(path)
+    return url
+
+
 def try_staticfiles_lookup(path):
     """
     Try to lookup a path in staticfiles_storage.  If it fails, return
@@ -69,7 +118,7 @@ def replace_jump_to_id_urls(text, course_id, jump_to_id_base_url):
         rest = match.group('rest')
         return "".join([quote, jump_to_id_base_url + rest, quote])
 
-    return re.sub(_url_replace_regex('/jump_to_id/'), replace_jump_to_id_url, text)
+    return _url_replace_pattern('/jump_to_id/').sub(replace_jump_to_id_url, text)
 
 
 def replace_course_urls(text, course_key):
@@ -89,7 +138,7 @@ def replace_course_urls(text, course_key):
         rest = match.group('rest')
         return "".join([quote, '/courses/' + course_id + '/', rest, quote])
 
-    return re.sub(_url_replace_regex('/course/'), replace_course_url, text)
+    return _url_replace_pattern('/course/').sub(replace_course_url, text)
 
 
 def process_static_urls(text, replacement_function, data_dir=None):
@@ -108,14 +157,7 @@ def process_static_urls(text, replacement_function, data_dir=None):
         rest = match.group('rest')
         return replacement_function(original, prefix, quote, rest)
 
-    return re.sub(
-        _url_replace_regex(u'(?:{static_url}|/static/)(?!{data_dir})'.format(
-            static_url=settings.STATIC_URL,
-            data_dir=data_dir
-        )),
-        wrap_part_extraction,
-        text
-    )
+    return _url_replace_pattern(_static_prefix_regex(data_dir)).sub(wrap_part_extraction, text)
 
 
 def make_static_urls_absolute(request, html):
@@ -135,18 +177,17 @@ def make_static_urls_absolute(request, html):
     )
 
 
-def replace_static_urls(text, data_directory=None, course_id=None, static_asset_path=''):
+def _static_url_replacer(data_directory=None, course_id=None, static_asset_path=''):
     """
-    Replace /static/$stuff urls either with their correct url as generated by collectstatic,
-    (/static/$md5_hashed_stuff) or by the course-specific content static url
-    /static/$course_data_dir/$stuff, or, if course_namespace is not None, by the
-    correct url in the contentstore (/c4x/.. or /asset-loc:..)
-
-    text: The source text to do the substitution in
-    data_directory: The directory in which course data is stored
-    course_id: The course identifier used to distinguish static content for this course in studio
-    static_asset_path: Path for static assets, which overrides data_directory and course_namespace, if nonempty
+    Return a function that replaces a single matched static url, for
+    process_static_urls.  See replace_static_urls for the arguments.
     """
+    # if we're running with a MongoBacked store course_namespace is not None, then use studio style urls
+    use_studio_style_urls = (
+        (not static_asset_path) and
+        bool(course_id) and
+        modulestore().get_modulestore_type(course_id) != ModuleStoreEnum.Type.xml
+    )
 
     def replace_static_url(original, prefix, quote, rest):
         """
@@ -160,23 +201,17 @@ def replace_static_urls(text, data_directory=None, course_id=None, static_asset_
         # In debug mode, if we can find the url as is,
         if settings.DEBUG and finders.find(rest, True):
             return original
-        # if we're running with a MongoBacked store course_namespace is not None, then use studio style urls
-        elif (not static_asset_path) \
-                and course_id \
-                and modulestore().get_modulestore_type(course_id) != ModuleStoreEnum.Type.xml:
+        elif use_studio_style_urls:
             # first look in the static file pipeline and see if we are trying to reference
             # a piece of static content which is in the edx-platform repo (e.g. JS associated with an xmodule)
-
-            exists_in_staticfiles_storage = False
+            url = None
             try:
-                exists_in_staticfiles_storage = staticfiles_storage.exists(rest)
+                url = staticfiles_url(rest)
             except Exception as err:
                 log.warning("staticfiles_storage couldn't find path {0}: {1}".format(
                     rest, str(err)))
 
-            if exists_in_staticfiles_storage:
-                url = staticfiles_storage.url(rest)
-            else:
+            if url is None:
                 # if not, then assume it's courseware specific content and then look in the
                 # Mongo-backed database
                 url = StaticContent.convert_legacy_static_url_with_course_id(rest, course_id)
@@ -185,9 +220,8 @@ def replace_static_urls(text, data_directory=None, course_id=None, static_asset_
             course_path = "/".join((static_asset_path or data_directory, rest))
 
             try:
-                if staticfiles_storage.exists(rest):
-                    url = staticfiles_storage.url(rest)
-                else:
+                url = staticfiles_url(rest)
+                if url is None:
                     url = staticfiles_storage.url(course_path)
             # And if that fails, assume that it's course content, and add manually data directory
             except Exception as err:
@@ -197,4 +231,53 @@ def replace_static_urls(text, data_directory=None, course_id=None, static_asset_
 
         return "".join([quote, url, quote])
 
-    return process_static_urls(text, replace_static_url, data_dir=static_asset_path or data_directory)
+    return replace_static_url
+
+
+def replace_static_urls(text, data_directory=None, course_id=None, static_asset_path=''):
+    """
+    Replace /static/$stuff urls either with their correct url as generated by collectstatic,
+    (/static/$md5_hashed_stuff) or by the course-specific content static url
+    /static/$course_data_dir/$stuff, or, if course_namespace is not None, by the
+    correct url in the contentstore (/c4x/.. or /asset-loc:..)
+
+    text: The source text to do the substitution in
+    data_directory: The directory in which course data is stored
+    course_id: The course identifier used to distinguish static content for this course in studio
+    static_asset_path: Path for static assets, which overrides data_directory and course_namespace, if nonempty
+    """
+    return process_static_urls(
+        text,
+        _static_url_replacer(data_directory, course_id, static_asset_path),
+        data_dir=static_asset_path or data_directory
+    )
+
+
+def replace_urls(text, course_id, jump_to_id_base_url, data_directory=None, static_asset_path=''):
+    """
+    Apply replace_static_urls, replace_course_urls and replace_jump_to_id_urls
+    to `text` in a single pass.
+
+    Rendered courseware goes through all three; matching the three prefixes with
+    one pattern scans the text once instead of three times.
+    """
+    replace_static_url = _static_url_replacer(data_directory, course_id, static_asset_path)
+    course_url_base = '/courses/' + course_id.to_deprecated_string() + '/'
+
+    def replace_url(match):
+        """
+        Replace a single matched url, according to which of the prefixes it starts with.
+        """
+        quote = match.group('quote')
+        rest = match.group('rest')
+        if match.group('static') is not None:
+            return replace_static_url(match.group(0), match.group('prefix'), quote, rest)
+        elif match.group('course') is not None:
+            return "".join([quote, course_url_base, rest, quote])
+        else:
+            return "".join([quote, jump_to_id_base_url + rest, quote])
+
+    prefix = u'(?P<static>{static})|(?P<course>/course/)|(?P<jump_to_id>/jump_to_id/)'.format(
+        static=_static_prefix_regex(static_asset_path or data_directory)
+    )
+    return _url_replace_pattern(prefix).sub(replace_url, text)
@@ -4,6 +4,9 @@ from nose.tools import assert_equals, assert_true, assert_false  # pylint: disab
 from static_replace import (
     replace_static_urls,
     replace_course_urls,
+    replace_jump_to_id_urls,
+    replace_urls,
+    staticfiles_url,
     _url_replace_regex,
     process_static_urls,
     make_static_urls_absolute
@@ -56,6 +59,46 @@ def test_process_url_no_match():
     assert_equals('"test/static/file.png"', process_static_urls(STATIC_SOURCE, processor))
 
 
+@patch('static_replace.modulestore')
+@patch('static_replace.staticfiles_storage')
+def test_replace_urls_single_pass(mock_storage, mock_modulestore):
+    mock_modulestore.return_value = Mock(XMLModuleStore)
+    mock_storage.exists.return_value = False
+    mock_storage.url.return_value = '/static/data_dir/file.png'
+    jump_to_id_base_url = '/courses/org/course/run/jump_to_id/'
+    text = 'a "/static/file.png" b \'/course/info\' c "/jump_to_id/vertical" d "/static/file.png?raw"'
+
+    assert_equals(
+        replace_jump_to_id_urls(
+            replace_course_urls(replace_static_urls(text, DATA_DIRECTORY), COURSE_KEY),
+            COURSE_KEY,
+            jump_to_id_base_url
+        ),
+        replace_urls(text, COURSE_KEY, jump_to_id_base_url, data_directory=DATA_DIRECTORY)
+    )
+
+
+@patch('static_replace.staticfiles_storage')
+def test_staticfiles_url_is_memoized(mock_storage):
+    mock_storage.exists.return_value = True
+    mock_storage.url.return_value = '/static/file.abc123.png'
+
+    assert_equals('/static/file.abc123.png', staticfiles_url('file.png'))
+    assert_equals('/static/file.abc123.png', staticfiles_url('file.png'))
+    mock_storage.exists.assert_called_once_with('file.png')
+    mock_storage.url.assert_called_once_with('file.png')
+
+
+@patch('static_replace.staticfiles_storage')
+def test_staticfiles_url_misses_are_not_memoized(mock_storage):
+    mock_storage.exists.return_value = False
+
+    assert_equals(None, staticfiles_url('course_asset.png'))
+    mock_storage.exists.return_value = True
+    mock_storage.url.return_value = '/static/course_asset.abc123.png'
+    assert_equals('/static/course_asset.abc123.png', staticfiles_url('course_asset.png'))
+
+
 @patch('django.http.HttpRequest')
 def test_static_urls(mock_request):
     mock_request.build_absolute_uri = lambda url: 'http://' + url
@@ -26,6 +26,7 @@ from django.utils import timezone
 from django.contrib.auth.models import User
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth.signals import user_logged_in, user_logged_out
+from django.core.cache import get_cache, InvalidCacheBackendError
 from django.db import models, IntegrityError
 from django.db.models import Count
 from django.dispatch import receiver, Signal
@@ -46,9 +47,11 @@ from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.modulestore.django import modulestore
 from opaque_keys.edx.keys import CourseKey
 from functools import total_ordering
+from lazy import lazy
 
 from certificates.models import GeneratedCertificate
 from course_modes.models import CourseMode
+from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
 
 import analytics
 
@@ -57,6 +60,14 @@ log = logging.getLogger(__name__)
 AUDIT_LOG = logging.getLogger("audit")
 SessionStore = import_module(settings.SESSION_ENGINE).SessionStore  # pylint: disable=invalid-name
 
+# Remembers which AnonymousUserId rows are known to exist, so that they don't
+# have to be looked up again. Only used if an 'anonymous_user_id' cache is
+# configured.
+try:
+    anonymous_user_id_cache = get_cache('anonymous_user_id')  # pylint: disable=invalid-name
+except InvalidCacheBackendError:
+    anonymous_user_id_cache = None  # pylint: disable=invalid-name
+
 
 class AnonymousUserId(models.Model):
     """
@@ -76,6 +87,27 @@ class AnonymousUserId(models.Model):
     unique_together = (user, course_id)
 
 
+def _compute_anonymous_id(user_id, course_id):
+    """
+    Return the anonymous id of the user with id `user_id` in `course_id`.
+    """
+    # include the secret key as a salt, and to make the ids unique across different LMS installs.
+    hasher = hashlib.md5()
+    hasher.update(settings.SECRET_KEY)
+    hasher.update(unicode(user_id))
+    if course_id:
+        hasher.update(course_id.to_deprecated_string().encode('utf-8'))
+    return hasher.hexdigest()
+
+
+def _anonymous_id_cache_key(user_id, course_id):
+    """
+    Return the key under which `anonymous_user_id_cache` records that the
+    AnonymousUserId of `user_id` in `course_id` has been saved.
+    """
+    return u"student.anonymous_user_id.{}.{}".format(user_id, course_id or '')
+
+
 def anonymous_id_for_user(user, course_id, save=True):
     """
     Return a unique id for a (user, course) pair, suitable for inserting
@@ -94,13 +126,7 @@ def anonymous_id_for_user(user, course_id, save=True):
     if cached_id is not None:
         return cached_id
 
-    # include the secret key as a salt, and to make the ids unique across different LMS installs.
-    hasher = hashlib.md5()
-    hasher.update(settings.SECRET_KEY)
-    hasher.update(unicode(user.id))
-    if course_id:
-        hasher.update(course_id.to_deprecated_string().encode('utf-8'))
-    digest = hasher.hexdigest()
+    digest = _compute_anonymous_id(user.id, course_id)
 
     if not hasattr(user, '_anonymous_id'):
         user._anonymous_id = {}  # pylint: disable=protected-access
@@ -110,6 +136,10 @@ def anonymous_id_for_user(user, course_id, save=True):
     if save is False:
         return digest
 
+    cache_key = _anonymous_id_cache_key(user.id, course_id)
+    if anonymous_user_id_cache is not None and anonymous_user_id_cache.get(cache_key) is not None:
+        return digest
+
     try:
         anonymous_user_id, __ = AnonymousUserId.objects.get_or_create(
             defaults={'anonymous_user_id': digest},
@@ -130,9 +160,81 @@ def anonymous_id_for_user(user, course_id, save=True):
         # continue
         pass
 
+    if anonymous_user_id_cache is not None:
+        anonymous_user_id_cache.set(cache_key, digest)
+
     return digest
 
 
+def anonymous_ids_for_users(users, course_id, save=True):
+    """
+    Return a dict mapping the id of each of `users` to their anonymous id in
+    `course_id`, as returned by `anonymous_id_for_user`.
+
+    Unlike calling `anonymous_id_for_user` for each user, this looks up the
+    existing AnonymousUserId rows with one query, and creates the missing
+    ones in bulk.
+    """
+    users = [user for user in users if not user.is_anonymous()]
+    anonymous_ids = {}
+    for user in users:
+        if not hasattr(user, '_anonymous_id'):
+            user._anonymous_id = {}  # pylint: disable=protected-access
+        digest = user._anonymous_id.get(course_id)  # pylint: disable=protected-access
+        if digest is None:
+            digest = _compute_anonymous_id(user.id, course_id)
+            user._anonymous_id[course_id] = digest  # pylint: disable=protected-access
+        anonymous_ids[user.id] = digest
+
+    if save is False or not anonymous_ids:
+        return anonymous_ids
+
+    unsaved_user_ids = set(anonymous_ids)
+    if anonymous_user_id_cache is not None:
+        cache_keys = {_anonymous_id_cache_key(user_id, course_id): user_id for user_id in unsaved_user_ids}
+        unsaved_user_ids.difference_update(
+            cache_keys[cache_key] for cache_key in anonymous_user_id_cache.get_many(cache_keys.keys())
+        )
+
+    if unsaved_user_ids:
+        saved_ids = AnonymousUserId.objects.filter(
+            user_id__in=unsaved_user_ids, course_id=course_id
+        ).values_list('user_id', 'anonymous_user_id')
+        for user_id, anonymous_user_id in saved_ids:
+            unsaved_user_ids.discard(user_id)
+            if anonymous_user_id != anonymous_ids[user_id]:
+                log.error(
+                    u"Stored anonymous user id %r for user %r "
+                    u"in course %r doesn't match computed id %r",
+                    anonymous_user_id,
+                    user_id,
+                    course_id,
+                    anonymous_ids[user_id]
+                )
+
+        new_rows = [
+            AnonymousUserId(user_id=user_id, course_id=course_id, anonymous_user_id=anonymous_ids[user_id])
+            for user_id in unsaved_user_ids
+        ]
+        try:
+            AnonymousUserId.objects.bulk_create(new_rows)
+        except IntegrityError:
+            # Another thread has created some of these entries, so create
+            # the rest one at a time.
+            for user in users:
+                if user.id in unsaved_user_ids:
+                    user._anonymous_id.pop(course_id, None)  # pylint: disable=protected-access
+                    anonymous_id_for_user(user, course_id)
+
+        if anonymous_user_id_cache is not None:
+            anonymous_user_id_cache.set_many({
+                _anonymous_id_cache_key(user_id, course_id): anonymous_id
+                for user_id, anonymous_id in anonymous_ids.iteritems()
+            })
+
+    return anonymous_ids
+
+
 def user_by_anonymous_id(uid):
     """
     Return user by anonymous_user_id using AnonymousUserId lookup table.
@@ -1166,6 +1268,14 @@ class CourseEnrollment(models.Model):
     def course(self):
         return modulestore().get_course(self.course_id)
 
+    @lazy
+    def course_overview(self):
+        """
+        The CourseOverview of this enrollment's course, or None if the course
+        does not exist or fails to load.
+        """
+        return CourseOverview.get_from_id(self.course_id)
+
     def is_verified_enrollment(self):
         """
         Check the course enrollment mode is verified or not
@@ -14,6 +14,7 @@ import ddt
 from django.conf import settings
 from django.contrib.auth.models import User, AnonymousUser
 from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.cache import get_cache
 from django.core.urlresolvers import reverse
 from django.test import TestCase
 from django.test.client import RequestFactory, Client
@@ -21,8 +22,8 @@ from mock import Mock, patch
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 
 from student.models import (
-    anonymous_id_for_user, user_by_anonymous_id, CourseEnrollment, unique_id_for_user,
-    LinkedInAddToProfileConfiguration
+    anonymous_id_for_user, anonymous_ids_for_users, user_by_anonymous_id,
+    AnonymousUserId, CourseEnrollment, unique_id_for_user, LinkedInAddToProfileConfiguration
 )
 from student.views import (process_survey_link, _cert_info,
                            change_enrollment, complete_course_mode_info)
@@ -869,3 +870,36 @@ class AnonymousLookupTable(ModuleStoreTestCase):
         real_user = user_by_anonymous_id(anonymous_id)
         self.assertEqual(self.user, real_user)
         self.assertEqual(anonymous_id, anonymous_id_for_user(self.user, course2.id, save=False))
+
+    def test_bulk_roundtrip(self):
+        users = [UserFactory() for __ in range(3)]
+        # One of the users already has an anonymous id
+        existing_id = anonymous_id_for_user(users[0], self.course.id)
+
+        anonymous_ids = anonymous_ids_for_users([User.objects.get(id=user.id) for user in users], self.course.id)
+        self.assertEqual(anonymous_ids[users[0].id], existing_id)
+        for user in users:
+            self.assertEqual(anonymous_ids[user.id], anonymous_id_for_user(user, self.course.id, save=False))
+        self.assertEqual(AnonymousUserId.objects.filter(course_id=self.course.id).count(), 3)
+
+    def test_bulk_unsaved(self):
+        anonymous_ids = anonymous_ids_for_users([self.user, AnonymousUser()], self.course.id, save=False)
+        self.assertEqual(anonymous_ids, {self.user.id: anonymous_id_for_user(self.user, self.course.id, save=False)})
+        self.assertFalse(AnonymousUserId.objects.filter(course_id=self.course.id).exists())
+
+    def test_anonymous_user_id_cache(self):
+        users = [UserFactory() for __ in range(3)]
+        test_cache = get_cache('django.core.cache.backends.locmem.LocMemCache', LOCATION='test_anonymous_user_id')
+        test_cache.clear()
+        with patch('student.models.anonymous_user_id_cache', test_cache):
+            anonymous_ids_for_users(users, self.course.id)
+            # Once the ids have been saved, looking them up again doesn't
+            # touch the database
+            fresh_users = [User.objects.get(id=user.id) for user in users]
+            other_user = User.objects.get(id=users[0].id)
+            with self.assertNumQueries(0):
+                self.assertEqual(
+                    anonymous_ids_for_users(fresh_users, self.course.id),
+                    {user.id: anonymous_id_for_user(user, self.course.id, save=False) for user in users}
+                )
+                anonymous_id_for_user(other_user, self.course.id)
@@ -163,33 +163,21 @@ def replace_static_urls(data_dir, block, view, frag, context, course_id=None, st
     ))
 
 
-def grade_histogram(module_id):
-    '''
-    Print out a histogram of grades on a given problem in staff member debug info.
-
-    Warning: If a student has just looked at an xmodule and not attempted
-    it, their grade is None. Since there will always be at least one such student
-    this function almost always returns [].
-    '''
-    from django.db import connection
-    cursor = connection.cursor()
-
-    q = """SELECT courseware_studentmodule.grade,
-                  COUNT(courseware_studentmodule.student_id)
-    FROM courseware_studentmodule
-    WHERE courseware_studentmodule.module_id=%s
-    GROUP BY courseware_studentmodule.grade"""
-    # Passing module_id this way prevents sql-injection.
-    cursor.execute(q, [module_id.to_deprecated_string()])
-
-    grades = list(cursor.fetchall())
-    grades.sort(key=lambda x: x[0])  # Add ORDER BY to sql query?
-    if len(grades) >= 1 and grades[0][0] is None:
-        return []
-    return grades
-
-
-def add_staff_markup(user, has_instructor_access, block, view, frag, context):  # pylint: disable=unused-argument
+def replace_urls(data_dir, course_id, jump_to_id_base_url, block, view, frag, context, static_asset_path=''):  # pylint: disable=unused-argument
+    """
+    Does the work of replace_static_urls, replace_course_urls and
+    replace_jump_to_id_urls (in that order) in a single pass over the content.
+    """
+    return wrap_fragment(frag, static_replace.replace_urls(
+        frag.content,
+        course_id,
+        jump_to_id_base_url,
+        data_directory=data_dir,
+        static_asset_path=static_asset_path
+    ))
+
+
+def add_staff_markup(user, has_instructor_access, block, view, frag, context, grade_histogram=None):  # pylint: disable=unused-argument
     """
     Updates the supplied module with a new get_html function that wraps
     the output of the old get_html function with additional information
@@ -197,6 +185,10 @@ def add_staff_markup(user, has_instructor_access, block, view, frag, context):
     definition of the xmodule, and a link to view the module in Studio
     if it is a Studio edited, mongo stored course.
 
+    grade_histogram: A function that takes the location of a scored block
+        and returns the list of (grade, count) pairs of its graded students.
+        If None, no histogram is shown.
+
     Does nothing if module is a SequenceModule.
     """
     # TODO: make this more general, eg use an XModule attribute instead
@@ -218,7 +210,7 @@ def add_staff_markup(user, has_instructor_access, block, view, frag, context):
         return frag
 
     block_id = block.location
-    if block.has_score and settings.FEATURES.get('DISPLAY_HISTOGRAMS_TO_STAFF'):
+    if grade_histogram is not None and block.has_score and settings.FEATURES.get('DISPLAY_HISTOGRAMS_TO_STAFF'):
         histogram = grade_histogram(block_id)
         render_histogram = len(histogram) > 0
     else:
@@ -7,6 +7,9 @@ Uses pyparsing to parse. Main function as of now is evaluator().
 import math
 import operator
 import numbers
+import threading
+from collections import OrderedDict
+
 import numpy
 import scipy.constants
 import functions
@@ -73,6 +76,12 @@ SUFFIXES = {
 }
 
 
+# How many parsed expressions `PARSE_CACHE` keeps around. This is the only
+# cache of parses: `compile_expression`, `evaluator` and `latex_preview` all
+# go through it.
+PARSE_CACHE_SIZE = 1000
+
+
 class UndefinedVariable(Exception):
     """
     Indicate when a student inputs a variable which was not expected.
@@ -121,8 +130,9 @@ def eval_atom(parse_result):
 
     In the case of parenthesis, ignore them.
     """
-    # Find first number in the list
-    result = next(k for k in parse_result if isinstance(k, numbers.Number))
+    # Find first number in the list (or array of numbers, if evaluating
+    # several samples at once); anything else is a parenthesis.
+    result = next(k for k in parse_result if not isinstance(k, basestring))
     return result
 
 
@@ -136,7 +146,7 @@ def eval_power(parse_result):
     # `reduce` will go from left to right; reverse the list.
     parse_result = reversed(
         [k for k in parse_result
-         if isinstance(k, numbers.Number)]  # Ignore the '^' marks.
+         if not isinstance(k, basestring)]  # Ignore the '^' marks.
     )
     # Having reversed it, raise `b` to the power of `a`.
     power = reduce(lambda a, b: b ** a, parse_result)
@@ -151,14 +161,16 @@ def eval_parallel(parse_result):
       out = 1 / (1/in1 + 1/in2 + ...)
     e.g. [ 1, 2 ] -> 2/3
 
-    Return NaN if there is a zero among the inputs.
+    Return NaN if there is a zero among the inputs. (When evaluating arrays of
+    samples, a zero raises instead, so that `evaluate_samples` falls back to
+    evaluating the samples one at a time.)
     """
     if len(parse_result) == 1:
         return parse_result[0]
-    if 0 in parse_result:
+    values = [e for e in parse_result if not isinstance(e, basestring)]
+    if not any(isinstance(e, numpy.ndarray) for e in values) and 0 in values:
         return float('nan')
-    reciprocals = [1. / e for e in parse_result
-                   if isinstance(e, numbers.Number)]
+    reciprocals = [1. / e for e in values]
     return 1. / sum(reciprocals)
 
 
@@ -173,12 +185,12 @@ def eval_sum(parse_result):
     total = 0.0
     current_op = operator.add
     for token in parse_result:
-        if token == '+':
+        if not isinstance(token, basestring):
+            total = current_op(total, token)
+        elif token == '+':
             current_op = operator.add
         elif token == '-':
             current_op = operator.sub
-        else:
-            total = current_op(total, token)
     return total
 
 
@@ -191,12 +203,12 @@ def eval_product(parse_result):
     prod = 1.0
     current_op = operator.mul
     for token in parse_result:
-        if token == '*':
+        if not isinstance(token, basestring):
+            prod = current_op(prod, token)
+        elif token == '*':
             current_op = operator.mul
         elif token == '/':
             current_op = operator.truediv
-        else:
-            prod = current_op(prod, token)
     return prod
 
 
@@ -216,35 +228,29 @@ def add_defaults(variables, functions, case_sensitive):
     return (all_variables, all_functions)
 
 
-def evaluator(variables, functions, math_expr, case_sensitive=False):
+def compile_expression(math_expr, case_sensitive=False):
     """
-    Evaluate an expression; that is, take a string of math and return a float.
+    Return a parsed `ParseAugmenter` for `math_expr`.
 
-    -Variables are passed as a dictionary from string to value. They must be
-     python numbers.
-    -Unary functions are passed as a dictionary from string to function.
+    The parse itself comes from `PARSE_CACHE`, so this is cheap for
+    expressions that have been seen recently.
     """
-    # No need to go further.
-    if math_expr.strip() == "":
-        return float('nan')
-
-    # Parse the tree.
     math_interpreter = ParseAugmenter(math_expr, case_sensitive)
     math_interpreter.parse_algebra()
+    return math_interpreter
 
-    # Get our variables together.
-    all_variables, all_functions = add_defaults(variables, functions, case_sensitive)
 
-    # ...and check them
-    math_interpreter.check_variables(all_variables, all_functions)
-
-    # Create a recursion to evaluate the tree.
+def _evaluate_actions(all_variables, all_functions, case_sensitive):
+    """
+    Return the `reduce_tree` actions that evaluate a tree with the given
+    variables and functions.
+    """
     if case_sensitive:
         casify = lambda x: x
     else:
         casify = lambda x: x.lower()  # Lowercase for case insens.
 
-    evaluate_actions = {
+    return {
         'number': eval_number,
         'variable': lambda x: all_variables[casify(x[0])],
         'function': lambda x: all_functions[casify(x[0])](x[1]),
@@ -255,9 +261,236 @@ def evaluator(variables, functions, math_expr, case_sensitive=False):
         'sum': eval_sum
     }
 
+
+def evaluator(variables, functions, math_expr, case_sensitive=False):
+    """
+    Evaluate an expression; that is, take a string of math and return a float.
+
+    -Variables are passed as a dictionary from string to value. They must be
+     python numbers.
+    -Unary functions are passed as a dictionary from string to function.
+    """
+    # No need to go further.
+    if math_expr.strip() == "":
+        return float('nan')
+
+    # Parse the tree.
+    math_interpreter = compile_expression(math_expr, case_sensitive)
+
+    # Get our variables together.
+    all_variables, all_functions = add_defaults(variables, functions, case_sensitive)
+
+    # ...and check them
+    math_interpreter.check_variables(all_variables, all_functions)
+
+    # Create a recursion to evaluate the tree.
+    evaluate_actions = _evaluate_actions(all_variables, all_functions, case_sensitive)
     return math_interpreter.reduce_tree(evaluate_actions)
 
 
+def evaluate_samples(variables_list, functions, math_expr, case_sensitive=False):
+    """
+    Evaluate an expression at each of several sets of variables; return a list
+    of the results, in the same order as `variables_list`.
+
+    Equivalent to calling `evaluator` once per dictionary in `variables_list`,
+    but the expression is parsed once and, where possible, evaluated just once
+    with each variable bound to a numpy array of its sampled values. If that
+    can't be done (a function that doesn't take arrays, a division by zero or
+    other floating point error in some sample, ...), each sample is evaluated
+    on its own, so the results and errors are exactly those of `evaluator`.
+
+    All of the dictionaries in `variables_list` must have the same keys.
+    """
+    if not variables_list:
+        return []
+    if math_expr.strip() == "":
+        return [float('nan')] * len(variables_list)
+
+    math_interpreter = compile_expression(math_expr, case_sensitive)
+    all_variables, all_functions = add_defaults(variables_list[0], functions, case_sensitive)
+    math_interpreter.check_variables(all_variables, all_functions)
+
+    if len(variables_list) > 1:
+        try:
+            columns = dict(
+                (name, numpy.array([variables[name] for variables in variables_list]))
+                for name in variables_list[0]
+            )
+            all_variables, all_functions = add_defaults(columns, functions, case_sensitive)
+            evaluate_actions = _evaluate_actions(all_variables, all_functions, case_sensitive)
+            # Python numbers raise on these errors; make numpy do the same.
+            with numpy.errstate(all='raise', under='ignore'):
+                result = math_interpreter.reduce_tree(evaluate_actions)
+        except Exception:  # pylint: disable=broad-except
+            pass
+        else:
+            if isinstance(result, numbers.Number):
+                # None of the variables sampled appear in the expression.
+                return [result] * len(variables_list)
+            if isinstance(result, numpy.ndarray) and result.shape == (len(variables_list),):
+                return list(result)
+
+    return [
+        evaluator(variables, functions, math_expr, case_sensitive)
+        for variables in variables_list
+    ]
+
+
+def _build_grammar():
+    """
+    Build the pyparsing grammar for algebraic expressions.
+
+    It is the same for every expression, so it is built just once, as
+    `GRAMMAR`.
+    """
+    # 0.33 or 7 or .34 or 16.
+    number_part = Word(nums)
+    inner_number = (number_part + Optional("." + Optional(number_part))) | ("." + number_part)
+    # pyparsing allows spaces between tokens--`Combine` prevents that.
+    inner_number = Combine(inner_number)
+
+    # SI suffixes and percent.
+    number_suffix = MatchFirst(Literal(k) for k in SUFFIXES.keys())
+
+    # 0.33k or 17
+    plus_minus = Literal('+') | Literal('-')
+    number = Group(
+        Optional(plus_minus) +
+        inner_number +
+        Optional(CaselessLiteral("E") + Optional(plus_minus) + number_part) +
+        Optional(number_suffix)
+    )
+    number = number("number")
+
+    # Predefine recursive variables.
+    expr = Forward()
+
+    # Handle variables passed in. They must start with letters/underscores
+    # and may contain numbers afterward.
+    inner_varname = Word(alphas + "_", alphanums + "_")
+    varname = Group(inner_varname)("variable")
+
+    # Same thing for functions.
+    function = Group(inner_varname + Suppress("(") + expr + Suppress(")"))("function")
+
+    atom = number | function | varname | "(" + expr + ")"
+    atom = Group(atom)("atom")
+
+    # Do the following in the correct order to preserve order of operation.
+    pow_term = atom + ZeroOrMore("^" + atom)
+    pow_term = Group(pow_term)("power")
+
+    par_term = pow_term + ZeroOrMore('||' + pow_term)  # 5k || 4k
+    par_term = Group(par_term)("parallel")
+
+    prod_term = par_term + ZeroOrMore((Literal('*') | Literal('/')) + par_term)  # 7 * 5 / 4
+    prod_term = Group(prod_term)("product")
+
+    sum_term = Optional(plus_minus) + prod_term + ZeroOrMore(plus_minus + prod_term)  # -5 + 4 - 3
+    sum_term = Group(sum_term)("sum")
+
+    # Finish the recursion.
+    expr << sum_term  # pylint: disable=pointless-statement
+    return expr + stringEnd
+
+
+GRAMMAR = _build_grammar()
+
+
+def _names_used(tree):
+    """
+    Return the names of the variables and the functions used in a parse tree,
+    as a pair of frozensets.
+    """
+    variables_used = set()
+    functions_used = set()
+    nodes = [tree]
+    while nodes:
+        node = nodes.pop()
+        if not isinstance(node, ParseResults):
+            continue
+        node_name = node.getName()
+        if node_name == 'variable':
+            variables_used.add(node[0])
+        elif node_name == 'function':
+            functions_used.add(node[0])
+        nodes.extend(node)
+    return frozenset(variables_used), frozenset(functions_used)
+
+
+class ParseCache(object):
+    """
+    Least recently used cache of parsed expressions, keyed by the expression
+    and its case sensitivity. It never holds more than `max_size` entries.
+
+    The cache is shared by all the threads of the process, so every access
+    to its entries holds a lock. Parsing happens outside the lock: two
+    threads missing on the same expression both parse it, and the last one
+    to `set` it wins.
+
+    `hits` and `misses` count lookups, to check how well the cache is doing.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, math_expr, case_sensitive):
+        """
+        Return the cached value for the expression, or None.
+        """
+        key = (math_expr, case_sensitive)
+        with self._lock:
+            try:
+                value = self._entries.pop(key)
+            except KeyError:
+                self.misses += 1
+                return None
+            self.hits += 1
+            # Reinsert as the most recently used.
+            self._entries[key] = value
+            return value
+
+    def set(self, math_expr, case_sensitive, value):
+        """
+        Cache `value` for the expression, evicting the least recently used
+        entry if the cache is full.
+        """
+        key = (math_expr, case_sensitive)
+        with self._lock:
+            self._entries.pop(key, None)
+            while self._entries and len(self._entries) >= self.max_size:
+                self._entries.popitem(last=False)
+            self._entries[key] = value
+
+    def clear(self):
+        """
+        Empty the cache and reset its counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        """
+        Return a dict of the cache's hits, misses, current and maximum size.
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+            }
+
+
+PARSE_CACHE = ParseCache(PARSE_CACHE_SIZE)
+
+
 class ParseAugmenter(object):
     """
     Holds the data for a particular parse.
@@ -278,23 +511,6 @@ class ParseAugmenter(object):
         self.variables_used = set()
         self.functions_used = set()
 
-        def vpa(tokens):
-            """
-            When a variable is recognized, store it in `variables_used`.
-            """
-            varname = tokens[0][0]
-            self.variables_used.add(varname)
-
-        def fpa(tokens):
-            """
-            When a function is recognized, store it in `functions_used`.
-            """
-            varname = tokens[0][0]
-            self.functions_used.add(varname)
-
-        self.variable_parse_action = vpa
-        self.function_parse_action = fpa
-
     def parse_algebra(self):
         """
         Parse an algebraic expression into a tree.
@@ -302,62 +518,24 @@ class ParseAugmenter(object):
         Store a `pyparsing.ParseResult` in `self.tree` with proper groupings to
         reflect parenthesis and order of operations. Leave all operators in the
         tree and do not parse any strings of numbers into their float versions.
+        Also record the names of the variables and functions used.
+
+        Parse trees are shared through `PARSE_CACHE`; they must not be
+        modified.
 
         Adding the groups and result names makes the `repr()` of the result
         really gross. For debugging, use something like
           print OBJ.tree.asXML()
         """
-        # 0.33 or 7 or .34 or 16.
-        number_part = Word(nums)
-        inner_number = (number_part + Optional("." + Optional(number_part))) | ("." + number_part)
-        # pyparsing allows spaces between tokens--`Combine` prevents that.
-        inner_number = Combine(inner_number)
-
-        # SI suffixes and percent.
-        number_suffix = MatchFirst(Literal(k) for k in SUFFIXES.keys())
-
-        # 0.33k or 17
-        plus_minus = Literal('+') | Literal('-')
-        number = Group(
-            Optional(plus_minus) +
-            inner_number +
-            Optional(CaselessLiteral("E") + Optional(plus_minus) + number_part) +
-            Optional(number_suffix)
-        )
-        number = number("number")
-
-        # Predefine recursive variables.
-        expr = Forward()
-
-        # Handle variables passed in. They must start with letters/underscores
-        # and may contain numbers afterward.
-        inner_varname = Word(alphas + "_", alphanums + "_")
-        varname = Group(inner_varname)("variable")
-        varname.setParseAction(self.variable_parse_action)
-
-        # Same thing for functions.
-        function = Group(inner_varname + Suppress("(") + expr + Suppress(")"))("function")
-        function.setParseAction(self.function_parse_action)
-
-        atom = number | function | varname | "(" + expr + ")"
-        atom = Group(atom)("atom")
-
-        # Do the following in the correct order to preserve order of operation.
-        pow_term = atom + ZeroOrMore("^" + atom)
-        pow_term = Group(pow_term)("power")
-
-        par_term = pow_term + ZeroOrMore('||' + pow_term)  # 5k || 4k
-        par_term = Group(par_term)("parallel")
-
-        prod_term = par_term + ZeroOrMore((Literal('*') | Literal('/')) + par_term)  # 7 * 5 / 4
-        prod_term = Group(prod_term)("product")
-
-        sum_term = Optional(plus_minus) + prod_term + ZeroOrMore(plus_minus + prod_term)  # -5 + 4 - 3
-        sum_term = Group(sum_term)("sum")
-
-        # Finish the recursion.
-        expr << sum_term  # pylint: disable=pointless-statement
-        self.tree = (expr + stringEnd).parseString(self.math_expr)[0]
+        cached = PARSE_CACHE.get(self.math_expr, self.case_sensitive)
+        if cached is None:
+            tree = GRAMMAR.parseString(self.math_expr)[0]
+            cached = (tree, ) + _names_used(tree)
+            PARSE_CACHE.set(self.math_expr, self.case_sensitive, cached)
+
+        self.tree, variables_used, functions_used = cached
+        self.variables_used = set(variables_used)
+        self.functions_used = set(functions_used)
 
     def reduce_tree(self, handle_actions, terminal_converter=None):
         """
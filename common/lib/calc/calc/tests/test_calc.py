@@ -2,6 +2,7 @@
 Unit tests for calc.py
 """
 
+import threading
 import unittest
 import numpy
 import calc
@@ -559,3 +560,97 @@ class EvaluatorTest(unittest.TestCase):
             calc.evaluator({'r1': 5}, {}, "r1+r2")
         with self.assertRaisesRegexp(calc.UndefinedVariable, 'r1 r3'):
             calc.evaluator(variables, {}, "r1*r3", case_sensitive=True)
+
+    def test_parse_cache(self):
+        """
+        The same expression should only be parsed once
+        """
+        calc.PARSE_CACHE.clear()
+        first = calc.compile_expression('x^2+f(y)')
+        second = calc.compile_expression('x^2+f(y)')
+        self.assertIs(first.tree, second.tree)
+        self.assertEqual(second.variables_used, set(['x', 'y']))
+        self.assertEqual(second.functions_used, set(['f']))
+        self.assertIsNot(first.tree, calc.compile_expression('x^2+f(y)', case_sensitive=True).tree)
+
+        info = calc.PARSE_CACHE.info()
+        self.assertEqual((info['hits'], info['misses'], info['size']), (1, 2, 2))
+
+        # Parse errors aren't cached
+        with self.assertRaises(ParseException):
+            calc.compile_expression('1+')
+        with self.assertRaises(ParseException):
+            calc.compile_expression('1+')
+        self.assertEqual(calc.PARSE_CACHE.info()['size'], 2)
+
+    def test_parse_cache_eviction(self):
+        """
+        The least recently used expressions are evicted once the cache is full
+        """
+        cache = calc.ParseCache(2)
+        cache.set('a', False, 'tree a')
+        cache.set('b', False, 'tree b')
+        self.assertEqual(cache.get('a', False), 'tree a')
+        cache.set('c', False, 'tree c')
+        self.assertIsNone(cache.get('b', False))
+        self.assertEqual(cache.get('a', False), 'tree a')
+        self.assertEqual(cache.get('c', False), 'tree c')
+        self.assertEqual(cache.info(), {'hits': 3, 'misses': 1, 'size': 2, 'max_size': 2})
+
+    def test_parse_cache_threads(self):
+        """
+        Concurrent lookups and inserts keep the cache within its bound
+        """
+        cache = calc.ParseCache(10)
+
+        def use_cache(thread_index):
+            """
+            Insert and look up expressions, some of them shared between threads.
+            """
+            for i in range(200):
+                math_expr = 'x+{}'.format((thread_index * i) % 30)
+                if cache.get(math_expr, False) is None:
+                    cache.set(math_expr, False, math_expr)
+
+        threads = [threading.Thread(target=use_cache, args=(index, )) for index in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        info = cache.info()
+        self.assertLessEqual(info['size'], 10)
+        self.assertEqual(info['hits'] + info['misses'], 8 * 200)
+
+    def test_evaluate_samples(self):
+        """
+        `evaluate_samples` should give the same results as calling `evaluator`
+        on each sample
+        """
+        samples = [{'x': 1.0, 'y': 2.0}, {'x': -3.5, 'y': 0.25}, {'x': 7.0, 'y': 1.0 + 2.0j}]
+        expressions = ['x^2 + 3*y', 'sin(x)/y - sqrt(y)', 'x||y', '5', 'x*(pi+y)', 'X+Y']
+        for expression in expressions:
+            expected = [calc.evaluator(sample, {}, expression) for sample in samples]
+            result = calc.evaluate_samples(samples, {}, expression)
+            self.assertEqual(len(result), len(samples))
+            for expected_value, value in zip(expected, result):
+                self.assertAlmostEqual(expected_value, value, msg=expression)
+
+    def test_evaluate_samples_errors(self):
+        """
+        Errors in any sample should be those `evaluator` would raise
+        """
+        samples = [{'x': 1.0}, {'x': 0.0}]
+        with self.assertRaises(ZeroDivisionError):
+            calc.evaluate_samples(samples, {}, '1/x')
+        with self.assertRaisesRegexp(calc.UndefinedVariable, 'z'):
+            calc.evaluate_samples(samples, {}, 'x+z')
+
+        # Functions that don't accept arrays still work.
+        result = calc.evaluate_samples([{'x': 3.0}, {'x': 4.0}], {}, 'fact(x)')
+        self.assertEqual(result, [6, 24])
+
+        # || with a zero input is NaN for that sample only
+        result = calc.evaluate_samples(samples, {}, 'x||1')
+        self.assertEqual(result[0], 0.5)
+        self.assertTrue(numpy.isnan(result[1]))
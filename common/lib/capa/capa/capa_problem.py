@@ -13,11 +13,14 @@ Main module which shows problems (of "capa" type).
 This is used by capa_module.
 """
 
+from collections import OrderedDict
 from copy import deepcopy
 from datetime import datetime
+import hashlib
 import logging
 import os.path
 import re
+import threading
 
 from lxml import etree
 from pytz import UTC
@@ -56,8 +59,20 @@ html_problem_semantics = [
     "openendedrubric",
 ]
 
+# how many processed problems to keep in _PROCESSED_PROBLEMS
+PROCESSED_PROBLEM_CACHE_SIZE = 500
+
 log = logging.getLogger(__name__)
 
+# Problem XML with its ids assigned, which only depends on the problem text
+# and the problem id, keyed by those. Most problems are instantiated over and
+# over (once per student, and again to rescore), and only the seeded script
+# context, the responders and the rendering differ between instances. Problems
+# with <include>s aren't kept, since the included files can change. Shared by
+# all threads.
+_PROCESSED_PROBLEMS = OrderedDict()
+_PROCESSED_PROBLEMS_LOCK = threading.Lock()
+
 #-----------------------------------------------------------------------------
 # main class for this module
 
@@ -154,24 +169,16 @@ class LoncapaProblem(object):
         self.done = state.get('done', False)
         self.input_state = state.get('input_state', {})
 
-        # Convert startouttext and endouttext to proper <text></text>
-        problem_text = re.sub(r"startouttext\s*/", "text", problem_text)
-        problem_text = re.sub(r"endouttext\s*/", "/text", problem_text)
-        self.problem_text = problem_text
-
-        # parse problem XML file into an element tree
-        self.tree = etree.XML(problem_text)
-
-        # handle any <include file="foo"> tags
-        self._process_includes()
+        # Parse the problem XML into an element tree, with includes processed
+        # and IDs assigned
+        self.problem_text, self.tree = self._get_processed_problem(problem_text)
 
         # construct script processor context (eg for customresponse problems)
         self.context = self._extract_context(self.tree)
 
-        # Pre-parse the XML tree: modifies it to add ID's and perform some in-place
-        # transformations.  This also creates the dict (self.responders) of Response
-        # instances for each question in the problem. The dict has keys = xml subtree of
-        # Response, values = Response instance
+        # Create the dict (self.responders) of Response instances for each question in
+        # the problem, which may transform the tree further. The dict has keys = xml
+        # subtree of Response, values = Response instance
         self._preprocess_problem(self.tree)
 
         if not self.student_answers:  # True when student_answers is an empty dict
@@ -529,6 +536,50 @@ class LoncapaProblem(object):
 
     # ======= Private Methods Below ========
 
+    def _get_processed_problem(self, problem_text):
+        """
+        Convert startouttext and endouttext in `problem_text` to proper
+        <text></text>, parse it, handle its includes and assign IDs to its
+        responses, inputs and solutions.
+
+        Returns a (converted problem text, element tree) pair. None of this
+        depends on the seed or the student, so the result is cached per process
+        and the tree returned is a new copy of the cached one, which the caller
+        is free to modify. Problems that include other files are processed
+        again every time, so that edits to those files are picked up.
+        """
+        if isinstance(problem_text, unicode):
+            text_hash = hashlib.sha1(problem_text.encode('utf-8')).hexdigest()
+        else:
+            text_hash = hashlib.sha1(problem_text).hexdigest()
+        key = (text_hash, self.problem_id)
+
+        with _PROCESSED_PROBLEMS_LOCK:
+            processed = _PROCESSED_PROBLEMS.pop(key, None)
+            if processed is not None:
+                # reinsert as the most recently used
+                _PROCESSED_PROBLEMS[key] = processed
+
+        if processed is None:
+            problem_text = re.sub(r"startouttext\s*/", "text", problem_text)
+            problem_text = re.sub(r"endouttext\s*/", "/text", problem_text)
+            self.tree = etree.XML(problem_text)
+            has_includes = self.tree.find('.//include') is not None
+
+            # handle any <include file="foo"> tags
+            self._process_includes()
+            self._assign_ids(self.tree)
+
+            processed = (problem_text, self.tree)
+            if not has_includes:
+                with _PROCESSED_PROBLEMS_LOCK:
+                    _PROCESSED_PROBLEMS[key] = processed
+                    while len(_PROCESSED_PROBLEMS) > PROCESSED_PROBLEM_CACHE_SIZE:
+                        _PROCESSED_PROBLEMS.popitem(last=False)
+
+        problem_text, tree = processed
+        return problem_text, deepcopy(tree)
+
     def _process_includes(self):
         """
         Handle any <include file="foo"> tags by reading in the specified file and inserting it
@@ -777,38 +828,62 @@ class LoncapaProblem(object):
 
         return tree
 
-    def _preprocess_problem(self, tree):  # private
+    def _assign_ids(self, tree):  # private
         """
         Assign IDs to all the responses
         Assign sub-IDs to all entries (textline, schematic, etc.)
-        Annoted correctness and value
         In-place transformation
-
-        Also create capa Response instances for each responsetype and save as self.responders
-
-        Obtain all responder answers and save as self.responder_answers dict (key = response)
         """
-        response_id = 1
-        self.responders = {}
-        for response in tree.xpath('//' + "|//".join(responsetypes.registry.registered_tags())):
+        for response_id, response in enumerate(self._response_elements(tree), 1):
             response_id_str = self.problem_id + "_" + str(response_id)
             # create and save ID for this response
             response.set('id', response_id_str)
-            response_id += 1
-
-            answer_id = 1
-            input_tags = inputtypes.registry.registered_tags()
-            inputfields = tree.xpath(
-                "|".join(['//' + response.tag + '[@id=$id]//' + x for x in (input_tags + solution_tags)]),
-                id=response_id_str
-            )
 
             # assign one answer_id for each input type or solution type
-            for entry in inputfields:
+            for answer_id, entry in enumerate(self._input_fields(tree, response), 1):
                 entry.attrib['response_id'] = str(response_id)
                 entry.attrib['answer_id'] = str(answer_id)
                 entry.attrib['id'] = "%s_%i_%i" % (self.problem_id, response_id, answer_id)
-                answer_id = answer_id + 1
+
+        # <solution>...</solution> may not be associated with any specific response; give
+        # IDs for those separately
+        # TODO: We should make the namespaces consistent and unique (e.g. %s_problem_%i).
+        solution_id = 1
+        for solution in tree.findall('.//solution'):
+            solution.attrib['id'] = "%s_solution_%i" % (self.problem_id, solution_id)
+            solution_id += 1
+
+    def _response_elements(self, tree):  # private
+        """
+        Return the elements of all the responses in `tree`.
+        """
+        return tree.xpath('//' + "|//".join(responsetypes.registry.registered_tags()))
+
+    def _input_fields(self, tree, response):  # private
+        """
+        Return the input type and solution type elements of the response element
+        `response` in `tree`.
+        """
+        input_tags = inputtypes.registry.registered_tags()
+        return tree.xpath(
+            "|".join(['//' + response.tag + '[@id=$id]//' + x for x in (input_tags + solution_tags)]),
+            id=response.get('id')
+        )
+
+    def _preprocess_problem(self, tree):  # private
+        """
+        Annoted correctness and value
+        In-place transformation
+
+        Create capa Response instances for each responsetype and save as self.responders
+
+        Obtain all responder answers and save as self.responder_answers dict (key = response)
+
+        The IDs of `tree` must already have been assigned (see `_assign_ids`).
+        """
+        self.responders = {}
+        for response in self._response_elements(tree):
+            inputfields = self._input_fields(tree, response)
 
             # instantiate capa Response
             responsetype_cls = responsetypes.registry.get_class_for_tag(response.tag)
@@ -826,11 +901,3 @@ class LoncapaProblem(object):
                 log.debug('responder %s failed to properly return get_answers()',
                           self.responders[response])  # FIXME
                 raise
-
-        # <solution>...</solution> may not be associated with any specific response; give
-        # IDs for those separately
-        # TODO: We should make the namespaces consistent and unique (e.g. %s_problem_%i).
-        solution_id = 1
-        for solution in tree.findall('.//solution'):
-            solution.attrib['id'] = "%s_solution_%i" % (self.problem_id, solution_id)
-            solution_id += 1
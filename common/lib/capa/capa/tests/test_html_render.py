@@ -7,6 +7,7 @@ import mock
 
 from .response_xml_factory import StringResponseXMLFactory, CustomResponseXMLFactory
 from . import test_capa_system, new_loncapa_problem
+from capa import capa_problem
 
 
 class CapaHtmlRenderTest(unittest.TestCase):
@@ -54,6 +55,23 @@ class CapaHtmlRenderTest(unittest.TestCase):
         self.assertEqual(test_element.tag, "test")
         self.assertEqual(test_element.text, "Test include")
 
+    def test_include_edited(self):
+        # Problems with includes aren't cached, so edits to the included file show up
+        xml_str = textwrap.dedent("""
+            <problem>
+                <include file="test_include.xml"/>
+            </problem>
+        """)
+
+        self._create_test_file('test_include.xml', '<test>Before</test>')
+        problem = new_loncapa_problem(xml_str, capa_system=self.capa_system)
+        self.assertEqual(etree.XML(problem.get_html()).find("test").text, "Before")
+
+        with self.capa_system.filestore.open('test_include.xml', 'w') as include_file:
+            include_file.write('<test>After</test>')
+        problem = new_loncapa_problem(xml_str, capa_system=self.capa_system)
+        self.assertEqual(etree.XML(problem.get_html()).find("test").text, "After")
+
     def test_process_outtext(self):
         # Generate some XML with <startouttext /> and <endouttext />
         xml_str = textwrap.dedent("""
@@ -73,6 +91,35 @@ class CapaHtmlRenderTest(unittest.TestCase):
         span_element = rendered_html.find('span')
         self.assertEqual(span_element.text, 'Test text')
 
+    def test_processed_problem_cache(self):
+        xml_str = textwrap.dedent("""
+            <problem>
+            <startouttext/>Processed once<endouttext/>
+            <script>x = 1</script>
+            <stringresponse answer="x">
+                <textline size="20"/>
+            </stringresponse>
+            </problem>
+        """)
+        capa_problem._PROCESSED_PROBLEMS.clear()
+
+        with mock.patch.object(etree, 'XML', wraps=etree.XML) as mock_xml:
+            with mock.patch.object(capa_problem.LoncapaProblem, '_assign_ids', autospec=True,
+                                   side_effect=capa_problem.LoncapaProblem._assign_ids) as mock_assign_ids:
+                first = new_loncapa_problem(xml_str, seed=1)
+                second = new_loncapa_problem(xml_str, seed=2)
+
+        # The problem was only parsed and given ids once, but each instance
+        # has its own tree and responders
+        self.assertEqual(mock_xml.call_count, 1)
+        self.assertEqual(mock_assign_ids.call_count, 1)
+        self.assertIsNot(first.tree, second.tree)
+        self.assertEqual(first.problem_text, second.problem_text)
+        self.assertEqual(second.context['seed'], 2)
+        self.assertEqual(second.get_answer_ids(), first.get_answer_ids())
+        self.assertEqual(second.responders.keys()[0].get('id'), '1_1')
+        self.assertEqual(etree.XML(second.get_html()).find('span').text, 'Processed once')
+
     def test_anonymous_student_id(self):
         # make sure anonymous_student_id is rendered properly as a context variable
         xml_str = textwrap.dedent("""
@@ -9,7 +9,9 @@ STREAM_DATA_CHUNK_SIZE = 1024
 
 import os
 import logging
+import shutil
 import StringIO
+from tempfile import mkdtemp
 from urlparse import urlparse, urlunparse, parse_qsl
 from urllib import urlencode
 
@@ -21,7 +23,7 @@ from PIL import Image
 
 class StaticContent(object):
     def __init__(self, loc, name, content_type, data, last_modified_at=None, thumbnail_location=None, import_path=None,
-                 length=None, locked=False):
+                 length=None, locked=False, content_digest=None):
         self.location = loc
         self.name = name  # a display string which can be edited, and thus not part of the location which needs to be fixed
         self.content_type = content_type
@@ -33,6 +35,8 @@ class StaticContent(object):
         # cycles
         self.import_path = import_path
         self.locked = locked
+        # an md5 hex digest of the content, if the store provides one
+        self.content_digest = content_digest
 
     @property
     def is_thumbnail(self):
@@ -157,6 +161,12 @@ class StaticContent(object):
     def stream_data(self):
         yield self._data
 
+    def stream_data_in_range(self, first_byte, last_byte):
+        """
+        Stream the data between first_byte and last_byte (included)
+        """
+        yield self._data[first_byte:last_byte + 1]
+
     @staticmethod
     def serialize_asset_key_with_slash(asset_key):
         """
@@ -171,10 +181,10 @@ class StaticContent(object):
 
 class StaticContentStream(StaticContent):
     def __init__(self, loc, name, content_type, stream, last_modified_at=None, thumbnail_location=None, import_path=None,
-                 length=None, locked=False):
+                 length=None, locked=False, content_digest=None):
         super(StaticContentStream, self).__init__(loc, name, content_type, None, last_modified_at=last_modified_at,
                                                   thumbnail_location=thumbnail_location, import_path=import_path,
-                                                  length=length, locked=locked)
+                                                  length=length, locked=locked, content_digest=content_digest)
         self._stream = stream
 
     def stream_data(self):
@@ -206,7 +216,8 @@ class StaticContentStream(StaticContent):
         self._stream.seek(0)
         content = StaticContent(self.location, self.name, self.content_type, self._stream.read(),
                                 last_modified_at=self.last_modified_at, thumbnail_location=self.thumbnail_location,
-                                import_path=self.import_path, length=self.length, locked=self.locked)
+                                import_path=self.import_path, length=self.length, locked=self.locked,
+                                content_digest=self.content_digest)
         return content
 
 
@@ -248,6 +259,28 @@ class ContentStore(object):
         """
         raise NotImplementedError
 
+    def export_all_for_course(self, course_key, output_directory, assets_policy_file):
+        """
+        Export all of this course's assets to the output_directory, and their
+        attributes to the assets_policy_file.
+        """
+        raise NotImplementedError
+
+    def export_all_for_course_to_tar(self, course_key, tar_file, arcname, assets_policy_file):
+        """
+        Like export_all_for_course, but add the asset files to the open tarball tar_file,
+        under arcname.
+
+        This exports the assets to a temporary directory and then adds them to the
+        tarball; stores that can read assets straight into the tarball override it.
+        """
+        output_directory = mkdtemp()
+        try:
+            self.export_all_for_course(course_key, output_directory + '/', assets_policy_file)
+            tar_file.add(output_directory, arcname=arcname)
+        finally:
+            shutil.rmtree(output_directory)
+
     def generate_thumbnail(self, content, tempfile_path=None):
         thumbnail_content = None
         # use a naming convention to associate originals with the thumbnail
@@ -14,16 +14,22 @@ import json
 from bson.son import SON
 from opaque_keys.edx.keys import AssetKey
 from xmodule.modulestore.django import ASSET_IGNORE_REGEX
+import calendar
+import tarfile
 
 
 class MongoContentStore(ContentStore):
 
     # pylint: disable=unused-argument
-    def __init__(self, host, db, port=27017, user=None, password=None, bucket='fs', collection=None, **kwargs):
+    def __init__(
+            self, host, db, port=27017, user=None, password=None, bucket='fs', collection=None, structure_cache=None,
+            **kwargs
+    ):
         """
         Establish the connection with the mongo backend and connect to the collections
 
         :param collection: ignores but provided for consistency w/ other doc_store_config patterns
+        :param structure_cache: ignored, like collection; only the split modulestore uses it
         """
         logging.debug('Using MongoDB for static content serving at host={0} port={1} db={2}'.format(host, port, db))
         _db = pymongo.database.Database(
@@ -102,7 +108,8 @@ class MongoContentStore(ContentStore):
                     location, fp.displayname, fp.content_type, fp, last_modified_at=fp.uploadDate,
                     thumbnail_location=thumbnail_location,
                     import_path=getattr(fp, 'import_path', None),
-                    length=fp.length, locked=getattr(fp, 'locked', False)
+                    length=fp.length, locked=getattr(fp, 'locked', False),
+                    content_digest=getattr(fp, 'md5', None)
                 )
             else:
                 with self.fs.get(content_id) as fp:
@@ -116,7 +123,8 @@ class MongoContentStore(ContentStore):
                         location, fp.displayname, fp.content_type, fp.read(), last_modified_at=fp.uploadDate,
                         thumbnail_location=thumbnail_location,
                         import_path=getattr(fp, 'import_path', None),
-                        length=fp.length, locked=getattr(fp, 'locked', False)
+                        length=fp.length, locked=getattr(fp, 'locked', False),
+                        content_digest=getattr(fp, 'md5', None)
                     )
         except NoFile:
             if throw_on_not_found:
@@ -162,13 +170,54 @@ class MongoContentStore(ContentStore):
             # When debugging course exports, this might be a good place
             # to look. -- pmitros
             self.export(asset['asset_key'], output_directory)
-            for attr, value in asset.iteritems():
-                if attr not in ['_id', 'md5', 'uploadDate', 'length', 'chunkSize', 'asset_key']:
-                    policy.setdefault(asset['asset_key'].name, {})[attr] = value
+            self._add_asset_policy(policy, asset)
 
         with open(assets_policy_file, 'w') as f:
             json.dump(policy, f, sort_keys=True, indent=4)
 
+    def export_all_for_course_to_tar(self, course_key, tar_file, arcname, assets_policy_file):
+        """
+        Like export_all_for_course, but add the asset files straight to an open tarball
+        rather than writing them to disk first.
+
+        Args:
+            course_key (CourseKey): the :class:`CourseKey` identifying the course
+            tar_file: the :class:`tarfile.TarFile` to add the asset files to
+            arcname: the directory inside the tarball under which to put all the asset files
+            assets_policy_file: the filename for the policy file which should be in the same
+                directory as the other policy files.
+        """
+        policy = {}
+        assets, __ = self.get_all_content_for_course(course_key)
+        for asset in assets:
+            self._add_asset_policy(policy, asset)
+
+        # Each asset is streamed from GridFS into the tarball, so only one chunk of it
+        # is held in memory at a time.
+        for asset in assets:
+            content_id, __ = self.asset_db_key(asset['asset_key'])
+            with self.fs.get(content_id) as fp:
+                asset_path = fp.displayname
+                import_path = getattr(fp, 'import_path', None)
+                if import_path is not None:
+                    asset_path = os.path.join(os.path.dirname(import_path), asset_path)
+                tar_info = tarfile.TarInfo(os.path.join(arcname, asset_path).encode('utf-8'))
+                tar_info.size = fp.length
+                tar_info.mtime = calendar.timegm(fp.uploadDate.utctimetuple())
+                tar_file.addfile(tar_info, fp)
+
+        with open(assets_policy_file, 'w') as f:
+            json.dump(policy, f, sort_keys=True, indent=4)
+
+    @staticmethod
+    def _add_asset_policy(policy, asset):
+        """
+        Add the attributes of `asset` that are exported to the assets policy file to `policy`.
+        """
+        for attr, value in asset.iteritems():
+            if attr not in ['_id', 'md5', 'uploadDate', 'length', 'chunkSize', 'asset_key']:
+                policy.setdefault(asset['asset_key'].name, {})[attr] = value
+
     def get_all_content_thumbnails_for_course(self, course_key):
         return self._get_all_content_for_course(course_key, get_thumbnails=True)[0]
 
@@ -119,6 +119,8 @@ class BulkOpsRecord(object):
     """
     def __init__(self):
         self._active_count = 0
+        # usage keys published during the bulk operation, announced once it has ended
+        self.published_usage_keys = []
 
     @property
     def active(self):
@@ -275,6 +277,25 @@ class BulkOperationsMixin(object):
 
         self._clear_bulk_ops_record(course_key)
 
+        if emit_signals:
+            for usage_key in bulk_ops_record.published_usage_keys:
+                self._send_item_published(usage_key)
+
+    def _send_item_published(self, usage_key):
+        """
+        Send the item_published signal for usage_key, or, if a bulk operation is active on
+        its course, once that bulk operation has ended and its changes have been written.
+        """
+        bulk_ops_record = self._get_bulk_ops_record(usage_key.course_key)
+        if bulk_ops_record.active:
+            if usage_key not in bulk_ops_record.published_usage_keys:
+                bulk_ops_record.published_usage_keys.append(usage_key)
+            return
+
+        signal_handler = getattr(self, 'signal_handler', None)
+        if signal_handler:
+            signal_handler.send("item_published", usage_key=usage_key)
+
     def _is_in_bulk_operation(self, course_key, ignore_case=False):
         """
         Return whether a bulk operation is active on `course_key`.
@@ -1,6 +1,8 @@
 """ Code to allow module store to interface with courseware index """
 from __future__ import absolute_import
 
+import hashlib
+import json
 import logging
 
 from django.utils.translation import ugettext as _
@@ -16,6 +18,9 @@ from .exceptions import ItemNotFoundError
 INDEX_NAME = "courseware_index"
 DOCUMENT_TYPE = "courseware_content"
 
+# Number of indexed documents to read back per search request
+INDEX_BATCH_SIZE = 500
+
 log = logging.getLogger('edx.modulestore')
 
 
@@ -33,13 +38,43 @@ class CoursewareSearchIndexer(object):
     """
 
     @staticmethod
-    def add_to_search_index(modulestore, location, delete=False, raise_on_error=False):
+    def _indexed_documents(searcher, course_key):
+        """
+        Return a dict mapping the id of every document already indexed for the
+        course to that document.
+        """
+        indexed_documents = {}
+        try:
+            while True:
+                response = searcher.search(
+                    doc_type=DOCUMENT_TYPE,
+                    field_dictionary={"course": unicode(course_key)},
+                    size=INDEX_BATCH_SIZE,
+                    from_=len(indexed_documents),
+                )
+                for result in response["results"]:
+                    indexed_documents[result["data"]["id"]] = result["data"]
+                if not response["results"] or len(indexed_documents) >= response["total"]:
+                    break
+        except Exception:  # pylint: disable=broad-except
+            # Without the previous documents everything is simply indexed again, and nothing removed
+            log.exception("Could not read the courseware index for %s, reindexing all of it", course_key)
+            return {}
+        return indexed_documents
+
+    @classmethod
+    def add_to_search_index(cls, modulestore, location, delete=False, raise_on_error=False, incremental=False):
         """
         Add to courseware search index from given location and its children
+
+        The published item is loaded together with all its descendants in one
+        fetch, and their documents are sent to the search engine in one call.
+        Documents previously indexed within the item (see `ancestors`) which it
+        no longer contains are removed. When `incremental` is set, documents
+        whose content hash matches the one already in the index are not sent again.
         """
         error_list = []
         indexed_count = 0
-        # TODO - inline for now, need to move this out to a celery task
         searcher = SearchEngine.get_search_engine(INDEX_NAME)
         if not searcher:
             return
@@ -54,24 +89,32 @@ class CoursewareSearchIndexer(object):
         }
 
         def _fetch_item(item_location):
-            """ Fetch the item from the modulestore location, log if not found, but continue """
+            """ Fetch the published item and all its descendants, log if not found, but continue """
             try:
                 if isinstance(item_location, CourseLocator):
-                    item = modulestore.get_course(item_location)
+                    item = modulestore.get_course(item_location, depth=None)
                 else:
-                    item = modulestore.get_item(item_location, revision=ModuleStoreEnum.RevisionOption.published_only)
+                    item = modulestore.get_item(item_location, depth=None)
             except ItemNotFoundError:
                 log.warning('Cannot find: %s', item_location)
                 return None
 
             return item
 
-        def index_item_location(item_location, current_start_date):
-            """ add this item to the search index """
-            item = _fetch_item(item_location)
-            if not item:
-                return
+        documents = []
+
+        def get_ancestor_ids(item):
+            """ the ids of the published ancestors of item, from the course down """
+            ancestor_ids = []
+            parent_location = modulestore.get_parent_location(item.location)
+            while parent_location is not None:
+                parent = modulestore.get_item(parent_location)
+                ancestor_ids.insert(0, unicode(parent.scope_ids.usage_id))
+                parent_location = modulestore.get_parent_location(parent.location)
+            return ancestor_ids
 
+        def prepare_item_index(item, current_start_date, ancestor_ids):
+            """ collect the search documents of this item and its children """
             is_indexable = hasattr(item, "index_dictionary")
             # if it's not indexable and it does not have children, then ignore
             if not is_indexable and not item.has_children:
@@ -81,9 +124,10 @@ class CoursewareSearchIndexer(object):
             if item.start and (not current_start_date or item.start > current_start_date):
                 current_start_date = item.start
 
+            item_id = unicode(item.scope_ids.usage_id)
             if item.has_children:
-                for child_loc in item.children:
-                    index_item_location(child_loc, current_start_date)
+                for child in item.get_children():
+                    prepare_item_index(child, current_start_date, ancestor_ids + [item_id])
 
             item_index = {}
             item_index_dictionary = item.index_dictionary() if is_indexable else None
@@ -93,32 +137,62 @@ class CoursewareSearchIndexer(object):
                 try:
                     item_index.update(location_info)
                     item_index.update(item_index_dictionary)
-                    item_index['id'] = unicode(item.scope_ids.usage_id)
+                    item_index['id'] = item_id
+                    # lets a later index of any ancestor find the documents it no longer contains
+                    item_index['ancestors'] = ancestor_ids
                     if current_start_date:
                         item_index['start_date'] = current_start_date
-
-                    searcher.index(DOCUMENT_TYPE, item_index)
+                    item_index['content_hash'] = hashlib.sha1(
+                        json.dumps(item_index, sort_keys=True, default=unicode)
+                    ).hexdigest()
+                    documents.append(item_index)
                 except Exception as err:  # pylint: disable=broad-except
                     # broad exception so that index operation does not fail on one item of many
-                    log.warning('Could not index item: %s - %s', item_location, unicode(err))
-                    error_list.append(_('Could not index item: {}').format(item_location))
+                    log.warning('Could not index item: %s - %s', item.location, unicode(err))
+                    error_list.append(_('Could not index item: {}').format(item.location))
+
+        def index_documents(root_id):
+            """
+            send the collected documents of the item root_id to the search engine, and remove
+            the ones it no longer contains
+            """
+            indexed_documents = cls._indexed_documents(searcher, course_key)
+            document_ids = set(item_index['id'] for item_index in documents)
+            for indexed_id, indexed_document in indexed_documents.iteritems():
+                # documents indexed without ancestors are only removed by a course reindex
+                if indexed_id not in document_ids and (
+                        isinstance(location, CourseLocator) or root_id in indexed_document.get('ancestors', [])
+                ):
+                    searcher.remove(DOCUMENT_TYPE, indexed_id)
+
+            if incremental:
+                changed_documents = [
+                    item_index for item_index in documents
+                    if indexed_documents.get(item_index['id'], {}).get('content_hash') != item_index['content_hash']
+                ]
+            else:
+                changed_documents = documents
+            if changed_documents:
+                searcher.index(DOCUMENT_TYPE, changed_documents)
+            return len(changed_documents)
 
-        def remove_index_item_location(item_location):
+        def remove_index_item(item):
             """ remove this item from the search index """
-            item = _fetch_item(item_location)
-            if item:
-                if item.has_children:
-                    for child_loc in item.children:
-                        remove_index_item_location(child_loc)
+            if item.has_children:
+                for child in item.get_children():
+                    remove_index_item(child)
 
-                searcher.remove(DOCUMENT_TYPE, unicode(item.scope_ids.usage_id))
+            searcher.remove(DOCUMENT_TYPE, unicode(item.scope_ids.usage_id))
 
         try:
-            if delete:
-                remove_index_item_location(location)
-            else:
-                index_item_location(location, None)
-            indexed_count += 1
+            with modulestore.branch_setting(ModuleStoreEnum.Branch.published_only, course_key):
+                item = _fetch_item(location)
+                if item:
+                    if delete:
+                        remove_index_item(item)
+                    else:
+                        prepare_item_index(item, None, get_ancestor_ids(item))
+                        indexed_count = index_documents(unicode(item.scope_ids.usage_id))
         except Exception as err:  # pylint: disable=broad-except
             # broad exception so that index operation does not prevent the rest of the application from working
             log.exception(
@@ -136,9 +210,10 @@ class CoursewareSearchIndexer(object):
     @classmethod
     def do_publish_index(cls, modulestore, location, delete=False, raise_on_error=False):
         """
-        Add to courseware search index published section and children
+        Add to courseware search index published section and children, skipping
+        content that has not changed since it was last indexed
         """
-        indexed_count = cls.add_to_search_index(modulestore, location, delete, raise_on_error)
+        indexed_count = cls.add_to_search_index(modulestore, location, delete, raise_on_error, incremental=True)
         cls._track_index_request('edx.course.index.published', indexed_count, str(location))
         return indexed_count
 
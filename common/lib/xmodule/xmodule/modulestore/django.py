@@ -23,6 +23,7 @@ import django.utils
 from xmodule.contentstore.django import contentstore
 from xmodule.modulestore.draft_and_published import BranchSettingMixin
 from xmodule.modulestore.mixed import MixedModuleStore
+from xmodule.modulestore.split_mongo.split import SplitMongoModuleStore
 from xmodule.util.django import get_current_request_hostname
 import xblock.reference.plugins
 
@@ -80,9 +81,12 @@ class SignalHandler(object):
 
     """
     course_published = django.dispatch.Signal(providing_args=["course_key"])
+    # Sent for the root of each published subtree, as publishing sends course_published
+    item_published = django.dispatch.Signal(providing_args=["usage_key"])
 
     _mapping = {
-        "course_published": course_published
+        "course_published": course_published,
+        "item_published": item_published,
     }
 
     def __init__(self, modulestore_class):
@@ -143,6 +147,12 @@ def create_modulestore_instance(
     except InvalidCacheBackendError:
         metadata_inheritance_cache = get_cache('default')
 
+    # The split modulestore can keep structures in a shared cache, named by
+    # the 'structure_cache' entry of its DOC_STORE_CONFIG. Other stores may
+    # share that DOC_STORE_CONFIG, and ignore the entry.
+    if issubclass(class_, SplitMongoModuleStore) and isinstance(doc_store_config.get('structure_cache'), basestring):
+        doc_store_config = dict(doc_store_config, structure_cache=get_cache(doc_store_config['structure_cache']))
+
     if issubclass(class_, MixedModuleStore):
         _options['create_modulestore_instance'] = create_modulestore_instance
 
@@ -15,7 +15,6 @@ structure:
 import pymongo
 import sys
 import logging
-import copy
 import re
 from uuid import uuid4
 
@@ -534,10 +533,14 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         super(MongoModuleStore, self).__init__(contentstore=contentstore, **kwargs)
 
         def do_connection(
-            db, collection, host, port=27017, tz_aware=True, user=None, password=None, asset_collection=None, **kwargs
+            db, collection, host, port=27017, tz_aware=True, user=None, password=None, asset_collection=None,
+            structure_cache=None, **kwargs
         ):
             """
             Create & open the connection, authenticate, and provide pointers to the collection
+
+            structure_cache is only used by the split modulestore, which may share this
+            DOC_STORE_CONFIG, so it is dropped rather than passed on to pymongo.
             """
             self.database = MongoProxy(
                 pymongo.database.Database(
@@ -654,18 +657,14 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         else:
             return ParentLocationCache()
 
-    def _compute_metadata_inheritance_tree(self, course_id):
-        '''
-        Find all inheritable fields from all xblocks in the course which may define inheritable data
-        '''
-        # get all collections in the course, this query should not return any leaf nodes
-        course_id = self.fill_in_run(course_id)
-        query = SON([
-            ('_id.tag', 'i4x'),
-            ('_id.org', course_id.org),
-            ('_id.course', course_id.course),
-            ('_id.category', {'$in': BLOCK_TYPES_WITH_CHILDREN})
-        ])
+    def _find_inheritance_containers(self, course_id, query):
+        """
+        Find the containers matching `query` along with their children and inheritable metadata.
+
+        Returns a dict mapping the published location url of each container to its record, merging
+        the draft and published versions of a container, and the url of the course (None if the
+        course isn't among them).
+        """
         # if we're only dealing in the published branch, then only get published containers
         if self.get_branch_setting() == ModuleStoreEnum.Branch.published_only:
             query['_id.revision'] = None
@@ -705,39 +704,72 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             if location.category == 'course':
                 root = location_url
 
-        # now traverse the tree and compute down the inherited metadata
-        metadata_to_inherit = {}
+        return results_by_url, root
 
-        def _compute_inherited_metadata(url):
-            """
-            Helper method for computing inherited metadata for a specific location url
-            """
-            my_metadata = results_by_url[url].get('metadata', {})
-
-            # go through all the children and recurse, but only if we have
-            # in the result set. Remember results will not contain leaf nodes
-            for child in results_by_url[url].get('definition', {}).get('children', []):
-                if child in results_by_url:
-                    new_child_metadata = copy.deepcopy(my_metadata)
-                    new_child_metadata.update(results_by_url[child].get('metadata', {}))
-                    results_by_url[child]['metadata'] = new_child_metadata
-                    metadata_to_inherit[child] = new_child_metadata
-                    _compute_inherited_metadata(child)
-                else:
-                    # this is likely a leaf node, so let's record what metadata we need to inherit
-                    metadata_to_inherit[child] = my_metadata.copy()
-                # WARNING: 'parent' is not part of inherited metadata, but
-                # we're piggybacking on this recursive traversal to grab
-                # and cache the child's parent, as a performance optimization.
-                # The 'parent' key will be popped out of the dictionary during
-                # CachingDescriptorSystem.load_item
-                metadata_to_inherit[child].setdefault('parent', {})[self.get_branch_setting()] = url
+    def _inherit_metadata_down(self, results_by_url, url, metadata, metadata_to_inherit):
+        """
+        Record in `metadata_to_inherit` what each block under the container at `url` inherits,
+        given the container's inheritable `metadata` (its own and what it inherits itself).
+
+        Entries only ever get replaced, never modified, so they are built by copying one level
+        of dict rather than deep copying, and all the leaves of a container share one entry.
+        """
+        branch = self.get_branch_setting()
+        leaf_metadata = None
+
+        # go through all the children and recurse, but only if we have
+        # in the result set. Remember results will not contain leaf nodes
+        for child in results_by_url[url].get('definition', {}).get('children', []):
+            # WARNING: 'parent' is not part of inherited metadata, but
+            # we're piggybacking on this recursive traversal to grab
+            # and cache the child's parent, as a performance optimization.
+            # The 'parent' key will be popped out of the dictionary during
+            # CachingDescriptorSystem.load_item
+            if child in results_by_url:
+                child_metadata = dict(metadata)
+                child_metadata.update(results_by_url[child].get('metadata', {}))
+                metadata_to_inherit[child] = dict(child_metadata, parent={branch: url})
+                self._inherit_metadata_down(results_by_url, child, child_metadata, metadata_to_inherit)
+            else:
+                # this is likely a leaf node, so let's record what metadata we need to inherit
+                if leaf_metadata is None:
+                    leaf_metadata = dict(metadata, parent={branch: url})
+                metadata_to_inherit[child] = leaf_metadata
+
+    def _compute_metadata_inheritance_tree(self, course_id):
+        '''
+        Find all inheritable fields from all xblocks in the course which may define inheritable data
+        '''
+        # get all collections in the course, this query should not return any leaf nodes
+        course_id = self.fill_in_run(course_id)
+        query = SON([
+            ('_id.tag', 'i4x'),
+            ('_id.org', course_id.org),
+            ('_id.course', course_id.course),
+            ('_id.category', {'$in': BLOCK_TYPES_WITH_CHILDREN})
+        ])
+        results_by_url, root = self._find_inheritance_containers(course_id, query)
 
+        # now traverse the tree and compute down the inherited metadata
+        metadata_to_inherit = {}
         if root is not None:
-            _compute_inherited_metadata(root)
+            self._inherit_metadata_down(
+                results_by_url, root, results_by_url[root].get('metadata', {}), metadata_to_inherit
+            )
 
         return metadata_to_inherit
 
+    def _request_cache_metadata_inheritance_tree(self, course_id, tree):
+        """
+        Put the metadata inheritance tree of the course in the request cache, if available.
+        """
+        if self.request_cache is not None:
+            # we can't assume the 'metadatat_inheritance' part of the request cache dict has been
+            # defined
+            if 'metadata_inheritance' not in self.request_cache.data:
+                self.request_cache.data['metadata_inheritance'] = {}
+            self.request_cache.data['metadata_inheritance'][unicode(course_id)] = tree
+
     def _get_cached_metadata_inheritance_tree(self, course_id, force_refresh=False):
         '''
         Compute the metadata inheritance for the course.
@@ -760,7 +792,9 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
                 )
 
         if not tree:
-            # if not in subsystem, or we are on force refresh, then we have to compute
+            # if not in subsystem, or we are on force refresh, then we have to compute. Start a
+            # new generation first, so that a concurrent patch of the cached tree notices this.
+            self._bump_metadata_inheritance_generation(course_id)
             tree = self._compute_metadata_inheritance_tree(course_id)
 
             # now write out computed tree to caching subsystem (e.g. memcached), if available
@@ -770,15 +804,32 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         # now populate a request_cache, if available. NOTE, we are outside of the
         # scope of the above if: statement so that after a memcache hit, it'll get
         # put into the request_cache
-        if self.request_cache is not None:
-            # we can't assume the 'metadatat_inheritance' part of the request cache dict has been
-            # defined
-            if 'metadata_inheritance' not in self.request_cache.data:
-                self.request_cache.data['metadata_inheritance'] = {}
-            self.request_cache.data['metadata_inheritance'][unicode(course_id)] = tree
+        self._request_cache_metadata_inheritance_tree(course_id, tree)
 
         return tree
 
+    def _metadata_inheritance_generation_key(self, course_id):
+        """
+        Return the key of the generation of the cached metadata inheritance tree of the course.
+        """
+        return u'{}.inheritance_generation'.format(course_id)
+
+    def _bump_metadata_inheritance_generation(self, course_id):
+        """
+        Atomically increment the generation of the cached metadata inheritance tree of the course,
+        and return it, or None if there is none (or the caching subsystem can't increment it).
+        """
+        incr = getattr(self.metadata_inheritance_cache_subsystem, 'incr', None)
+        if incr is None:
+            return None
+        key = self._metadata_inheritance_generation_key(course_id)
+        try:
+            return incr(key)
+        except ValueError:
+            # the key isn't set (yet)
+            self.metadata_inheritance_cache_subsystem.add(key, 0)
+            return None
+
     def refresh_cached_metadata_inheritance_tree(self, course_id, runtime=None):
         """
         Refresh the cached metadata inheritance tree for the org/course combination
@@ -794,6 +845,120 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             if runtime:
                 runtime.cached_metadata = cached_metadata
 
+    def _update_cached_metadata_inheritance_subtree(self, location, runtime=None):
+        """
+        Update the cached metadata inheritance tree of the course after the inheritable metadata
+        or the children of the container at `location` changed.
+
+        Only the containers under `location` are read back, and only the part of the tree under it
+        is recomputed. The whole tree is refreshed instead if it isn't cached yet, if `location` is
+        the course itself, or if the cached tree doesn't say where `location` sits.
+
+        The caching subsystem has no compare-and-set, so the patched tree is only written after
+        claiming the next generation of the tree (see `_bump_metadata_inheritance_generation`).
+        If another process wrote or claimed the tree since it was read, the whole tree is refreshed
+        instead, so that neither change is lost.
+
+        If given a runtime, it replaces the cached_metadata in that runtime.
+        """
+        course_id = self.fill_in_run(location.course_key.for_branch(None))
+        if self._is_in_bulk_operation(course_id):
+            # the whole tree gets refreshed at the end of the bulk operation
+            return
+
+        generation = tree = None
+        if self.metadata_inheritance_cache_subsystem is not None:
+            # the request cache may hold an older tree than the one shared with other processes
+            generation = self.metadata_inheritance_cache_subsystem.get(
+                self._metadata_inheritance_generation_key(course_id)
+            )
+            if generation is not None:
+                tree = self.metadata_inheritance_cache_subsystem.get(unicode(course_id))
+        elif self.request_cache is not None:
+            tree = self.request_cache.data.get('metadata_inheritance', {}).get(unicode(course_id))
+        if not tree or location.category == 'course':
+            self.refresh_cached_metadata_inheritance_tree(course_id, runtime)
+            return
+
+        branch = self.get_branch_setting()
+        url = unicode(as_published(location))
+        if url not in tree:
+            # nothing in the course is under this container (e.g. it isn't attached to a parent yet)
+            return
+        parent_url = tree[url].get('parent', {}).get(branch)
+        if parent_url is None:
+            self.refresh_cached_metadata_inheritance_tree(course_id, runtime)
+            return
+
+        # read the subtree of containers under location, one level at a time
+        results_by_url = {}
+        level = [url]
+        if parent_url not in tree:
+            # the parent is the course, which has no entry of its own
+            level.append(parent_url)
+        while level:
+            locations = [course_id.make_usage_key_from_deprecated_string(level_url) for level_url in level]
+            query = SON([
+                ('_id.tag', 'i4x'),
+                ('_id.org', course_id.org),
+                ('_id.course', course_id.course),
+                ('_id.category', {'$in': list(set(level_location.category for level_location in locations))}),
+                ('_id.name', {'$in': list(set(level_location.name for level_location in locations))}),
+            ])
+            level_results, __ = self._find_inheritance_containers(course_id, query)
+            level_results = {
+                result_url: result for result_url, result in level_results.iteritems()
+                if result_url in level and result_url not in results_by_url
+            }
+            results_by_url.update(level_results)
+            level = [
+                child
+                for result_url, result in level_results.iteritems() if result_url != parent_url
+                for child in result.get('definition', {}).get('children', [])
+                if child not in results_by_url and
+                course_id.make_usage_key_from_deprecated_string(child).category in BLOCK_TYPES_WITH_CHILDREN
+            ]
+        if url not in results_by_url:
+            self.refresh_cached_metadata_inheritance_tree(course_id, runtime)
+            return
+
+        # drop the entries of everything that was under location
+        children_by_parent = {}
+        for child_url, entry in tree.iteritems():
+            children_by_parent.setdefault(entry.get('parent', {}).get(branch), []).append(child_url)
+        tree = dict(tree)
+        stale = [url]
+        while stale:
+            for child_url in children_by_parent.pop(stale.pop(), []):
+                del tree[child_url]
+                stale.append(child_url)
+
+        # and compute them again, starting from what location inherits from its parent
+        if parent_url in tree:
+            metadata = dict(tree[parent_url])
+            metadata.pop('parent', None)
+        else:
+            metadata = dict(results_by_url.get(parent_url, {}).get('metadata', {}))
+        metadata.update(results_by_url[url].get('metadata', {}))
+        tree[url] = dict(metadata, parent={branch: parent_url})
+        self._inherit_metadata_down(results_by_url, url, metadata, tree)
+
+        if self.metadata_inheritance_cache_subsystem is not None:
+            if self._bump_metadata_inheritance_generation(course_id) != generation + 1:
+                # the tree changed since it was read
+                self.refresh_cached_metadata_inheritance_tree(course_id, runtime)
+                return
+            self.metadata_inheritance_cache_subsystem.set(unicode(course_id), tree)
+            generation_key = self._metadata_inheritance_generation_key(course_id)
+            if self.metadata_inheritance_cache_subsystem.get(generation_key) != generation + 1:
+                # someone else claimed the tree while it was being written, maybe having read the
+                # tree before this patch
+                self.refresh_cached_metadata_inheritance_tree(course_id, runtime)
+                return
+        self._request_cache_metadata_inheritance_tree(course_id, tree)
+        if runtime:
+            runtime.cached_metadata = tree
+
     def _clean_item_data(self, item):
         """
         Renames the '_id' field in item to 'location'
@@ -1417,8 +1582,10 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             # update the edit info of the instantiated xblock
             xblock._edit_info = payload['edit_info']
 
-            # recompute (and update) the metadata inheritance tree which is cached
-            self.refresh_cached_metadata_inheritance_tree(xblock.scope_ids.usage_id.course_key, xblock.runtime)
+            # update the metadata inheritance tree which is cached. It only holds what containers pass
+            # down to their children, so it doesn't change when a leaf is edited.
+            if xblock.scope_ids.block_type in BLOCK_TYPES_WITH_CHILDREN:
+                self._update_cached_metadata_inheritance_subtree(xblock.scope_ids.usage_id, xblock.runtime)
             # fire signal that we've written to DB
         except ItemNotFoundError:
             if not allow_not_found:
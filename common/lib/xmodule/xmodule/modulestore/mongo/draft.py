@@ -730,9 +730,7 @@ class DraftModuleStore(MongoModuleStore):
 
         if self.signal_handler and not bulk_record.active:
             self.signal_handler.send("course_published", course_key=course_key)
-
-        # Now it's been published, add the object to the courseware search index so that it appears in search results
-        CoursewareSearchIndexer.do_publish_index(self, location)
+        self._send_item_published(location)
 
         return self.get_item(as_published(location))
 
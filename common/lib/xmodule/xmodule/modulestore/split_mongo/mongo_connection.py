@@ -1,7 +1,9 @@
 """
 Segregation of pymongo functions from the data modeling mechanisms for split modulestore.
 """
+import cPickle as pickle
 import re
+import zlib
 from mongodb_proxy import autoretry_read, MongoProxy
 import pymongo
 
@@ -70,16 +72,55 @@ def structure_to_mongo(structure):
     return new_structure
 
 
+class CourseStructureCache(object):
+    """
+    Stores structures (as returned by structure_from_mongo) in a cache that
+    may be shared between processes, such as memcached.
+
+    Structures are never changed once they are saved, so they are cached by
+    version guid and never need to be invalidated. They are pickled and
+    compressed to keep large courses within the cache's value size limits.
+    """
+    def __init__(self, cache):
+        """
+        Arguments:
+            cache: An object that implements the django cache get/set API
+        """
+        self.cache = cache
+
+    def get(self, key):
+        """
+        Return the structure whose version guid is `key`, or None if it isn't cached.
+        """
+        compressed_pickled_data = self.cache.get(unicode(key))
+        if compressed_pickled_data is None:
+            return None
+        return pickle.loads(zlib.decompress(compressed_pickled_data))
+
+    def set(self, key, structure):
+        """
+        Cache `structure` under the version guid `key`.
+        """
+        pickled_data = pickle.dumps(structure, pickle.HIGHEST_PROTOCOL)
+        # Compression level 1 is much faster than the default and compresses
+        # structures nearly as well
+        self.cache.set(unicode(key), zlib.compress(pickled_data, 1))
+
+
 class MongoConnection(object):
     """
     Segregation of pymongo functions from the data modeling mechanisms for split modulestore.
     """
     def __init__(
         self, db, collection, host, port=27017, tz_aware=True, user=None, password=None,
-        asset_collection=None, retry_wait_time=0.1, **kwargs
+        asset_collection=None, retry_wait_time=0.1, structure_cache=None, **kwargs
     ):
         """
         Create & open the connection, authenticate, and provide pointers to the collections
+
+        structure_cache: An optional cache (implementing the django cache get/set API)
+            to keep structures in, so they don't have to be fetched from mongo each time
+            they are used
         """
         self.database = MongoProxy(
             pymongo.database.Database(
@@ -97,6 +138,11 @@ class MongoConnection(object):
         if user is not None and password is not None:
             self.database.authenticate(user, password)
 
+        if structure_cache is not None:
+            self.structure_cache = CourseStructureCache(structure_cache)
+        else:
+            self.structure_cache = None
+
         self.course_index = self.database[collection + '.active_versions']
         self.structures = self.database[collection + '.structures']
         self.definitions = self.database[collection + '.definitions']
@@ -122,7 +168,16 @@ class MongoConnection(object):
         """
         Get the structure from the persistence mechanism whose id is the given key
         """
-        return structure_from_mongo(self.structures.find_one({'_id': key}))
+        if self.structure_cache is not None:
+            structure = self.structure_cache.get(key)
+            if structure is not None:
+                return structure
+
+        structure = structure_from_mongo(self.structures.find_one({'_id': key}))
+
+        if self.structure_cache is not None:
+            self.structure_cache.set(key, structure)
+        return structure
 
     @autoretry_read()
     def find_structures_by_id(self, ids):
@@ -174,6 +229,8 @@ class MongoConnection(object):
         Insert a new structure into the database.
         """
         self.structures.insert(structure_to_mongo(structure))
+        if self.structure_cache is not None:
+            self.structure_cache.set(structure['_id'], structure)
 
     def get_course_index(self, key, ignore_case=False):
         """
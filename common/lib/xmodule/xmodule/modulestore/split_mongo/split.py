@@ -55,8 +55,10 @@ Representation:
 """
 import copy
 import datetime
+import functools
 import hashlib
 import logging
+import threading
 from contracts import contract, new_contract
 from importlib import import_module
 from mongodb_proxy import autoretry_read
@@ -82,7 +84,7 @@ from .caching_descriptor_system import CachingDescriptorSystem
 from xmodule.modulestore.split_mongo.mongo_connection import MongoConnection, DuplicateKeyError
 from xmodule.modulestore.split_mongo import BlockKey, CourseEnvelope
 from xmodule.error_module import ErrorDescriptor
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 from types import NoneType
 from xmodule.assetstore import AssetMetadata
 
@@ -110,6 +112,15 @@ log = logging.getLogger(__name__)
 # When blacklists are this, all children should be excluded
 EXCLUDE_ALL = '*'
 
+# How many saved structure versions keep their indexes in _STRUCTURE_INDEXES
+STRUCTURE_INDEX_CACHE_SIZE = 100
+
+# The indexes of saved structures, by structure version guid, least recently
+# used first: {version_guid: {index_name: index}}. Saved structures never
+# change, so their indexes are shared by all requests in the process.
+_STRUCTURE_INDEXES = OrderedDict()
+_STRUCTURE_INDEXES_LOCK = threading.Lock()
+
 
 new_contract('BlockUsageLocator', BlockUsageLocator)
 new_contract('BlockKey', BlockKey)
@@ -783,6 +794,84 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         else:
             self.request_cache.data['course_cache'] = {}
 
+    def _get_structure_index(self, course_entry, index_name, build_index):
+        """
+        Return the index called index_name of course_entry's structure, as built by
+        build_index(structure). The index must not be modified.
+
+        Saved structures never change, so their indexes are built once per structure
+        version and kept in _STRUCTURE_INDEXES, shared by all requests in the process.
+        Structures being edited in an active bulk operation are reindexed each time.
+        """
+        structure = course_entry.structure
+        bulk_write_record = self._get_bulk_ops_record(course_entry.course_key)
+        if bulk_write_record.active and structure['_id'] not in bulk_write_record.structures_in_db:
+            return build_index(structure)
+
+        with _STRUCTURE_INDEXES_LOCK:
+            indexes = _STRUCTURE_INDEXES.pop(structure['_id'], {})
+            # reinsert as the most recently used
+            _STRUCTURE_INDEXES[structure['_id']] = indexes
+            index = indexes.get(index_name)
+
+        if index is None:
+            # Built outside the lock; concurrent builds of the same index are identical
+            index = build_index(structure)
+            with _STRUCTURE_INDEXES_LOCK:
+                indexes[index_name] = index
+                while len(_STRUCTURE_INDEXES) > STRUCTURE_INDEX_CACHE_SIZE:
+                    _STRUCTURE_INDEXES.popitem(last=False)
+        return index
+
+    @staticmethod
+    def _build_block_type_index(structure):
+        """
+        Return a map of block_type to the tuple of BlockKeys of that type in structure.
+        """
+        index = defaultdict(list)
+        for block_key in structure['blocks']:
+            index[block_key.type].append(block_key)
+        return {block_type: tuple(block_keys) for block_type, block_keys in index.iteritems()}
+
+    @staticmethod
+    def _build_settings_index(field_name, structure):
+        """
+        Return a map of each hashable value of the settings field field_name in structure
+        to the tuple of BlockKeys which have it set to that value. For list values, each
+        element is indexed, as get_items matches any element of a list.
+        """
+        index = defaultdict(list)
+
+        def _add_value(block_key, value):
+            """
+            Index block_key under value, or under each element of value if it's a list
+            """
+            if isinstance(value, list):
+                for element in value:
+                    _add_value(block_key, element)
+                return
+            try:
+                index[value].append(block_key)
+            except TypeError:
+                # unhashable values can't equal any of the indexed criteria
+                pass
+
+        for block_key, block in structure['blocks'].iteritems():
+            if field_name in block.fields:
+                _add_value(block_key, block.fields[field_name])
+        return {value: tuple(set(block_keys)) for value, block_keys in index.iteritems()}
+
+    @staticmethod
+    def _build_parent_index(structure):
+        """
+        Return a map of each BlockKey in structure to the tuple of BlockKeys of its parents.
+        """
+        index = defaultdict(list)
+        for parent_block_key, block in structure['blocks'].iteritems():
+            for child in block.fields.get('children', []):
+                index[BlockKey(*child)].append(parent_block_key)
+        return {block_key: tuple(parents) for block_key, parents in index.iteritems()}
+
     def _lookup_course(self, course_key):
         """
         Decode the locator into the right series of db access. Does not
@@ -1084,8 +1173,32 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         # don't expect caller to know that children are in fields
         if 'children' in qualifiers:
             settings['children'] = qualifiers.pop('children')
-        for block_id, value in course.structure['blocks'].iteritems():
-            if _block_matches_all(value):
+
+        blocks = course.structure['blocks']
+        # Narrow the candidates using the indexes of the plain-valued criteria; regexes, callables
+        # and $in/$nin/$exists queries can only be decided by _block_matches_all
+        candidate_sets = []
+        if isinstance(qualifiers.get('block_type'), basestring):
+            # only the blocks of the requested type can match
+            block_type_index = self._get_structure_index(course, 'block_type', self._build_block_type_index)
+            candidate_sets.append(block_type_index.get(qualifiers['block_type'], ()))
+        for field_name, criteria in settings.iteritems():
+            if isinstance(criteria, (basestring, bool, int, long, float, BlockKey)):
+                settings_index = self._get_structure_index(
+                    course, 'settings.' + field_name, functools.partial(self._build_settings_index, field_name)
+                )
+                candidate_sets.append(settings_index.get(criteria, ()))
+
+        if candidate_sets:
+            candidate_sets.sort(key=len)
+            block_keys = candidate_sets[0]
+            for other_keys in candidate_sets[1:]:
+                other_keys = set(other_keys)
+                block_keys = [block_key for block_key in block_keys if block_key in other_keys]
+        else:
+            block_keys = blocks.iterkeys()
+        for block_id in block_keys:
+            if _block_matches_all(blocks[block_id]):
                 items.append(block_id)
 
         if len(items) > 0:
@@ -1106,11 +1219,12 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             raise ItemNotFoundError(locator)
 
         course = self._lookup_course(locator.course_key)
-        parent_ids = self._get_parents_from_structure(BlockKey.from_usage_key(locator), course.structure)
+        parent_index = self._get_structure_index(course, 'parents', self._build_parent_index)
+        parent_ids = parent_index.get(BlockKey.from_usage_key(locator), [])
         if len(parent_ids) == 0:
             return None
         # find alphabetically least
-        parent_ids.sort(key=lambda parent: (parent.type, parent.id))
+        parent_ids = sorted(parent_ids, key=lambda parent: (parent.type, parent.id))
         return BlockUsageLocator.make_relative(
             locator,
             block_type=parent_ids[0].type,
@@ -355,9 +355,7 @@ class DraftVersioningModuleStore(SplitMongoModuleStore, ModuleStoreDraftAndPubli
             [location],
             blacklist=blacklist
         )
-
-        # Now it's been published, add the object to the courseware search index so that it appears in search results
-        CoursewareSearchIndexer.do_publish_index(self, location)
+        self._send_item_published(location.version_agnostic().for_branch(None))
 
         return self.get_item(location.for_branch(ModuleStoreEnum.BranchName.published), **kwargs)
 
@@ -419,11 +419,12 @@ class TestMixedModuleStore(CourseComparisonTest):
                 revision=ModuleStoreEnum.RevisionOption.draft_preferred
             )
 
-    # draft: get draft, get ancestors up to course (2-6), compute inheritance
+    # draft: get draft, get ancestors up to course (2-6)
+    #    (no inheritance recompute: a leaf's own settings aren't part of the inheritance tree)
     #    sends: update problem and then each ancestor up to course (edit info)
     # split: active_versions, definitions (calculator field), structures
     #  2 sends to update index & structure (note, it would also be definition if a content field changed)
-    @ddt.data(('draft', 7, 5), ('split', 3, 2))
+    @ddt.data(('draft', 6, 5), ('split', 3, 2))
     @ddt.unpack
     def test_update_item(self, default_ms, max_find, max_send):
         """
@@ -2049,3 +2050,34 @@ class TestMixedModuleStore(CourseComparisonTest):
                         create_if_not_present=True,
                     )
                     self.assertEqual(receiver.call_count, 2)
+
+    @ddt.data(ModuleStoreEnum.Type.mongo, ModuleStoreEnum.Type.split)
+    def test_item_publish_signal_firing(self, default):
+        with MongoContentstoreBuilder().build() as contentstore:
+            self.store = MixedModuleStore(
+                contentstore=contentstore,
+                create_modulestore_instance=create_modulestore_instance,
+                mappings={},
+                signal_handler=SignalHandler(MixedModuleStore),
+                **self.OPTIONS
+            )
+            self.addCleanup(self.store.close_all_connections)
+
+            with self.store.default_store(default):
+                course = self.store.create_course('org_x', 'course_y', 'run_z', self.user_id)
+                chapter = self.store.create_child(self.user_id, course.location, 'chapter')
+                sequential = self.store.create_child(self.user_id, chapter.location, 'sequential')
+                vertical = self.store.create_child(self.user_id, sequential.location, 'vertical')
+
+                with mock_signal_receiver(SignalHandler.item_published) as receiver:
+                    self.store.publish(vertical.location, self.user_id)
+                    self.assertEqual(receiver.call_count, 1)
+                    self.assertEqual(receiver.call_args[1]['usage_key'].block_id, vertical.location.block_id)
+
+                    # Publishing in a bulk operation is announced once it has ended
+                    receiver.reset_mock()
+                    with self.store.bulk_operations(course.id):
+                        self.store.publish(vertical.location, self.user_id)
+                        self.store.publish(vertical.location, self.user_id)
+                        self.assertEqual(receiver.call_count, 0)
+                    self.assertEqual(receiver.call_count, 1)
@@ -11,11 +11,13 @@ from path import path
 import pymongo
 import logging
 import shutil
+import tarfile
 from tempfile import mkdtemp
 from uuid import uuid4
 from datetime import datetime
 from pytz import UTC
 import unittest
+from mock import patch
 from xblock.core import XBlock
 
 from xblock.fields import Scope, Reference, ReferenceList, ReferenceValueDict
@@ -56,6 +58,22 @@ DEFAULT_CLASS = 'xmodule.raw_module.RawDescriptor'
 RENDER_TEMPLATE = lambda t_n, d, ctx=None, nsp='main': ''
 
 
+class MemoryCache(dict):
+    """ A dict with the get/set/add/incr interface of a django cache """
+    set = dict.__setitem__
+
+    def add(self, key, value):
+        """ Set `key` to `value` unless it is set already """
+        self.setdefault(key, value)
+
+    def incr(self, key):
+        """ Increment the number at `key`, raising ValueError if it isn't set """
+        if key not in self:
+            raise ValueError("Key '{}' not found".format(key))
+        self[key] += 1
+        return self[key]
+
+
 class ReferenceTestXBlock(XBlock, XModuleMixin):
     """
     Test xblock type to test the reference field types
@@ -500,6 +518,59 @@ class TestMongoModuleStore(TestMongoModuleStoreBase):
         check_xblock_fields()
         check_mongo_fields()
 
+    def test_update_container_patches_inheritance_tree(self):
+        """
+        Updating a container should patch the cached inheritance tree under it
+        rather than recomputing the tree of the whole course.
+        """
+        course_key = SlashSeparatedCourseKey('edX', 'toy', '2012_Fall')
+        self.draft_store.metadata_inheritance_cache_subsystem = MemoryCache()
+        self.addCleanup(setattr, self.draft_store, 'metadata_inheritance_cache_subsystem', None)
+        self.draft_store._get_cached_metadata_inheritance_tree(course_key)
+
+        chapter = self.draft_store.get_course(course_key).get_children()[0]
+        chapter.days_early_for_beta = 2.0
+        with patch.object(self.draft_store, 'refresh_cached_metadata_inheritance_tree') as mock_refresh:
+            self.draft_store.update_item(chapter, 999)
+        assert_false(mock_refresh.called)
+        self.addCleanup(self.draft_store.update_item, chapter, 999)
+        self.addCleanup(delattr, chapter, 'days_early_for_beta')
+
+        tree = self.draft_store._get_cached_metadata_inheritance_tree(course_key)
+        assert_equals(tree, self.draft_store._compute_metadata_inheritance_tree(course_key))
+        for child in chapter.children:
+            assert_equals(tree[unicode(child)]['days_early_for_beta'], 2.0)
+
+    def test_concurrent_inheritance_tree_write_refreshes_tree(self):
+        """
+        If the cached inheritance tree is written by someone else while a container update patches
+        it, the whole tree should be refreshed instead of writing the patch.
+        """
+        course_key = SlashSeparatedCourseKey('edX', 'toy', '2012_Fall')
+        cache = MemoryCache()
+        self.draft_store.metadata_inheritance_cache_subsystem = cache
+        self.addCleanup(setattr, self.draft_store, 'metadata_inheritance_cache_subsystem', None)
+        self.draft_store._get_cached_metadata_inheritance_tree(course_key)
+
+        find_inheritance_containers = self.draft_store._find_inheritance_containers
+
+        def find_while_tree_is_written(*args):
+            """ Another process writes the cached tree while the patch is being computed """
+            cache.incr(self.draft_store._metadata_inheritance_generation_key(course_key))
+            return find_inheritance_containers(*args)
+
+        chapter = self.draft_store.get_course(course_key).get_children()[0]
+        chapter.days_early_for_beta = 2.0
+        with patch.object(self.draft_store, '_find_inheritance_containers', side_effect=find_while_tree_is_written):
+            self.draft_store.update_item(chapter, 999)
+        self.addCleanup(self.draft_store.update_item, chapter, 999)
+        self.addCleanup(delattr, chapter, 'days_early_for_beta')
+
+        tree = self.draft_store._get_cached_metadata_inheritance_tree(course_key)
+        assert_equals(tree, self.draft_store._compute_metadata_inheritance_tree(course_key))
+        for child in chapter.children:
+            assert_equals(tree[unicode(child)]['days_early_for_beta'], 2.0)
+
     def test_export_course_image(self):
         """
         Test to make sure that we have a course image in the contentstore,
@@ -519,6 +590,61 @@ class TestMongoModuleStore(TestMongoModuleStoreBase):
         finally:
             shutil.rmtree(root_dir)
 
+    def test_export_course_to_tarball(self):
+        """
+        Make sure that exporting into a tarball streams the assets into it
+        without writing them to the export directory.
+        """
+        course_key = SlashSeparatedCourseKey('edX', 'simple', '2012_Fall')
+
+        root_dir = path(mkdtemp())
+        try:
+            with tarfile.open(root_dir / 'test_export.tar.gz', 'w:gz') as tar_file:
+                export_course_to_xml(
+                    self.draft_store, self.content_store, course_key, root_dir, 'test_export', tar_file
+                )
+            assert_false(path(root_dir / 'test_export/static/images_course_image.jpg').isfile())
+            with tarfile.open(root_dir / 'test_export.tar.gz') as tar_file:
+                names = tar_file.getnames()
+                course_image = tar_file.extractfile('test_export/static/images_course_image.jpg').read()
+            assert_in('test_export/course.xml', names)
+            assert_in('test_export/policies/assets.json', names)
+            assert_in('test_export/static/images/course_image.jpg', names)
+            assert_equals(
+                course_image,
+                self.content_store.find(course_key.make_asset_key('asset', 'images_course_image.jpg')).data
+            )
+        finally:
+            shutil.rmtree(root_dir)
+
+    def test_export_course_to_tarball_imported_course_image(self):
+        """
+        Make sure that a default course image that was imported from
+        static/images/course_image.jpg is only added to the tarball once.
+        """
+        course_key = SlashSeparatedCourseKey('edX', 'simple', '2012_Fall')
+        location = course_key.make_asset_key('asset', 'images_course_image.jpg')
+        attrs = self.content_store.get_attrs(location)
+        self.content_store.set_attrs(
+            location, {'displayname': 'course_image.jpg', 'import_path': 'images/course_image.jpg'}
+        )
+        self.addCleanup(
+            self.content_store.set_attrs, location,
+            {'displayname': attrs['displayname'], 'import_path': attrs.get('import_path')}
+        )
+
+        root_dir = path(mkdtemp())
+        try:
+            with tarfile.open(root_dir / 'test_export.tar.gz', 'w:gz') as tar_file:
+                export_course_to_xml(
+                    self.draft_store, self.content_store, course_key, root_dir, 'test_export', tar_file
+                )
+            with tarfile.open(root_dir / 'test_export.tar.gz') as tar_file:
+                names = tar_file.getnames()
+            assert_equals(names.count('test_export/static/images/course_image.jpg'), 1)
+        finally:
+            shutil.rmtree(root_dir)
+
     def test_export_course_image_nondefault(self):
         """
         Make sure that if a non-default image path is specified that we
@@ -10,6 +10,7 @@ import unittest
 import uuid
 
 from contracts import contract
+from mock import Mock, patch
 from nose.plugins.attrib import attr
 
 from xblock.fields import Reference, ReferenceList, ReferenceValueDict
@@ -950,6 +951,82 @@ class SplitModuleItemTests(SplitModuleTest):
         matches = modulestore().get_items(locator, settings={'group_access': {'$exists': False}})
         self.assertEqual(len(matches), 6)
 
+    def test_get_items_by_category_index(self):
+        """
+        Test that get_items by category sees blocks created after the
+        block_type index was built, including within a bulk operation
+        """
+        store = modulestore()
+        store.request_cache = Mock(data={})
+        locator = CourseLocator(org='testx', course='GreekHero', run="run", branch=BRANCH_NAME_DRAFT)
+        course_usage_key = locator.make_usage_key('course', 'head12345')
+        self.assertEqual(len(store.get_items(locator, qualifiers={'category': 'chapter'})), 3)
+
+        with store.bulk_operations(locator):
+            store.create_child(self.user_id, course_usage_key, 'chapter', fields={'display_name': 'chapter 4'})
+            self.assertEqual(len(store.get_items(locator, qualifiers={'category': 'chapter'})), 4)
+            store.create_child(self.user_id, course_usage_key, 'chapter', fields={'display_name': 'chapter 5'})
+            self.assertEqual(len(store.get_items(locator, qualifiers={'category': 'chapter'})), 5)
+
+        self.assertEqual(len(store.get_items(locator, qualifiers={'category': 'chapter'})), 5)
+        self.assertEqual(len(store.get_items(locator, qualifiers={'category': 'garbage'})), 0)
+
+    def test_block_type_index_shared_across_requests(self):
+        """
+        Test that the block_type index of a saved structure is only built once,
+        not once per request
+        """
+        store = modulestore()
+        locator = CourseLocator(org='testx', course='GreekHero', run="run", branch=BRANCH_NAME_DRAFT)
+        store.get_items(locator, qualifiers={'category': 'chapter'})
+        store.request_cache = Mock(data={})
+        with patch.object(SplitMongoModuleStore, '_build_block_type_index') as mock_build:
+            self.assertEqual(len(store.get_items(locator, qualifiers={'category': 'chapter'})), 3)
+        self.assertFalse(mock_build.called)
+
+    def test_get_items_by_settings_index(self):
+        """
+        Test that get_items finds blocks by plain settings values through the settings
+        indexes, and still applies the other criteria to them
+        """
+        store = modulestore()
+        locator = CourseLocator(org='testx', course='GreekHero', run="run", branch=BRANCH_NAME_DRAFT)
+        matches = store.get_items(locator, settings={'display_name': 'Hera cuckolds Zeus'})
+        self.assertEqual([match.location.block_id for match in matches], ['chapter3'])
+        matches = store.get_items(
+            locator, qualifiers={'category': 'problem'}, settings={'display_name': 'Hera cuckolds Zeus'}
+        )
+        self.assertEqual(matches, [])
+        matches = store.get_items(
+            locator, qualifiers={'category': 'chapter'}, settings={'display_name': 'Hercules', 'graceperiod': None}
+        )
+        self.assertEqual(matches, [])
+        self.assertEqual(len(store.get_items(locator, settings={'display_name': 'garbage'})), 0)
+
+        store.request_cache = Mock(data={})
+        with patch.object(SplitMongoModuleStore, '_build_settings_index') as mock_build:
+            matches = store.get_items(
+                locator, qualifiers={'category': 'chapter'}, settings={'display_name': 'Hercules'}
+            )
+        self.assertEqual([match.location.block_id for match in matches], ['chapter1'])
+        self.assertFalse(mock_build.called)
+
+    def test_parent_index_shared_across_requests(self):
+        """
+        Test that the parent index of a saved structure is only built once,
+        not once per request
+        """
+        store = modulestore()
+        locator = BlockUsageLocator(
+            CourseLocator(org='testx', course='GreekHero', run="run", branch=BRANCH_NAME_DRAFT),
+            'chapter', block_id='chapter1'
+        )
+        store.get_parent_location(locator)
+        store.request_cache = Mock(data={})
+        with patch.object(SplitMongoModuleStore, '_build_parent_index') as mock_build:
+            self.assertEqual(store.get_parent_location(locator).block_id, 'head12345')
+        self.assertFalse(mock_build.called)
+
     def test_get_parents(self):
         '''
         get_parent_location(locator): BlockUsageLocator
@@ -971,6 +1048,29 @@ class SplitModuleItemTests(SplitModuleTest):
         parent = modulestore().get_parent_location(locator)
         self.assertIsNone(parent)
 
+    def test_get_parents_index(self):
+        """
+        Test that get_parent_location, which uses a child to parent index when
+        there's a request cache, sees blocks added in later versions and
+        within bulk operations
+        """
+        store = modulestore()
+        store.request_cache = Mock(data={})
+        course_key = CourseLocator(org='testx', course='GreekHero', run="run", branch=BRANCH_NAME_DRAFT)
+        chapter = course_key.make_usage_key('chapter', 'chapter1')
+        self.assertEqual(store.get_parent_location(chapter).block_id, 'head12345')
+
+        sequential = store.create_child(self.user_id, chapter, 'sequential').location
+        self.assertEqual(store.get_parent_location(sequential.version_agnostic()).block_id, 'chapter1')
+
+        with store.bulk_operations(course_key):
+            vertical = store.create_child(self.user_id, sequential.version_agnostic(), 'vertical').location
+            self.assertEqual(
+                store.get_parent_location(vertical.version_agnostic()).block_id, sequential.block_id
+            )
+        self.assertEqual(store.get_parent_location(vertical.version_agnostic()).block_id, sequential.block_id)
+        self.assertEqual(store.get_parent_location(chapter).block_id, 'head12345')
+
     def test_get_children(self):
         """
         Test the existing get_children method on xdescriptors
@@ -0,0 +1,72 @@
+"""
+Tests of the split modulestore's shared structure cache
+"""
+import unittest
+from bson.objectid import ObjectId
+from mock import Mock
+
+from xmodule.modulestore import BlockData
+from xmodule.modulestore.split_mongo import BlockKey
+from xmodule.modulestore.split_mongo.mongo_connection import (
+    CourseStructureCache, MongoConnection, structure_from_mongo
+)
+
+
+class DictCache(dict):
+    """
+    A minimal stand-in for a django cache
+    """
+    def set(self, key, value):  # pylint: disable=arguments-differ
+        self[key] = value
+
+
+class TestCourseStructureCache(unittest.TestCase):
+    """
+    Tests of CourseStructureCache and its use by MongoConnection
+    """
+    def setUp(self):
+        super(TestCourseStructureCache, self).setUp()
+        self.cache = DictCache()
+        self.version_guid = ObjectId()
+        self.mongo_structure = {
+            '_id': self.version_guid,
+            'root': ['course', 'course'],
+            'blocks': [{
+                'block_type': 'course',
+                'block_id': 'course',
+                'fields': {'children': [['chapter', 'week1']]},
+                'definition': ObjectId(),
+                'defaults': {},
+                'edit_info': {},
+            }],
+        }
+        self.connection = Mock(spec=MongoConnection)
+        self.connection.structure_cache = CourseStructureCache(self.cache)
+        self.connection.structures = Mock()
+        self.connection.structures.find_one.side_effect = lambda query: dict(
+            self.mongo_structure,
+            blocks=[dict(block) for block in self.mongo_structure['blocks']],
+        )
+
+    def test_round_trip(self):
+        structure = structure_from_mongo(dict(self.mongo_structure))
+        self.connection.structure_cache.set(self.version_guid, structure)
+
+        cached = self.connection.structure_cache.get(self.version_guid)
+        self.assertEqual(cached['root'], BlockKey('course', 'course'))
+        block = cached['blocks'][BlockKey('course', 'course')]
+        self.assertIsInstance(block, BlockData)
+        self.assertEqual(block.fields['children'], [BlockKey('chapter', 'week1')])
+
+    def test_miss(self):
+        self.assertIsNone(self.connection.structure_cache.get(ObjectId()))
+
+    def test_get_structure_reads_through_cache(self):
+        first = MongoConnection.get_structure(self.connection, self.version_guid)
+        second = MongoConnection.get_structure(self.connection, self.version_guid)
+
+        self.assertEqual(self.connection.structures.find_one.call_count, 1)
+        self.assertEqual(first['root'], second['root'])
+        self.assertEqual(first['blocks'].keys(), second['blocks'].keys())
+        # Each read returns its own copy, so callers may modify it
+        self.assertIsNot(first, second)
@@ -104,7 +104,7 @@ class ExportManager(object):
     """
     Manages XML exporting for courselike objects.
     """
-    def __init__(self, modulestore, contentstore, courselike_key, root_dir, target_dir):
+    def __init__(self, modulestore, contentstore, courselike_key, root_dir, target_dir, tar_file=None):
         """
         Export all modules from `modulestore` and content from `contentstore` as xml to `root_dir`.
 
@@ -113,12 +113,15 @@ class ExportManager(object):
         `courselike_key`: The Locator of the Descriptor to export
         `root_dir`: The directory to write the exported xml to
         `target_dir`: The name of the directory inside `root_dir` to write the content to
+        `tar_file`: An open `tarfile.TarFile` to add the export to, under `target_dir`. The static
+            assets are then streamed from `contentstore` into it without being written to `root_dir`.
         """
         self.modulestore = modulestore
         self.contentstore = contentstore
         self.courselike_key = courselike_key
         self.root_dir = root_dir
         self.target_dir = target_dir
+        self.tar_file = tar_file
 
     @abstractmethod
     def get_key(self):
@@ -148,6 +151,39 @@ class ExportManager(object):
         Get the target courselike object for this export.
         """
 
+    def export_assets(self, root_courselike_dir):
+        """
+        Export the static assets of the courselike and their policy file.
+        """
+        if self.tar_file is None:
+            self.contentstore.export_all_for_course(
+                self.courselike_key,
+                root_courselike_dir + '/static/',
+                root_courselike_dir + '/policies/assets.json',
+            )
+        else:
+            self.contentstore.export_all_for_course_to_tar(
+                self.courselike_key,
+                self.tar_file,
+                self.target_dir + '/static',
+                root_courselike_dir + '/policies/assets.json',
+            )
+
+    def export_legacy_course_image(self, course_image, root_courselike_dir):
+        """
+        Write the default `course_image` to static/images/course_image.jpg, unless
+        the asset itself was already added to the tarball under that name.
+        """
+        if self.tar_file is not None:
+            arcname = self.target_dir + '/static/images/course_image.jpg'
+            if arcname.encode('utf-8') in self.tar_file.getnames():
+                return
+        output_dir = root_courselike_dir + '/static/images/'
+        if not os.path.isdir(output_dir):
+            os.makedirs(output_dir)
+        with OSFS(output_dir).open('course_image.jpg', 'wb') as course_image_file:
+            course_image_file.write(course_image.data)
+
     def export(self):
         """
         Perform the export given the parameters handed to this class at init.
@@ -181,6 +217,9 @@ class ExportManager(object):
             # Any last pass adjustments
             self.post_process(root, export_fs)
 
+        if self.tar_file is not None:
+            self.tar_file.add(root_courselike_dir, arcname=self.target_dir)
+
 
 class CourseExportManager(ExportManager):
     """
@@ -215,11 +254,7 @@ class CourseExportManager(ExportManager):
         # export the static assets
         policies_dir = export_fs.makeopendir('policies')
         if self.contentstore:
-            self.contentstore.export_all_for_course(
-                self.courselike_key,
-                root_courselike_dir + '/static/',
-                root_courselike_dir + '/policies/assets.json',
-            )
+            self.export_assets(root_courselike_dir)
 
             # If we are using the default course image, export it to the
             # legacy location to support backwards compatibility.
@@ -234,11 +269,7 @@ class CourseExportManager(ExportManager):
                 except NotFoundError:
                     pass
                 else:
-                    output_dir = root_courselike_dir + '/static/images/'
-                    if not os.path.isdir(output_dir):
-                        os.makedirs(output_dir)
-                    with OSFS(output_dir).open('course_image.jpg', 'wb') as course_image_file:
-                        course_image_file.write(course_image.data)
+                    self.export_legacy_course_image(course_image, root_courselike_dir)
 
         # export the static tabs
         export_extra_content(
@@ -313,11 +344,7 @@ class LibraryExportManager(ExportManager):
         export_fs.makeopendir('policies')
 
         if self.contentstore:
-            self.contentstore.export_all_for_course(
-                self.courselike_key,
-                self.root_dir + '/' + self.target_dir + '/static/',
-                self.root_dir + '/' + self.target_dir + '/policies/assets.json',
-            )
+            self.export_assets(root_courselike_dir)
 
     def post_process(self, root, export_fs):
         """
@@ -333,18 +360,18 @@ class LibraryExportManager(ExportManager):
         xml_file.close()
 
 
-def export_course_to_xml(modulestore, contentstore, course_key, root_dir, course_dir):
+def export_course_to_xml(modulestore, contentstore, course_key, root_dir, course_dir, tar_file=None):
     """
     Thin wrapper for the Course Export Manager. See ExportManager for details.
     """
-    CourseExportManager(modulestore, contentstore, course_key, root_dir, course_dir).export()
+    CourseExportManager(modulestore, contentstore, course_key, root_dir, course_dir, tar_file).export()
 
 
-def export_library_to_xml(modulestore, contentstore, library_key, root_dir, library_dir):
+def export_library_to_xml(modulestore, contentstore, library_key, root_dir, library_dir, tar_file=None):
     """
     Thin wrapper for the Library Export Manager. See ExportManager for details.
     """
-    LibraryExportManager(modulestore, contentstore, library_key, root_dir, library_dir).export()
+    LibraryExportManager(modulestore, contentstore, library_key, root_dir, library_dir, tar_file).export()
 
 
 def adapt_references(subtree, destination_course_key, export_fs):
@@ -22,6 +22,7 @@ Modulestore virtual   |          XML physical (draft, published)
 """
 import logging
 from abc import abstractmethod
+from multiprocessing.pool import ThreadPool
 from opaque_keys.edx.locator import LibraryLocator
 import os
 import mimetypes
@@ -52,6 +53,10 @@ from xmodule.modulestore.store_utilities import draft_node_constructor, get_draf
 log = logging.getLogger(__name__)
 
 
+# Number of static assets read, thumbnailed and saved to the contentstore at the same time during import
+STATIC_CONTENT_IMPORT_THREADS = 4
+
+
 def import_static_content(
         course_data_path, static_content_store,
         target_id, subpath='static', verbose=False):
@@ -74,9 +79,67 @@ def import_static_content(
     mimetypes.add_type('application/octet-stream', '.srt')
     mimetypes_list = mimetypes.types_map.values()
 
+    def import_static_file(content_path):
+        """
+        Import a single static file into the contentstore. Returns the (path, asset_key)
+        remapping for it, or None if it was skipped.
+        """
+        filename = os.path.basename(content_path)
+
+        if verbose:
+            log.debug('importing static content %s...', content_path)
+
+        try:
+            with open(content_path, 'rb') as f:
+                data = f.read()
+        except IOError:
+            if filename.startswith('._'):
+                # OS X "companion files". See
+                # http://www.diigo.com/annotated/0c936fda5da4aa1159c189cea227e174
+                return None
+            # Not a 'hidden file', then re-raise exception
+            raise
+
+        # strip away leading path from the name
+        fullname_with_subpath = content_path.replace(static_dir, '')
+        if fullname_with_subpath.startswith('/'):
+            fullname_with_subpath = fullname_with_subpath[1:]
+        asset_key = StaticContent.compute_location(target_id, fullname_with_subpath)
+
+        policy_ele = policy.get(asset_key.path, {})
+        displayname = policy_ele.get('displayname', filename)
+        locked = policy_ele.get('locked', False)
+        mime_type = policy_ele.get('contentType')
+
+        # Check extracted contentType in list of all valid mimetypes
+        if not mime_type or mime_type not in mimetypes_list:
+            mime_type = mimetypes.guess_type(filename)[0]   # Assign guessed mimetype
+        content = StaticContent(
+            asset_key, displayname, mime_type, data,
+            import_path=fullname_with_subpath, locked=locked
+        )
+
+        # first let's save a thumbnail so we can get back a thumbnail location
+        thumbnail_content, thumbnail_location = static_content_store.generate_thumbnail(content)
+
+        if thumbnail_content is not None:
+            content.thumbnail_location = thumbnail_location
+
+        # then commit the content
+        try:
+            static_content_store.save(content)
+        except Exception as err:
+            log.exception(u'Error importing {0}, error={1}'.format(
+                fullname_with_subpath, err
+            ))
+
+        # store the remapping information which will be needed
+        # to subsitute in the module data
+        return fullname_with_subpath, asset_key
+
+    content_paths = []
     for dirname, _, filenames in os.walk(static_dir):
         for filename in filenames:
-
             content_path = os.path.join(dirname, filename)
 
             if re.match(ASSET_IGNORE_REGEX, filename):
@@ -84,56 +147,17 @@ def import_static_content(
                     log.debug('skipping static content %s...', content_path)
                 continue
 
-            if verbose:
-                log.debug('importing static content %s...', content_path)
+            content_paths.append(content_path)
 
-            try:
-                with open(content_path, 'rb') as f:
-                    data = f.read()
-            except IOError:
-                if filename.startswith('._'):
-                    # OS X "companion files". See
-                    # http://www.diigo.com/annotated/0c936fda5da4aa1159c189cea227e174
-                    continue
-                # Not a 'hidden file', then re-raise exception
-                raise
-
-            # strip away leading path from the name
-            fullname_with_subpath = content_path.replace(static_dir, '')
-            if fullname_with_subpath.startswith('/'):
-                fullname_with_subpath = fullname_with_subpath[1:]
-            asset_key = StaticContent.compute_location(target_id, fullname_with_subpath)
-
-            policy_ele = policy.get(asset_key.path, {})
-            displayname = policy_ele.get('displayname', filename)
-            locked = policy_ele.get('locked', False)
-            mime_type = policy_ele.get('contentType')
-
-            # Check extracted contentType in list of all valid mimetypes
-            if not mime_type or mime_type not in mimetypes_list:
-                mime_type = mimetypes.guess_type(filename)[0]   # Assign guessed mimetype
-            content = StaticContent(
-                asset_key, displayname, mime_type, data,
-                import_path=fullname_with_subpath, locked=locked
-            )
-
-            # first let's save a thumbnail so we can get back a thumbnail location
-            thumbnail_content, thumbnail_location = static_content_store.generate_thumbnail(content)
-
-            if thumbnail_content is not None:
-                content.thumbnail_location = thumbnail_location
-
-            # then commit the content
-            try:
-                static_content_store.save(content)
-            except Exception as err:
-                log.exception(u'Error importing {0}, error={1}'.format(
-                    fullname_with_subpath, err
-                ))
-
-            # store the remapping information which will be needed
-            # to subsitute in the module data
-            remap_dict[fullname_with_subpath] = asset_key
+    # Saving an asset is mostly waiting on the contentstore, so save several at once.
+    pool = ThreadPool(STATIC_CONTENT_IMPORT_THREADS)
+    try:
+        for remapping in pool.imap_unordered(import_static_file, content_paths):
+            if remapping is not None:
+                fullname_with_subpath, asset_key = remapping
+                remap_dict[fullname_with_subpath] = asset_key
+    finally:
+        pool.terminate()
 
     return remap_dict
 
@@ -169,17 +193,25 @@ class ImportManager(object):
         create_if_not_present: If True, then a new courselike is created if it doesn't already exist.
             Otherwise, it throws an InvalidLocationError if the courselike does not exist.
 
+        progress_callback: if given, called with each of the STAGE_* names below as the import
+            of a courselike reaches that stage.
+
         default_class, load_error_modules: are arguments for constructing the XMLModuleStore (see its doc)
     """
     store_class = XMLModuleStore
 
+    # Stages of the import of a courselike, in the order they happen
+    STAGE_STATIC_ASSETS = 'static_assets'
+    STAGE_MODULES = 'modules'
+    STAGE_DRAFTS = 'drafts'
+
     def __init__(
             self, store, user_id, data_dir, source_dirs=None,
             default_class='xmodule.raw_module.RawDescriptor',
             load_error_modules=True, static_content_store=None,
             target_id=None, verbose=False,
             do_import_static=True, create_if_not_present=False,
-            raise_on_failure=False
+            raise_on_failure=False, progress_callback=None
     ):
         self.store = store
         self.user_id = user_id
@@ -192,6 +224,7 @@ class ImportManager(object):
         self.do_import_static = do_import_static
         self.create_if_not_present = create_if_not_present
         self.raise_on_failure = raise_on_failure
+        self.progress_callback = progress_callback
         self.xml_module_store = self.store_class(
             data_dir,
             default_class=default_class,
@@ -202,6 +235,13 @@ class ImportManager(object):
         )
         self.logger, self.errors = make_error_tracker()
 
+    def report_progress(self, stage):
+        """
+        Let the caller know that the import has reached `stage`.
+        """
+        if self.progress_callback is not None:
+            self.progress_callback(stage)
+
     def preflight(self):
         """
         Perform any pre-import sanity checks.
@@ -420,12 +460,14 @@ class ImportManager(object):
             with self.store.bulk_operations(dest_id):
                 source_courselike, courselike, data_path = self.get_courselike(courselike_key, runtime, dest_id)
                 # Import all static pieces.
+                self.report_progress(self.STAGE_STATIC_ASSETS)
                 self.import_static(data_path, dest_id)
 
                 # Import asset metadata stored in XML.
                 self.import_asset_metadata(data_path, dest_id)
 
                 # Import all children
+                self.report_progress(self.STAGE_MODULES)
                 self.import_children(source_courselike, courselike, courselike_key, data_path, dest_id)
             yield courselike
 
@@ -526,6 +568,7 @@ class CourseImportManager(ImportManager):
             self.recursive_build(source_courselike, courselike, courselike_key, dest_id)
 
         # Import any draft items
+        self.report_progress(self.STAGE_DRAFTS)
         with self.store.branch_setting(ModuleStoreEnum.Branch.draft_preferred, dest_id):
             _import_course_draft(
                 self.xml_module_store,
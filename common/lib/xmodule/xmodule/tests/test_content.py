@@ -1,8 +1,12 @@
 """Tests for contents"""
 
 import os
+import shutil
+import tarfile
+import tempfile
 import unittest
 import ddt
+from mock import patch
 from path import path
 from xmodule.contentstore.content import StaticContent, StaticContentStream
 from xmodule.contentstore.content import ContentStore
@@ -173,3 +177,26 @@ class ContentTest(unittest.TestCase):
         js_file_paths = [file_path for file_path in js_file_paths if os.path.basename(file_path).startswith('000-')]
         self.assertEqual(len(js_file_paths), 1)
         self.assertIn("XModule.Descriptor = (function () {", open(js_file_paths[0]).read())
+
+    def test_export_all_for_course_to_tar_fallback(self):
+        """
+        Test that stores without their own export to tar add the exported assets to the tarball.
+        """
+        def export_all_for_course(course_key, output_directory, assets_policy_file):  # pylint: disable=unused-argument
+            """ Export a single asset. """
+            with open(os.path.join(output_directory, 'asset.txt'), 'w') as asset_file:
+                asset_file.write('asset data')
+
+        root_dir = tempfile.mkdtemp()
+        try:
+            tar_path = os.path.join(root_dir, 'export.tar.gz')
+            content_store = ContentStore()
+            with patch.object(content_store, 'export_all_for_course', side_effect=export_all_for_course):
+                with tarfile.open(tar_path, 'w:gz') as tar_file:
+                    content_store.export_all_for_course_to_tar(
+                        SlashSeparatedCourseKey('foo', 'bar', 'bz'), tar_file, 'export/static', 'assets.json'
+                    )
+            with tarfile.open(tar_path) as tar_file:
+                self.assertEqual(tar_file.extractfile('export/static/asset.txt').read(), 'asset data')
+        finally:
+            shutil.rmtree(root_dir)
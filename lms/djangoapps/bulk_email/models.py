@@ -12,6 +12,9 @@ file and check it in at the same time as your model changes. To do that,
 
 """
 import logging
+import re
+from string import Formatter
+
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.db import models, transaction
@@ -19,8 +22,9 @@ from django.db import models, transaction
 from openedx.core.lib.html_to_text import html_to_text
 from openedx.core.lib.mail_utils import wrap_message
 
+from xmodule.modulestore.django import modulestore
 from xmodule_django.models import CourseKeyField
-from util.keyword_substitution import substitute_keywords_with_data
+from util.keyword_substitution import KEYWORD_FUNCTION_MAP, substitute_keywords
 
 log = logging.getLogger(__name__)
 
@@ -150,6 +154,9 @@ class Optout(models.Model):
 # the location where the email message body is to be inserted.
 COURSE_EMAIL_MESSAGE_BODY_TAG = '{{message_body}}'
 
+# Keys of an email context that change from one recipient to the next.
+RECIPIENT_CONTEXT_KEYS = ('name', 'email', 'user_id')
+
 
 class CourseEmailTemplate(models.Model):
     """
@@ -194,21 +201,7 @@ class CourseEmailTemplate(models.Model):
         Such encoding is left to the email code, which will use the value
         of settings.DEFAULT_CHARSET to encode the message.
         """
-
-        # Substitute all %%-encoded keywords in the message body
-        if 'user_id' in context and 'course_id' in context:
-            message_body = substitute_keywords_with_data(message_body, context['user_id'], context['course_id'])
-
-        result = format_string.format(**context)
-
-        # Note that the body tag in the template will now have been
-        # "formatted", so we need to do the same to the tag being
-        # searched for.
-        message_body_tag = COURSE_EMAIL_MESSAGE_BODY_TAG.format()
-        result = result.replace(message_body_tag, message_body, 1)
-
-        # finally, return the result, after wrapping long lines and without converting to an encoded byte array.
-        return wrap_message(result)
+        return CompiledEmailTemplate(format_string, message_body, context).render(context)
 
     def render_plaintext(self, plaintext, context):
         """
@@ -228,6 +221,153 @@ class CourseEmailTemplate(models.Model):
         """
         return CourseEmailTemplate._render(self.html_template, htmltext, context)
 
+    def compile_plaintext(self, plaintext, context):
+        """
+        Return a CompiledEmailTemplate for sending `plaintext` to many recipients.
+
+        `context` must hold everything but the per-recipient keys, which are
+        supplied to CompiledEmailTemplate.render.
+        """
+        return CompiledEmailTemplate(self.plain_template, plaintext, context)
+
+    def compile_htmltext(self, htmltext, context):
+        """
+        Return a CompiledEmailTemplate for sending `htmltext` to many recipients.
+
+        `context` must hold everything but the per-recipient keys, which are
+        supplied to CompiledEmailTemplate.render.
+        """
+        return CompiledEmailTemplate(self.html_template, htmltext, context)
+
+
+class CompiledEmailTemplate(object):
+    """
+    An email template and message body, pre-rendered with everything in the
+    context that is the same for all recipients.
+
+    Formatting the whole template, substituting keywords and wrapping every
+    line for each recipient of a bulk email is wasted work: only the fields
+    named in RECIPIENT_CONTEXT_KEYS and the %%-encoded keywords of the body
+    differ between recipients. Those are kept as slots, and rendering for a
+    recipient fills them in and only re-wraps the lines they appear on.
+    """
+    # Segment marking where the (keyword-substituted) message body goes.
+    MESSAGE_BODY = object()
+
+    def __init__(self, format_string, message_body, context):
+        self.formatter = Formatter()
+        self.message_body = message_body
+
+        segments = []
+        for literal_text, field_name, format_spec, conversion in self.formatter.parse(format_string):
+            if literal_text:
+                segments.append(literal_text)
+            if field_name is None:
+                continue
+            if re.match(r'[^.[]*', field_name).group() in RECIPIENT_CONTEXT_KEYS:
+                segments.append((field_name, format_spec, conversion))
+            else:
+                segments.append(self._format_field(field_name, format_spec, conversion, context))
+
+        self.course = None
+        if context.get('course_id') is not None and any(key in message_body for key in KEYWORD_FUNCTION_MAP):
+            self.course = modulestore().get_course(context['course_id'], depth=0)
+
+        # Each line is either its final, wrapped text, or the list of segments
+        # to render and wrap for each recipient.
+        self.lines = []
+        line = []
+        for segment in self._insert_message_body(segments):
+            if isinstance(segment, basestring):
+                parts = segment.split('\n')
+                for part in parts[:-1]:
+                    line.append(part)
+                    self._add_line(line)
+                    line = []
+                line.append(parts[-1])
+            else:
+                line.append(segment)
+        self._add_line(line)
+
+    @property
+    def needs_user(self):
+        """
+        Whether rendering substitutes keywords, and so needs the recipient's User.
+        """
+        return self.course is not None
+
+    def _format_field(self, field_name, format_spec, conversion, context):
+        """
+        Format a single replacement field the way format_string.format(**context) would.
+        """
+        value = self.formatter.get_field(field_name, (), context)[0]
+        value = self.formatter.convert_field(value, conversion)
+        if format_spec:
+            format_spec = self.formatter.vformat(format_spec, (), context)
+        return self.formatter.format_field(value, format_spec)
+
+    def _insert_message_body(self, segments):
+        """
+        Replace the first occurrence of the message body tag in the literal
+        text of `segments` with the message body.
+        """
+        merged = []
+        for segment in segments:
+            if merged and isinstance(segment, basestring) and isinstance(merged[-1], basestring):
+                merged[-1] += segment
+            else:
+                merged.append(segment)
+
+        # Note that the body tag in the template will have been "formatted",
+        # so we need to do the same to the tag being searched for.
+        message_body_tag = COURSE_EMAIL_MESSAGE_BODY_TAG.format()
+        for index, segment in enumerate(merged):
+            if isinstance(segment, basestring) and message_body_tag in segment:
+                before, after = segment.split(message_body_tag, 1)
+                body = self.MESSAGE_BODY if self.course is not None else self.message_body
+                merged[index:index + 1] = [before, body, after]
+                break
+        return merged
+
+    def _add_line(self, segments):
+        """
+        Add a line of the template, wrapping it right away if it is the same for everyone.
+        """
+        if all(isinstance(segment, basestring) for segment in segments):
+            self.lines.append(wrap_message(u''.join(segments)))
+        else:
+            self.lines.append(segments)
+
+    def _render_segment(self, segment, context, user):
+        """
+        Return the text of a per-recipient segment.
+        """
+        if isinstance(segment, basestring):
+            return segment
+        if segment is self.MESSAGE_BODY:
+            if context.get('user_id') is None:
+                return self.message_body
+            if user is None:
+                user = User.objects.get(id=context['user_id'])
+            return substitute_keywords(self.message_body, user, self.course)
+        field_name, format_spec, conversion = segment
+        return self._format_field(field_name, format_spec, conversion, context)
+
+    def render(self, context, user=None):
+        """
+        Render the message for the recipient described by `context`.
+
+        `user` is the recipient's User, if it has already been loaded; it is
+        only used to substitute keywords in the message body.
+        """
+        lines = []
+        for line in self.lines:
+            if isinstance(line, basestring):
+                lines.append(line)
+            else:
+                lines.append(wrap_message(u''.join(self._render_segment(segment, context, user) for segment in line)))
+        return u'\n'.join(lines)
+
 
 class CourseAuthorization(models.Model):
     """
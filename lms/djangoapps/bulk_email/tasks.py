@@ -2,10 +2,11 @@
 This module contains celery task functions for handling the sending of bulk email
 to a course.
 """
+import math
 import re
 import random
 import json
-from time import sleep
+from time import sleep, time
 from collections import Counter
 import logging
 
@@ -30,6 +31,7 @@ from celery.exceptions import RetryTaskError
 
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.mail import EmailMultiAlternatives, get_connection
 from django.core.urlresolvers import reverse
 
@@ -395,6 +397,30 @@ def _get_source_address(course_id, course_title):
     return from_addr
 
 
+def _wait_for_send_slot(max_sends_per_second):
+    """
+    Block until one more email can be sent without all bulk email subtasks
+    together sending more than `max_sends_per_second` emails in any second.
+
+    Time is cut into slots of 1 / `max_sends_per_second` seconds, each of which
+    can be claimed by a single send.  A send claims the first free slot that
+    has not started yet and waits for its start, so sends are spaced evenly
+    instead of bursting at the start of every second.  The slots are claimed
+    with an atomic add in the cache, so that they are shared by the subtasks
+    running on all workers.
+    """
+    now = time()
+    slot = int(math.ceil(now * max_sends_per_second))
+    while True:
+        delay = float(slot) / max_sends_per_second - now
+        # The claim only needs to outlive its own slot.
+        if cache.add('bulk_email.send_slot.{}'.format(slot), True, int(delay) + 10):
+            break
+        slot += 1
+    if delay > 0:
+        sleep(delay)
+
+
 def _send_course_email(entry_id, email_id, to_list, global_email_context, subtask_status):
     """
     Performs the email sending task.
@@ -477,6 +503,16 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
         # Define context values to use in all course emails:
         email_context = {'name': '', 'email': ''}
         email_context.update(global_email_context)
+        email_context['course_id'] = course_email.course_id
+
+        # Render everything that is the same for all recipients once:
+        plaintext_template = course_email_template.compile_plaintext(course_email.text_message, email_context)
+        html_template = course_email_template.compile_htmltext(course_email.html_message, email_context)
+
+        # Keyword substitution needs the recipients' User objects, so fetch them together.
+        users = {}
+        if plaintext_template.needs_user or html_template.needs_user:
+            users = User.objects.in_bulk([recipient['pk'] for recipient in to_list])
 
         while to_list:
             # Update context with user-specific values from the user at the end of the list.
@@ -490,11 +526,11 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
             email_context['email'] = email
             email_context['name'] = current_recipient['profile__name']
             email_context['user_id'] = current_recipient['pk']
-            email_context['course_id'] = course_email.course_id
+            user = users.get(current_recipient['pk'])
 
             # Construct message content using templates and context:
-            plaintext_msg = course_email_template.render_plaintext(course_email.text_message, email_context)
-            html_msg = course_email_template.render_htmltext(course_email.html_message, email_context)
+            plaintext_msg = plaintext_template.render(email_context, user)
+            html_msg = html_template.render(email_context, user)
 
             # Create email:
             email_msg = EmailMultiAlternatives(
@@ -506,12 +542,16 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
             )
             email_msg.attach_alternative(html_msg, 'text/html')
 
-            # Throttle if we have gotten the rate limiter.  This is not very high-tech,
-            # but if a task has been retried for rate-limiting reasons, then we sleep
-            # for a period of time between all emails within this task.  Choice of
-            # the value depends on the number of workers that might be sending email in
-            # parallel, and what the SES throttle rate is.
-            if subtask_status.retried_nomax > 0:
+            # Throttle.  If a send rate is configured, all subtasks share it, so
+            # that together they stay under the SES rate instead of finding it by
+            # getting throttled.  Otherwise, if a task has been retried for
+            # rate-limiting reasons, then we sleep for a period of time between all
+            # emails within this task.  Choice of the value depends on the number of
+            # workers that might be sending email in parallel, and what the SES
+            # throttle rate is.
+            if settings.BULK_EMAIL_MAX_SENDS_PER_SECOND:
+                _wait_for_send_slot(settings.BULK_EMAIL_MAX_SENDS_PER_SECOND)
+            elif subtask_status.retried_nomax > 0:
                 sleep(settings.BULK_EMAIL_RETRY_DELAY_BETWEEN_SENDS)
 
             try:
@@ -133,6 +133,20 @@ class CourseEmailTemplateTest(TestCase):
         context = self._get_sample_plain_context()
         template.render_plaintext("My new plain text.", context)
 
+    def test_compiled_template_matches_render(self):
+        template = CourseEmailTemplate.get_template()
+        context = self._get_sample_html_context()
+        compiled_plaintext = template.compile_plaintext(u"My new plain text.\n{name}", context)
+        compiled_html = template.compile_htmltext(u"My new html text.", context)
+        for name, email in [(u'Ann', 'ann@test.com'), (u'B\xe9a', 'bea@test.com')]:
+            context.update(name=name, email=email)
+            self.assertEqual(
+                compiled_plaintext.render(context),
+                template.render_plaintext(u"My new plain text.\n{name}", context)
+            )
+            self.assertEqual(compiled_html.render(context), template.render_htmltext(u"My new html text.", context))
+            self.assertIn(email, compiled_html.render(context))
+
 
 class CourseAuthorizationTest(TestCase):
     """Test the CourseAuthorization model."""
@@ -8,7 +8,7 @@ paths actually work.
 import json
 from uuid import uuid4
 from itertools import cycle, chain, repeat
-from mock import patch, Mock
+from mock import patch, Mock, call
 from smtplib import SMTPServerDisconnected, SMTPDataError, SMTPConnectError, SMTPAuthenticationError
 from boto.ses.exceptions import (
     SESAddressNotVerifiedError,
@@ -26,9 +26,12 @@ from boto.exception import AWSConnectionError
 from celery.states import SUCCESS, FAILURE
 
 from django.conf import settings
+from django.core.cache import cache
 from django.core.management import call_command
+from django.test import TestCase
 
 from bulk_email.models import CourseEmail, Optout, SEND_TO_ALL
+from bulk_email.tasks import _wait_for_send_slot
 
 from instructor_task.tasks import send_bulk_course_email
 from instructor_task.subtasks import update_subtask_status, SubtaskStatus
@@ -408,3 +411,27 @@ class TestBulkEmailInstructorTask(InstructorTaskCourseTestCase):
 
     def test_failure_on_ses_domain_not_confirmed(self):
         self._test_immediate_failure(SESDomainNotConfirmedError(403, "You're out of bounds!"))
+
+
+class TestSendRateLimit(TestCase):
+    """Tests of the send rate shared by bulk email subtasks."""
+
+    def setUp(self):
+        super(TestSendRateLimit, self).setUp()
+        cache.clear()
+
+    @patch('bulk_email.tasks.sleep')
+    @patch('bulk_email.tasks.time', Mock(side_effect=[100.25, 100.25, 100.5]))
+    def test_sends_are_spaced(self, mock_sleep):
+        # Each send waits for its own half-second slot, even within the same second.
+        _wait_for_send_slot(2)
+        _wait_for_send_slot(2)
+        _wait_for_send_slot(2)
+        self.assertEqual(mock_sleep.call_args_list, [call(0.25), call(0.75), call(1.0)])
+
+    @patch('bulk_email.tasks.sleep')
+    @patch('bulk_email.tasks.time', Mock(side_effect=[100.5, 101.5]))
+    def test_free_slot_starting_now(self, mock_sleep):
+        _wait_for_send_slot(2)
+        _wait_for_send_slot(2)
+        self.assertFalse(mock_sleep.called)
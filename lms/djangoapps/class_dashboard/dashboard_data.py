@@ -5,7 +5,7 @@ from util.json_request import JsonResponse
 import json
 
 from courseware import models
-from django.db.models import Count
+from django.db.models import Count, Sum
 from django.utils.translation import ugettext as _
 
 from xmodule.modulestore.django import modulestore
@@ -32,12 +32,12 @@ def get_problem_grade_distribution(course_id):
         attempting the problem
     """
 
-    # Aggregate query on studentmodule table for grade data for all problems in course
-    db_query = models.StudentModule.objects.filter(
+    # Aggregate query on the grade histograms for grade data for all problems in course
+    db_query = models.GradeHistogramBucket.objects.filter(
         course_id__exact=course_id,
         grade__isnull=False,
         module_type__exact="problem",
-    ).values('module_state_key', 'grade', 'max_grade').annotate(count_grade=Count('grade'))
+    ).values('module_state_key', 'grade', 'max_grade').annotate(count_grade=Sum('count')).filter(count_grade__gt=0)
 
     prob_grade_distrib = {}
     total_student_count = {}
@@ -105,8 +105,8 @@ def get_problem_set_grade_distrib(course_id, problem_set):
       'grade_distrib' - array of tuples (`grade`,`count`) ordered by `grade`
     """
 
-    # Aggregate query on studentmodule table for grade data for set of problems in course
-    db_query = models.StudentModule.objects.filter(
+    # Aggregate query on the grade histograms for grade data for set of problems in course
+    db_query = models.GradeHistogramBucket.objects.filter(
         course_id__exact=course_id,
         grade__isnull=False,
         module_type__exact="problem",
@@ -115,7 +115,7 @@ def get_problem_set_grade_distrib(course_id, problem_set):
         'module_state_key',
         'grade',
         'max_grade',
-    ).annotate(count_grade=Count('grade')).order_by('module_state_key', 'grade')
+    ).annotate(count_grade=Sum('count')).filter(count_grade__gt=0).order_by('module_state_key', 'grade')
 
     prob_grade_distrib = {}
 
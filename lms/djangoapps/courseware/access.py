@@ -12,6 +12,7 @@ from xmodule.course_module import (
     CourseDescriptor, CATALOG_VISIBILITY_CATALOG_AND_ABOUT,
     CATALOG_VISIBILITY_ABOUT)
 from xmodule.error_module import ErrorDescriptor
+from xmodule.modulestore.django import modulestore
 from xmodule.x_module import XModule
 from xmodule.split_test_module import get_split_user_partitions
 
@@ -29,6 +30,7 @@ from student.roles import (
 from student.models import CourseEnrollment, CourseEnrollmentAllowed
 from opaque_keys.edx.keys import CourseKey, UsageKey
 from util.milestones_helpers import get_pre_requisite_courses_not_completed
+from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
 DEBUG_ACCESS = False
 
 log = logging.getLogger(__name__)
@@ -55,7 +57,7 @@ def has_access(user, action, obj, course_key=None):
     user: a Django user object. May be anonymous. If none is passed,
                     anonymous is assumed
 
-    obj: The object to check access for.  A module, descriptor, location, or
+    obj: The object to check access for.  A module, descriptor, course overview, location, or
                     certain special strings (e.g. 'global')
 
     action: A string specifying the action that the client is trying to perform.
@@ -79,6 +81,9 @@ def has_access(user, action, obj, course_key=None):
     if isinstance(obj, CourseDescriptor):
         return _has_access_course_desc(user, action, obj)
 
+    if isinstance(obj, CourseOverview):
+        return _has_access_course_overview(user, action, obj)
+
     if isinstance(obj, ErrorDescriptor):
         return _has_access_error_desc(user, action, obj, course_key)
 
@@ -264,24 +269,9 @@ def _has_access_course_desc(user, action, course):
             _has_staff_access_to_descriptor(user, course, course.id)
         )
 
-    def can_view_courseware_with_prerequisites():  # pylint: disable=invalid-name
-        """
-        Checks if prerequisite courses feature is enabled and course has prerequisites
-        and user is neither staff nor anonymous then it returns False if user has not
-        passed prerequisite courses otherwise return True.
-        """
-        if settings.FEATURES['ENABLE_PREREQUISITE_COURSES'] \
-                and not _has_staff_access_to_descriptor(user, course, course.id) \
-                and course.pre_requisite_courses \
-                and not user.is_anonymous() \
-                and get_pre_requisite_courses_not_completed(user, [course.id]):
-            return False
-        else:
-            return True
-
     checkers = {
         'load': can_load,
-        'view_courseware_with_prerequisites': can_view_courseware_with_prerequisites,
+        'view_courseware_with_prerequisites': lambda: _can_view_courseware_with_prerequisites(user, course),
         'load_forum': can_load_forum,
         'load_mobile': can_load_mobile,
         'load_mobile_no_enrollment_check': can_load_mobile_no_enroll_check,
@@ -296,6 +286,80 @@ def _has_access_course_desc(user, action, course):
     return _dispatch(checkers, action, user, course)
 
 
+def _has_access_course_overview(user, action, course_overview):
+    """
+    Check if user has access to a course overview.
+
+    Only the checks the student dashboard needs are answered from the overview;
+    any other action loads the course descriptor and checks that instead.
+
+    Valid actions:
+
+    'load' -- load the courseware, see inside the course
+    'view_courseware_with_prerequisites' -- the user has passed all prerequisite courses
+    'staff' -- staff access to course.
+    'instructor' -- instructor access to course.
+    """
+    course_key = course_overview.id
+
+    def can_load():
+        """
+        Same as the 'load' check for a course descriptor, except that group
+        access is not enforced: courses do not set it on their root block.
+        """
+        if course_overview.visible_to_staff_only and not _has_staff_access_to_descriptor(
+                user, course_overview, course_key):
+            return False
+
+        if settings.FEATURES['DISABLE_START_DATES'] and not is_masquerading_as_student(user, course_key):
+            debug("Allow: DISABLE_START_DATES")
+            return True
+
+        if course_overview.start is not None:
+            effective_start = _adjust_start_date_for_beta_testers(user, course_overview, course_key=course_key)
+            if datetime.now(UTC()) > effective_start:
+                debug("Allow: now > effective start date")
+                return True
+            return _has_staff_access_to_descriptor(user, course_overview, course_key)
+
+        debug("Allow: no start date")
+        return True
+
+    checkers = {
+        'load': can_load,
+        'view_courseware_with_prerequisites': lambda: _can_view_courseware_with_prerequisites(user, course_overview),
+        'staff': lambda: _has_staff_access_to_descriptor(user, course_overview, course_key),
+        'instructor': lambda: _has_instructor_access_to_descriptor(user, course_overview, course_key),
+    }
+
+    if action not in checkers:
+        course = modulestore().get_course(course_key)
+        if course is None:
+            debug("Deny: course %s not found", course_key)
+            return False
+        return has_access(user, action, course)
+
+    return _dispatch(checkers, action, user, course_overview)
+
+
+def _can_view_courseware_with_prerequisites(user, course):  # pylint: disable=invalid-name
+    """
+    Checks if prerequisite courses feature is enabled and course has prerequisites
+    and user is neither staff nor anonymous then it returns False if user has not
+    passed prerequisite courses otherwise return True.
+
+    course: a course descriptor or course overview
+    """
+    if settings.FEATURES['ENABLE_PREREQUISITE_COURSES'] \
+            and not _has_staff_access_to_descriptor(user, course, course.id) \
+            and course.pre_requisite_courses \
+            and not user.is_anonymous() \
+            and get_pre_requisite_courses_not_completed(user, [course.id]):
+        return False
+    else:
+        return True
+
+
 def _has_access_error_desc(user, action, descriptor, course_key):
     """
     Only staff should see error descriptors.
@@ -1,34 +1,58 @@
 # Compute grades using real division, with no integer truncation
 from __future__ import division
-from collections import defaultdict
+from collections import defaultdict, namedtuple
+from itertools import islice
 import json
 import random
+import re
 import logging
 
 from contextlib import contextmanager
 from django.conf import settings
 from django.db import transaction
 from django.test.client import RequestFactory
+from django.utils import timezone
 
 import dogstats_wrapper as dog_stats_api
 
 from courseware import courses
 from courseware.model_data import FieldDataCache
-from student.models import anonymous_id_for_user
+from student.models import anonymous_id_for_user, anonymous_ids_for_users
 from util.module_utils import yield_dynamic_descriptor_descendents
 from xmodule import graders
 from xmodule.graders import Score
 from xmodule.modulestore.django import modulestore
-from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.util.duedate import get_extended_due_date
-from .models import StudentModule
+from .models import StudentModule, PersistentSubsectionGrade
 from .module_render import get_module_for_descriptor
 from submissions import api as sub_api  # installed from the edx-submissions repository
 from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import UsageKey
 
 
 log = logging.getLogger("edx.courseware")
 
+# The number of students whose scores iterate_grades_for loads at once
+GRADING_BATCH_SIZE = 500
+
+# The number of StudentModule rows iter_answer_distributions reads per query
+ANSWER_DISTRIBUTION_CHUNK_SIZE = 1000
+
+# Finds the "student_answers" of a problem's state; the key can't appear unescaped
+# in any string of the state, and capa states don't nest it.
+STUDENT_ANSWERS_PATTERN = re.compile(r'"student_answers"\s*:\s*')
+JSON_DECODER = json.JSONDecoder()
+
+# Scores loaded up front for a student by `_prefetch_scores`:
+#   submissions_scores: item ids -> (earned, possible), as returned by the submissions API
+#   student_module_scores: as returned by `_get_student_module_scores`
+#   persisted_grades: list of the student's PersistentSubsectionGrades, or
+#       None if persisted grades are disabled
+#   state_read_at: when student_module_scores were read
+PrefetchedScores = namedtuple(
+    'PrefetchedScores', 'submissions_scores student_module_scores persisted_grades state_read_at'
+)
+
 
 def answer_distributions(course_key):
     """
@@ -58,45 +82,60 @@ def answer_distributions(course_key):
     generate the report.
 
     This method will try to use a read-replica database if one is available.
+
+    The whole distribution is held in memory; reports for large courses should
+    use `iter_answer_distributions` instead.
+    """
+    return dict(iter_answer_distributions(course_key))
+
+
+def iter_answer_distributions(course_key, chunk_size=ANSWER_DISTRIBUTION_CHUNK_SIZE):
+    """
+    Yield the items of `answer_distributions(course_key)` one at a time, as
+    ((problem url_name, problem display_name, problem_id), {answer: count})
+    pairs sorted by their keys.
+
+    Problems are processed one after the other, so only the answer counts of
+    a single problem are held in memory. The problem states are read `chunk_size`
+    rows at a time, and only their "student_answers" are decoded. The url names
+    and display names of all the problems are loaded from the modulestore at
+    once.
     """
-    # dict: { module.module_state_key : (url_name, display_name) }
-    state_keys_to_problem_info = {}  # For caching, used by url_and_display_name
-
-    def url_and_display_name(usage_key):
-        """
-        For a given usage_key, return the problem's url and display_name.
-        Handle modulestore access and caching. This method ignores permissions.
-
-        Raises:
-            InvalidKeyError: if the usage_key does not parse
-            ItemNotFoundError: if there is no content that corresponds
-                to this usage_key.
-        """
-        problem_store = modulestore()
-        if usage_key not in state_keys_to_problem_info:
-            problem = problem_store.get_item(usage_key)
-            problem_info = (problem.url_name, problem.display_name_with_default)
-            state_keys_to_problem_info[usage_key] = problem_info
-
-        return state_keys_to_problem_info[usage_key]
-
-    # Iterate through all problems submitted for this course in no particular
-    # order, and build up our answer_counts dict that we will eventually return
-    answer_counts = defaultdict(lambda: defaultdict(int))
-    for module in StudentModule.all_submitted_problems_read_only(course_key):
+    problem_info = _problem_info_by_location(course_key)
+    submitted_problems = StudentModule.all_submitted_problems_read_only(course_key)
+
+    # The keys the states of each problem are stored under, grouped by (url_name, display_name)
+    problem_state_keys = defaultdict(list)
+    for state_key_string in submitted_problems.order_by().values_list('module_state_key', flat=True).distinct():
         try:
-            state_dict = json.loads(module.state) if module.state else {}
-            raw_answers = state_dict.get("student_answers", {})
-        except ValueError:
-            log.error(
-                u"Answer Distribution: Could not parse module state for StudentModule id=%s, course=%s",
-                module.id,
-                course_key,
-            )
+            state_key = UsageKey.from_string(state_key_string)
+            location = _module_state_key_string(state_key.map_into_course(course_key))
+        except InvalidKeyError:
+            location = None
+        if location not in problem_info:
+            msg = "Answer Distribution: Item {} referenced in StudentModules " + \
+                  "in course {} not found; " + \
+                  "This can happen if a student answered a question that " + \
+                  "was later deleted from the course. These answers will be " + \
+                  "omitted from the answer distribution CSV."
+            log.warning(msg.format(state_key_string, course_key))
             continue
+        problem_state_keys[problem_info[location]].append(state_key)
+
+    for url, display_name in sorted(problem_state_keys):
+        answer_counts = defaultdict(lambda: defaultdict(int))
+        problem_states = submitted_problems.filter(module_state_key__in=problem_state_keys[(url, display_name)])
+        for module_id, state in _iterate_in_id_order(problem_states, ('id', 'state'), chunk_size):
+            try:
+                raw_answers = _student_answers_from_state(state)
+            except ValueError:
+                log.error(
+                    u"Answer Distribution: Could not parse module state for StudentModule id=%s, course=%s",
+                    module_id,
+                    course_key,
+                )
+                continue
 
-        try:
-            url, display_name = url_and_display_name(module.module_state_key.map_into_course(course_key))
             # Each problem part has an ID that is derived from the
             # module.module_state_key (with some suffix appended)
             for problem_part_id, raw_answer in raw_answers.items():
@@ -104,34 +143,72 @@ def answer_distributions(course_key):
                 # to be unicode values. Note that if we get a string, it's always
                 # unicode and not str -- state comes from the json decoder, and that
                 # always returns unicode for strings.
-                answer = unicode(raw_answer)
-                answer_counts[(url, display_name, problem_part_id)][answer] += 1
+                answer_counts[problem_part_id][unicode(raw_answer)] += 1
 
-        except (ItemNotFoundError, InvalidKeyError):
-            msg = "Answer Distribution: Item {} referenced in StudentModule {} " + \
-                  "for user {} in course {} not found; " + \
-                  "This can happen if a student answered a question that " + \
-                  "was later deleted from the course. This answer will be " + \
-                  "omitted from the answer distribution CSV."
-            log.warning(
-                msg.format(module.module_state_key, module.id, module.student_id, course_key)
-            )
-            continue
+        for problem_part_id in sorted(answer_counts):
+            yield (url, display_name, problem_part_id), dict(answer_counts[problem_part_id])
+
+
+def _problem_info_by_location(course_key):
+    """
+    Return a dict mapping the location (see `_module_state_key_string`) of
+    every problem in the course to its (url_name, display_name), loading all
+    the problems with a single modulestore query.
+    """
+    store = modulestore()
+    with store.bulk_operations(course_key):
+        problems = store.get_items(course_key, qualifiers={'category': 'problem'})
+        return {
+            _module_state_key_string(problem.location): (problem.url_name, problem.display_name_with_default)
+            for problem in problems
+        }
+
+
+def _iterate_in_id_order(queryset, fields, chunk_size):
+    """
+    Yield the `fields` (the first of which must be 'id') of the rows of
+    `queryset` in id order, fetching `chunk_size` rows per query so that the
+    whole result set never has to be held in memory.
+    """
+    last_id = None
+    while True:
+        chunk_queryset = queryset if last_id is None else queryset.filter(id__gt=last_id)
+        chunk = list(chunk_queryset.order_by('id').values_list(*fields)[:chunk_size])
+        for row in chunk:
+            yield row
+        if len(chunk) < chunk_size:
+            return
+        last_id = chunk[-1][0]
+
+
+def _student_answers_from_state(state):
+    """
+    Return the "student_answers" dict of a problem's JSON `state`, decoding
+    only that part of the state, which can also hold large input states and
+    correct maps. Returns an empty dict if the state has no student answers.
 
-    return answer_counts
+    Raises ValueError if the student answers are not valid JSON.
+    """
+    if not state:
+        return {}
+    match = STUDENT_ANSWERS_PATTERN.search(state)
+    if match is None:
+        return {}
+    raw_answers, _ = JSON_DECODER.raw_decode(state, match.end())
+    return raw_answers if isinstance(raw_answers, dict) else {}
 
 
 @transaction.commit_manually
-def grade(student, request, course, keep_raw_scores=False):
+def grade(student, request, course, keep_raw_scores=False, prefetched_scores=None):
     """
     Wraps "_grade" with the manual_transaction context manager just in case
     there are unanticipated errors.
     """
     with manual_transaction():
-        return _grade(student, request, course, keep_raw_scores)
+        return _grade(student, request, course, keep_raw_scores, prefetched_scores)
 
 
-def _grade(student, request, course, keep_raw_scores):
+def _grade(student, request, course, keep_raw_scores, prefetched_scores=None):
     """
     Unwrapped version of "grade"
 
@@ -150,17 +227,35 @@ def _grade(student, request, course, keep_raw_scores):
     - keep_raw_scores : if True, then value for key 'raw_scores' contains scores
       for every graded module
 
+    `prefetched_scores` is the PrefetchedScores of the student if they were
+    already loaded in bulk (see `_prefetch_scores`), or None to load them here.
+
     More information on the format is in the docstring for CourseGrader.
     """
     grading_context = course.grading_context
     raw_scores = []
 
-    # Dict of item_ids -> (earned, possible) point tuples. This *only* grabs
-    # scores that were registered with the submissions API, which for the moment
-    # means only openassessment (edx-ora2)
-    submissions_scores = sub_api.get_scores(
-        course.id.to_deprecated_string(), anonymous_id_for_user(student, course.id)
-    )
+    if prefetched_scores is None:
+        # Dict of item_ids -> (earned, possible) point tuples. This *only* grabs
+        # scores that were registered with the submissions API, which for the moment
+        # means only openassessment (edx-ora2)
+        submissions_scores = sub_api.get_scores(
+            course.id.to_deprecated_string(), anonymous_id_for_user(student, course.id)
+        )
+
+        with manual_transaction():
+            state_read_at = timezone.now()
+            student_module_scores = _get_student_module_scores(student, course.id)
+        persisted_grade_rows = None
+    else:
+        submissions_scores, student_module_scores, persisted_grade_rows, state_read_at = prefetched_scores
+
+    persist_grades = _persistent_grades_enabled() and student.is_authenticated()
+    if persist_grades:
+        with manual_transaction():
+            persisted_grades = _get_persisted_subsection_grades(
+                student, course, student_module_scores, persisted_grade_rows
+            )
 
     totaled_scores = {}
     # This next complicated loop is just to collect the totaled_scores, which is
@@ -171,31 +266,29 @@ def _grade(student, request, course, keep_raw_scores):
             section_descriptor = section['section_descriptor']
             section_name = section_descriptor.display_name_with_default
 
-            # some problems have state that is updated independently of interaction
-            # with the LMS, so they need to always be scored. (E.g. foldit.,
-            # combinedopenended)
-            should_grade_section = any(
-                descriptor.always_recalculate_grades for descriptor in section['xmoduledescriptors']
-            )
+            should_grade_section = _must_grade_section(section, submissions_scores)
+
+            # Scores that don't come from StudentModule can change without us
+            # noticing, so only the remaining sections can use persisted grades.
+            use_persisted_grade = persist_grades and not should_grade_section
+            if use_persisted_grade:
+                section_version = _subsection_grade_version(section_descriptor)
+                persisted_grade = persisted_grades.get(_module_state_key_string(section_descriptor.location))
+                if persisted_grade is not None and persisted_grade.version == section_version:
+                    if keep_raw_scores:
+                        raw_scores += [Score(*score) for score in persisted_grade.get_scores()]
+                    if persisted_grade.possible > 0:
+                        format_scores.append(
+                            Score(persisted_grade.earned, persisted_grade.possible, True, section_name)
+                        )
+                    continue
 
-            # If there are no problems that always have to be regraded, check to
-            # see if any of our locations are in the scores from the submissions
-            # API. If scores exist, we have to calculate grades for this section.
             if not should_grade_section:
                 should_grade_section = any(
-                    descriptor.location.to_deprecated_string() in submissions_scores
+                    _module_state_key_string(descriptor.location) in student_module_scores
                     for descriptor in section['xmoduledescriptors']
                 )
 
-            if not should_grade_section:
-                with manual_transaction():
-                    should_grade_section = StudentModule.objects.filter(
-                        student=student,
-                        module_state_key__in=[
-                            descriptor.location for descriptor in section['xmoduledescriptors']
-                        ]
-                    ).exists()
-
             # If we haven't seen a single problem in the section, we don't have
             # to grade it at all! We can assume 0%
             if should_grade_section:
@@ -212,7 +305,12 @@ def _grade(student, request, course, keep_raw_scores):
                 for module_descriptor in yield_dynamic_descriptor_descendents(section_descriptor, create_module):
 
                     (correct, total) = get_score(
-                        course.id, student, module_descriptor, create_module, scores_cache=submissions_scores
+                        course.id,
+                        student,
+                        module_descriptor,
+                        create_module,
+                        scores_cache=submissions_scores,
+                        student_module_scores=student_module_scores
                     )
                     if correct is None and total is None:
                         continue
@@ -234,8 +332,22 @@ def _grade(student, request, course, keep_raw_scores):
                 if keep_raw_scores:
                     raw_scores += scores
             else:
+                scores = []
                 graded_total = Score(0.0, 1.0, True, section_name)
 
+            if use_persisted_grade:
+                with manual_transaction():
+                    PersistentSubsectionGrade.save_grade(
+                        student,
+                        course.id,
+                        section_descriptor.location,
+                        section_version,
+                        graded_total.earned,
+                        graded_total.possible,
+                        scores,
+                        state_read_at
+                    )
+
             #Add the graded total to totaled_scores
             if graded_total.possible > 0:
                 format_scores.append(graded_total)
@@ -331,6 +443,25 @@ def _progress_summary(student, request, course):
             return None
 
     submissions_scores = sub_api.get_scores(course.id.to_deprecated_string(), anonymous_id_for_user(student, course.id))
+    with manual_transaction():
+        student_module_scores = _get_student_module_scores(student, course.id)
+
+    # Graded sections whose persisted grade is still current can be summarized
+    # from the scores saved with it instead of loading each of their problems.
+    persisted_scores = {}
+    if _persistent_grades_enabled() and student.is_authenticated():
+        with manual_transaction():
+            persisted_grades = _get_persisted_subsection_grades(student, course, student_module_scores)
+        for sections in course.grading_context['graded_sections'].itervalues():
+            for section in sections:
+                section_id = _module_state_key_string(section['section_descriptor'].location)
+                persisted_grade = persisted_grades.get(section_id)
+                if (
+                        persisted_grade is not None and
+                        persisted_grade.version == _subsection_grade_version(section['section_descriptor']) and
+                        not _must_grade_section(section, submissions_scores)
+                ):
+                    persisted_scores[section_id] = persisted_grade.get_scores()
 
     chapters = []
     # Don't include chapters that aren't displayable (e.g. due to error)
@@ -352,15 +483,29 @@ def _progress_summary(student, request, course):
 
                 module_creator = section_module.xmodule_runtime.get_module
 
-                for module_descriptor in yield_dynamic_descriptor_descendents(section_module, module_creator):
-                    course_id = course.id
-                    (correct, total) = get_score(
-                        course_id, student, module_descriptor, module_creator, scores_cache=submissions_scores
-                    )
-                    if correct is None and total is None:
-                        continue
-
-                    scores.append(Score(correct, total, graded, module_descriptor.display_name_with_default))
+                # A section that was persisted without any scores was never
+                # loaded for grading, so its problems still have to be listed.
+                section_scores = persisted_scores.get(_module_state_key_string(section_module.location))
+                if section_scores:
+                    scores = [
+                        Score(correct, total, graded, display_name)
+                        for correct, total, _, display_name in section_scores
+                    ]
+                else:
+                    for module_descriptor in yield_dynamic_descriptor_descendents(section_module, module_creator):
+                        course_id = course.id
+                        (correct, total) = get_score(
+                            course_id,
+                            student,
+                            module_descriptor,
+                            module_creator,
+                            scores_cache=submissions_scores,
+                            student_module_scores=student_module_scores
+                        )
+                        if correct is None and total is None:
+                            continue
+
+                        scores.append(Score(correct, total, graded, module_descriptor.display_name_with_default))
 
                 scores.reverse()
                 section_total, _ = graders.aggregate_scores(
@@ -387,7 +532,8 @@ def _progress_summary(student, request, course):
     return chapters
 
 
-def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=None):
+def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=None,
+              student_module_scores=None):
     """
     Return the score for a user on a problem, as a tuple (correct, total).
     e.g. (5,7) if you got 5 out of 7 points.
@@ -401,6 +547,9 @@ def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=
            Can return None if user doesn't have access, or if something else went wrong.
     scores_cache: A dict of location names to (earned, possible) point tuples.
            If an entry is found in this cache, it takes precedence.
+    student_module_scores: A dict as returned by `_get_student_module_scores`
+           for this user and course. If given, it is used instead of querying
+           the StudentModule of this problem.
     """
     scores_cache = scores_cache or {}
 
@@ -427,18 +576,25 @@ def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=
         # These are not problems, and do not have a score
         return (None, None)
 
-    try:
-        student_module = StudentModule.objects.get(
-            student=user,
-            course_id=course_id,
-            module_state_key=problem_descriptor.location
+    if student_module_scores is not None:
+        module_grade, module_max_grade, _ = student_module_scores.get(
+            _module_state_key_string(problem_descriptor.location), (None, None, None)
         )
-    except StudentModule.DoesNotExist:
-        student_module = None
+    else:
+        try:
+            student_module = StudentModule.objects.get(
+                student=user,
+                course_id=course_id,
+                module_state_key=problem_descriptor.location
+            )
+        except StudentModule.DoesNotExist:
+            module_grade, module_max_grade = None, None
+        else:
+            module_grade, module_max_grade = student_module.grade, student_module.max_grade
 
-    if student_module is not None and student_module.max_grade is not None:
-        correct = student_module.grade if student_module.grade is not None else 0
-        total = student_module.max_grade
+    if module_max_grade is not None:
+        correct = module_grade if module_grade is not None else 0
+        total = module_max_grade
     else:
         # If the problem was not in the cache, or hasn't been graded yet,
         # we need to instantiate the problem.
@@ -459,7 +615,9 @@ def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=
     weight = problem_descriptor.weight
     if weight is not None:
         if total == 0:
-            log.exception("Cannot reweight a problem with zero total points. Problem: " + str(student_module))
+            log.exception(
+                "Cannot reweight a problem with zero total points. Problem: " + str(problem_descriptor.location)
+            )
             return (correct, total)
         correct = correct * weight / total
         total = weight
@@ -467,6 +625,180 @@ def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=
     return (correct, total)
 
 
+def _persistent_grades_enabled():
+    """
+    Return whether subsection grades should be read from and written to
+    PersistentSubsectionGrade. Randomly generated profile scores are never persisted.
+    """
+    return settings.FEATURES.get('ENABLE_PERSISTENT_GRADES', False) and not settings.GENERATE_PROFILE_SCORES
+
+
+def _module_state_key_string(usage_key):
+    """
+    Return `usage_key` in the branch- and version-agnostic form in which it is
+    stored in the database.
+    """
+    return StudentModule._meta.get_field('module_state_key').get_prep_value(usage_key)
+
+
+def _must_grade_section(section, submissions_scores):
+    """
+    Return whether the graded `section` (an entry of the course's
+    grading_context) has scores that can change without any of the student's
+    StudentModules changing, so that it has to be graded every time.
+    """
+    # some problems have state that is updated independently of interaction
+    # with the LMS, so they need to always be scored. (E.g. foldit.,
+    # combinedopenended)
+    if any(descriptor.always_recalculate_grades for descriptor in section['xmoduledescriptors']):
+        return True
+
+    # If there are no problems that always have to be regraded, check to
+    # see if any of our locations are in the scores from the submissions
+    # API. If scores exist, we have to calculate grades for this section.
+    return any(
+        descriptor.location.to_deprecated_string() in submissions_scores
+        for descriptor in section['xmoduledescriptors']
+    )
+
+
+def _subsection_grade_version(section_descriptor):
+    """
+    Return a string that changes whenever `section_descriptor` or any of its
+    descendants is edited, or an empty string if the modulestore doesn't keep
+    track of edits (e.g. XML courses, which can't change without a restart).
+    """
+    get_subtree_edited_on = getattr(section_descriptor.runtime, 'get_subtree_edited_on', None)
+    edited_on = get_subtree_edited_on(section_descriptor) if get_subtree_edited_on is not None else None
+    return unicode(edited_on) if edited_on is not None else u''
+
+
+def _get_student_module_scores(student, course_id):
+    """
+    Return a dict mapping the ids (see `_module_state_key_string`) of all the
+    StudentModules of `student` in `course_id` to (grade, max_grade, modified)
+    tuples, so that grading a student takes a single StudentModule query
+    instead of one per section and problem.
+    """
+    if not student.is_authenticated():
+        return {}
+
+    student_modules = StudentModule.objects.filter(
+        student=student,
+        course_id=course_id
+    ).values_list('module_state_key', 'grade', 'max_grade', 'modified')
+
+    return {
+        unicode(module_state_key): (grade, max_grade, modified)
+        for module_state_key, grade, max_grade, modified in student_modules.iterator()
+    }
+
+
+def _get_persisted_subsection_grades(student, course, student_module_scores, persisted_grade_rows=None):
+    """
+    Return a dict mapping subsection ids (see `_module_state_key_string`) to
+    the PersistentSubsectionGrade of `student` for that subsection, leaving out
+    any subsection in which the student's state changed after it was read for
+    grading.
+
+    `student_module_scores` is the result of `_get_student_module_scores`.
+    `persisted_grade_rows` are the student's PersistentSubsectionGrades if they
+    were already loaded, or None to query them.
+    """
+    if persisted_grade_rows is None:
+        persisted_grade_rows = PersistentSubsectionGrade.objects.filter(user=student, course_id=course.id)
+    persisted_grades = {
+        _module_state_key_string(persisted_grade.usage_key): persisted_grade
+        for persisted_grade in persisted_grade_rows
+    }
+    if not persisted_grades:
+        return persisted_grades
+
+    section_ids = {}
+    for sections in course.grading_context['graded_sections'].itervalues():
+        for section in sections:
+            section_id = _module_state_key_string(section['section_descriptor'].location)
+            for descriptor in section['xmoduledescriptors']:
+                section_ids[_module_state_key_string(descriptor.location)] = section_id
+
+    for module_state_key, (_, _, modified) in student_module_scores.iteritems():
+        section_id = section_ids.get(module_state_key)
+        persisted_grade = persisted_grades.get(section_id)
+        if persisted_grade is not None and (
+                persisted_grade.state_read_at is None or modified >= persisted_grade.state_read_at
+        ):
+            del persisted_grades[section_id]
+
+    return persisted_grades
+
+
+def _get_submissions_scores(course_id, anonymous_ids):
+    """
+    Return a dict mapping each of `anonymous_ids` to the dict of item ids ->
+    (earned, possible) that the submissions API returns for that student in
+    `course_id`.
+    """
+    # The submissions API has no bulk score lookup, so this takes one query per student.
+    course_id = course_id.to_deprecated_string()
+    return {
+        anonymous_id: sub_api.get_scores(course_id, anonymous_id)
+        for anonymous_id in anonymous_ids
+    }
+
+
+def _prefetch_scores(students, course):
+    """
+    Return a dict mapping the id of each of `students` to their
+    PrefetchedScores in `course`.
+
+    Student state and persisted grades take a constant number of queries
+    however many students are passed in (submissions scores take one query
+    per student), so callers should pass students in batches of at most
+    GRADING_BATCH_SIZE.
+    """
+    user_ids = [student.id for student in students]
+    anonymous_ids = anonymous_ids_for_users(students, course.id)
+
+    student_module_scores = {user_id: {} for user_id in user_ids}
+    state_read_at = timezone.now()
+    student_modules = StudentModule.objects.filter(
+        student__in=user_ids,
+        course_id=course.id
+    ).values_list('student_id', 'module_state_key', 'grade', 'max_grade', 'modified')
+    for student_id, module_state_key, module_grade, max_grade, modified in student_modules.iterator():
+        student_module_scores[student_id][unicode(module_state_key)] = (module_grade, max_grade, modified)
+
+    persisted_grades = {user_id: None for user_id in user_ids}
+    if _persistent_grades_enabled():
+        persisted_grades = {user_id: [] for user_id in user_ids}
+        for persisted_grade in PersistentSubsectionGrade.objects.filter(user__in=user_ids, course_id=course.id):
+            persisted_grades[persisted_grade.user_id].append(persisted_grade)
+
+    submissions_scores = _get_submissions_scores(course.id, anonymous_ids.values())
+
+    return {
+        user_id: PrefetchedScores(
+            submissions_scores[anonymous_ids[user_id]],
+            student_module_scores[user_id],
+            persisted_grades[user_id],
+            state_read_at
+        )
+        for user_id in user_ids
+    }
+
+
+def _batches(iterable, batch_size):
+    """
+    Yield lists of up to `batch_size` items from `iterable`, without loading
+    all of it in memory.
+    """
+    iterator = iter(iterable)
+    batch = list(islice(iterator, batch_size))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, batch_size))
+
+
 @contextmanager
 def manual_transaction():
     """A context manager for managing manual transactions"""
@@ -480,7 +812,7 @@ def manual_transaction():
         transaction.commit()
 
 
-def iterate_grades_for(course_id, students):
+def iterate_grades_for(course_id, students, batch_size=GRADING_BATCH_SIZE):
     """Given a course_id and an iterable of students (User), yield a tuple of:
 
     (student, gradeset, err_msg) for every student enrolled in the course.
@@ -497,6 +829,9 @@ def iterate_grades_for(course_id, students):
     - grade_breakdown : A breakdown of the major components that
         make up the final grade. (For display)
     - raw_scores: contains scores for every graded module
+
+    Students are graded in batches of `batch_size`, loading the scores of a
+    whole batch with a handful of queries.
     """
     course = courses.get_course_by_id(course_id)
 
@@ -505,6 +840,25 @@ def iterate_grades_for(course_id, students):
     # grading that student.
     request = RequestFactory().get('/')
 
+    for batch in _batches(students, batch_size):
+        try:
+            prefetched_scores = _prefetch_scores(batch, course)
+        except Exception:  # pylint: disable=broad-except
+            # Fall back to loading the scores of each student as they are graded
+            log.exception('Cannot load the scores of a batch of students in course %s', course_id)
+            prefetched_scores = {}
+
+        for student, gradeset, err_msg in _iterate_grades_for_batch(course, batch, request, prefetched_scores):
+            yield student, gradeset, err_msg
+
+
+def _iterate_grades_for_batch(course, students, request, prefetched_scores):
+    """
+    Yield the same (student, gradeset, err_msg) tuples as `iterate_grades_for`
+    for `students`, using the PrefetchedScores of `prefetched_scores` (a dict
+    keyed by user id) where available.
+    """
+    course_id = course.id
     for student in students:
         with dog_stats_api.timer('lms.grades.iterate_grades_for', tags=[u'action:{}'.format(course_id)]):
             try:
@@ -514,7 +868,7 @@ def iterate_grades_for(course_id, students):
                 # It's not pretty, but untangling that is currently beyond the
                 # scope of this feature.
                 request.session = {}
-                gradeset = grade(student, request, course)
+                gradeset = grade(student, request, course, prefetched_scores=prefetched_scores.get(student.id))
                 yield student, gradeset, ""
             except Exception as exc:  # pylint: disable=broad-except
                 # Keep marching on even if this student couldn't be graded for
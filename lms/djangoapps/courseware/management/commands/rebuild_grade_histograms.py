@@ -0,0 +1,37 @@
+"""
+Recompute the grade histograms shown to staff from the StudentModule table.
+
+The histograms (courseware.models.GradeHistogramBucket) are only updated when
+a student is graded through the LMS. Run this for the courses whose grades were
+written any other way, and for every course once the GradeHistogramBucket table
+has been created. Each course is rebuilt on its own; grades changed in a course
+while it is rebuilt may be miscounted until it is rebuilt again.
+"""
+from textwrap import dedent
+
+from django.core.management.base import BaseCommand, CommandError
+
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey
+
+from courseware.models import GradeHistogramBucket
+
+
+class Command(BaseCommand):
+    """
+    Rebuild the grade histograms of the given courses.
+    """
+    help = dedent(__doc__).strip()
+    args = "<course_id> [<course_id> ...]"
+
+    def handle(self, *args, **options):
+        if not args:
+            raise CommandError("At least one course_id is required")
+        try:
+            course_keys = [CourseKey.from_string(arg) for arg in args]
+        except InvalidKeyError:
+            raise CommandError("Invalid course_id")
+
+        for course_key in course_keys:
+            self.stdout.write(u"Rebuilding grade histograms for {}\n".format(course_key))
+            GradeHistogramBucket.rebuild(course_key)
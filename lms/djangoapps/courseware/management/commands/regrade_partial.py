@@ -10,7 +10,7 @@ from optparse import make_option
 
 from django.core.management.base import BaseCommand
 
-from courseware.models import StudentModule
+from courseware.models import GradeHistogramBucket, StudentModule
 from capa.correctmap import CorrectMap
 
 LOG = logging.getLogger(__name__)
@@ -133,8 +133,10 @@ class Command(BaseCommand):
                 "course_id": module.course_id,
             })
 
+            old_grade = module.grade
             module.grade = correct
             module.save()
+            GradeHistogramBucket.record_grade_change(module, old_grade, module.max_grade)
             self.num_changed += 1
         else:
             # don't make the change, but log that the change would be made
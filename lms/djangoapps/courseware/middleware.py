@@ -6,6 +6,7 @@ from django.shortcuts import redirect
 from django.core.urlresolvers import reverse
 
 from courseware.courses import UserNotEnrolled
+from courseware.models import start_pending_user_state_generations
 
 
 class RedirectUnenrolledMiddleware(object):
@@ -22,3 +23,24 @@ class RedirectUnenrolledMiddleware(object):
                     args=[course_key.to_deprecated_string()]
                 )
             )
+
+
+class UserStateCacheMiddleware(object):
+    """
+    Start the generations of cached StudentModules that were written during
+    the request once its transaction has ended (see
+    `courseware.models.invalidate_cached_user_state`).
+
+    This must come before TransactionMiddleware, so that it sees the response
+    after TransactionMiddleware has committed or rolled back.
+    """
+    def process_request(self, _request):
+        # Anything left over from work done outside of a request
+        start_pending_user_state_generations()
+
+    def process_response(self, _request, response):
+        start_pending_user_state_generations()
+        return response
+
+    def process_exception(self, _request, _exception):
+        start_pending_user_state_generations()
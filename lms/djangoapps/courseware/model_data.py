@@ -3,19 +3,24 @@ Classes to provide the LMS runtime data storage to XBlocks
 """
 
 import json
-from collections import defaultdict
+import sys
+from collections import defaultdict, OrderedDict
+from contextlib import contextmanager
 from itertools import chain
 from .models import (
     StudentModule,
     XModuleUserStateSummaryField,
     XModuleStudentPrefsField,
-    XModuleStudentInfoField
+    XModuleStudentInfoField,
+    user_state_cache,
+    USER_STATE_CACHE_TIMEOUT,
 )
 import logging
 from opaque_keys.edx.keys import CourseKey
 from opaque_keys.edx.block_types import BlockTypeKeyV1
 from opaque_keys.edx.asides import AsideUsageKeyV1
 
+from django.conf import settings
 from django.db import DatabaseError
 
 from xblock.runtime import KeyValueStore
@@ -26,6 +31,11 @@ from xblock.core import XBlockAside
 
 log = logging.getLogger(__name__)
 
+# Stored in user_state_cache for usages that have no StudentModule, so that
+# they don't have to be looked up in the database again. (A None value can't
+# be told apart from a cache miss.)
+NO_STUDENT_MODULE = False
+
 
 class InvalidWriteError(Exception):
     """
@@ -64,6 +74,10 @@ class FieldDataCache(object):
         self.cache = {}
         self.select_for_update = select_for_update
 
+        # While writes are being buffered, maps id(field_object) to the
+        # field object and the names of the fields that were written to it
+        self._buffered_writes = None
+
         if asides is None:
             self.asides = []
         else:
@@ -167,6 +181,54 @@ class FieldDataCache(object):
         )
         return res
 
+    def _use_user_state_cache(self):
+        """
+        Return whether StudentModules should be read through `user_state_cache`.
+        Rows that are to be locked always come straight from the database.
+        """
+        return settings.FEATURES.get('ENABLE_USER_STATE_CACHE', False) and not self.select_for_update
+
+    def _retrieve_cached_student_modules(self, usage_ids):
+        """
+        Return the StudentModules for `usage_ids`, reading them from
+        `user_state_cache` where possible and querying the database (and
+        populating the cache) for the rest.
+
+        Cached entries are keyed by a generation that changes once a
+        transaction that saved or deleted one of the student's StudentModules
+        has committed (see courseware.models.invalidate_cached_user_state), so
+        they are as current as the rows a query would return, and are saved
+        back like them.
+        """
+        generation = StudentModule.user_state_cache_generation(self.user.pk, self.course_id)
+        cache_keys = dict(
+            (StudentModule.user_state_cache_key(self.user.pk, self.course_id, usage_id, generation), usage_id)
+            for usage_id in usage_ids
+        )
+        cached = user_state_cache.get_many(cache_keys.keys())
+        student_modules = [
+            student_module for student_module in cached.itervalues()
+            if student_module is not NO_STUDENT_MODULE
+        ]
+
+        missing_keys = [cache_key for cache_key in cache_keys if cache_key not in cached]
+        if missing_keys:
+            to_cache = dict.fromkeys(missing_keys, NO_STUDENT_MODULE)
+            for student_module in self._chunked_query(
+                    StudentModule,
+                    'module_state_key__in',
+                    [cache_keys[cache_key] for cache_key in missing_keys],
+                    course_id=self.course_id,
+                    student=self.user.pk,
+            ):
+                student_modules.append(student_module)
+                to_cache[StudentModule.user_state_cache_key(
+                    self.user.pk, self.course_id, student_module.module_state_key, generation
+                )] = student_module
+            user_state_cache.set_many(to_cache, USER_STATE_CACHE_TIMEOUT)
+
+        return student_modules
+
     def _all_usage_ids(self, descriptors):
         """
         Return a set of all usage_ids for the descriptors that this FieldDataCache is caching
@@ -199,6 +261,8 @@ class FieldDataCache(object):
         Queries the database for all of the fields in the specified scope
         """
         if scope == Scope.user_state:
+            if self._use_user_state_cache():
+                return self._retrieve_cached_student_modules(self._all_usage_ids(descriptors))
             return self._chunked_query(
                 StudentModule,
                 'module_state_key__in',
@@ -321,6 +385,124 @@ class FieldDataCache(object):
         self.cache[cache_key] = field_object
         return field_object
 
+    @contextmanager
+    def buffer_writes(self):
+        """
+        Defer the writes made through `save_field_objects` inside this block
+        until it exits. A field object that is written several times is then
+        only saved once, and new field rows are inserted with bulk_create.
+
+        Nested calls are folded into the outermost block. The writes are still
+        made if the block raises; if they fail too, that is logged and the
+        block's exception is raised.
+        """
+        if self._buffered_writes is not None:
+            yield
+            return
+
+        self._buffered_writes = OrderedDict()
+        try:
+            yield
+        except Exception:
+            exc_info = sys.exc_info()
+            buffered_writes, self._buffered_writes = self._buffered_writes, None
+            try:
+                self._write_field_objects(buffered_writes.values(), bulk_create=True)
+            except Exception:  # pylint: disable=broad-except
+                log.exception("Failed to save buffered field writes after an error")
+            raise exc_info[0], exc_info[1], exc_info[2]
+        else:
+            buffered_writes, self._buffered_writes = self._buffered_writes, None
+            self._write_field_objects(buffered_writes.values(), bulk_create=True)
+
+    def save_field_objects(self, dirty_field_objects):
+        """
+        Save `dirty_field_objects`, a list of (field_object, [field names])
+        pairs, or queue them up if writes are being buffered.
+
+        Raises KeyValueMultiSaveError with the names of the fields that were
+        saved if any of the saves fail.
+        """
+        if self._buffered_writes is None:
+            self._write_field_objects(dirty_field_objects)
+            return
+
+        for field_object, names in dirty_field_objects:
+            _, buffered_names = self._buffered_writes.setdefault(id(field_object), (field_object, []))
+            buffered_names.extend(name for name in names if name not in buffered_names)
+
+    def delete_field_object(self, key):
+        """
+        Delete the field object for `key` (which must not be in Scope.user_state)
+        from the database and from this cache.
+        """
+        field_object = self.cache.pop(self._cache_key_from_kvs_key(key))
+        if self._buffered_writes is not None:
+            self._buffered_writes.pop(id(field_object), None)
+        # A field object created while writes were buffered may never have been saved
+        if field_object.pk is not None:
+            field_object.delete()
+
+    def _write_field_objects(self, dirty_field_objects, bulk_create=False):
+        """
+        Save each of `dirty_field_objects`. If `bulk_create` is set, new
+        rows (other than StudentModules, which rely on their post_save
+        signals) are inserted with a single query per model.
+        """
+        saved_fields = []
+        new_field_objects = defaultdict(list)
+        for field_object, names in dirty_field_objects:
+            if bulk_create and field_object.pk is None and not isinstance(field_object, StudentModule):
+                new_field_objects[type(field_object)].append((field_object, names))
+                continue
+
+            try:
+                # Save the field object that we made above
+                field_object.save(force_update=field_object.pk is not None)
+                # If save is successful on this scope, add the saved fields to
+                # the list of successful saves
+                saved_fields.extend(names)
+            except DatabaseError:
+                log.exception('Error saving fields %r', names)
+                raise KeyValueMultiSaveError(saved_fields)
+
+        for model_class, created in new_field_objects.items():
+            names = list(chain.from_iterable(names for _, names in created))
+            try:
+                model_class.objects.bulk_create([field_object for field_object, _ in created])
+            except DatabaseError:
+                log.exception('Error saving fields %r', names)
+                raise KeyValueMultiSaveError(saved_fields)
+            saved_fields.extend(names)
+            self._reload_created_field_objects(model_class, [field_object for field_object, _ in created])
+
+    def _reload_created_field_objects(self, model_class, field_objects):
+        """
+        bulk_create doesn't set the primary keys of the objects it inserts,
+        so replace `field_objects` in this cache with the rows from the
+        database, so that later writes update them rather than inserting
+        them again.
+        """
+        scope = {
+            XModuleUserStateSummaryField: Scope.user_state_summary,
+            XModuleStudentPrefsField: Scope.preferences,
+            XModuleStudentInfoField: Scope.user_info,
+        }[model_class]
+        cache_keys = set(self._cache_key_from_field_object(scope, field_object) for field_object in field_objects)
+
+        query = model_class.objects.filter(
+            field_name__in=set(field_object.field_name for field_object in field_objects)
+        )
+        if scope == Scope.user_state_summary:
+            query = query.filter(usage_id__in=set(field_object.usage_id for field_object in field_objects))
+        else:
+            query = query.filter(student=self.user.pk)
+
+        for field_object in query:
+            cache_key = self._cache_key_from_field_object(scope, field_object)
+            if cache_key in cache_keys:
+                self.cache[cache_key] = field_object
+
 
 class DjangoKeyValueStore(KeyValueStore):
     """
@@ -376,8 +558,9 @@ class DjangoKeyValueStore(KeyValueStore):
         `kv_dict`: A dictionary of dirty fields that maps
           xblock.KvsFieldData._key : value
 
+        If the FieldDataCache is buffering writes, the fields are saved when
+        it flushes them instead.
         """
-        saved_fields = []
         # field_objects maps id(field_object) to a the object and a list of associated fields.
         # We use id() because FieldDataCache might return django models with no primary key
         # set, but will return the same django model each time the same key is passed in.
@@ -402,16 +585,7 @@ class DjangoKeyValueStore(KeyValueStore):
                 # we don't have to worry about conflicts
                 field_object.value = json.dumps(kv_dict[key])
 
-        for field_object, names in dirty_field_objects.values():
-            try:
-                # Save the field object that we made above
-                field_object.save(force_update=field_object.pk is not None)
-                # If save is successful on this scope, add the saved fields to
-                # the list of successful saves
-                saved_fields.extend(names)
-            except DatabaseError:
-                log.exception('Error saving fields %r', names)
-                raise KeyValueMultiSaveError(saved_fields)
+        self._field_data_cache.save_field_objects(dirty_field_objects.values())
 
     def delete(self, key):
         if key.scope not in self._allowed_scopes:
@@ -425,9 +599,9 @@ class DjangoKeyValueStore(KeyValueStore):
             state = json.loads(field_object.state)
             del state[key.field_name]
             field_object.state = json.dumps(state)
-            field_object.save(force_update=field_object.pk is not None)
+            self._field_data_cache.save_field_objects([(field_object, [key.field_name])])
         else:
-            field_object.delete()
+            self._field_data_cache.delete_field_object(key)
 
     def has(self, key):
         if key.scope not in self._allowed_scopes:
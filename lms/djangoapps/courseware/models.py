@@ -12,13 +12,32 @@ file and check it in at the same time as your model changes. To do that,
 ASSUMPTIONS: modules have unique IDs, even across different module_types
 
 """
+import json
+import threading
+from uuid import uuid4
+
+from celery.signals import task_postrun
+
 from django.contrib.auth.models import User
 from django.conf import settings
-from django.db import models
-from django.db.models.signals import post_save
+from django.core.cache import get_cache, InvalidCacheBackendError
+from django.db import models, transaction
+from django.db.models import Count, F
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
-from xmodule_django.models import CourseKeyField, LocationKeyField, BlockTypeKeyField
+from monkey_patch.django_db_transaction import post_commit
+from xmodule_django.models import CourseKeyField, LocationKeyField, UsageKeyField, BlockTypeKeyField
+
+try:
+    user_state_cache = get_cache('user_state')  # pylint: disable=invalid-name
+except InvalidCacheBackendError:
+    from django.core.cache import cache as user_state_cache
+
+# StudentModules are only kept in user_state_cache briefly, which bounds how
+# long a row cached before ENABLE_USER_STATE_CACHE was turned off can be
+# served once it is turned back on.
+USER_STATE_CACHE_TIMEOUT = 60
 
 
 class StudentModule(models.Model):
@@ -82,6 +101,45 @@ class StudentModule(models.Model):
         else:
             return queryset
 
+    @classmethod
+    def user_state_cache_generation_key(cls, student_id, course_id):
+        """
+        Return the key of the generation that the cached StudentModules of
+        `student_id` in `course_id` are stored under in `user_state_cache`.
+        """
+        return u"courseware.user_state_generation.{}.{}".format(student_id, course_id)
+
+    @classmethod
+    def user_state_cache_generation(cls, student_id, course_id):
+        """
+        Return the current generation of the cached StudentModules of
+        `student_id` in `course_id`, starting a new one if there is none.
+        """
+        generation_key = cls.user_state_cache_generation_key(student_id, course_id)
+        generation = user_state_cache.get(generation_key)
+        if generation is None:
+            user_state_cache.add(generation_key, uuid4().hex)
+            generation = user_state_cache.get(generation_key)
+        return generation
+
+    @classmethod
+    def user_state_cache_key(cls, student_id, course_id, module_state_key, generation):
+        """
+        Return the key under which the StudentModule for `student_id`,
+        `course_id` and `module_state_key` is stored in `user_state_cache`
+        during `generation` (see `user_state_cache_generation`).
+
+        The module_state_key is normalized the same way it is when stored in
+        the database, so that keys with and without branch/version information
+        share a cache entry.
+        """
+        return u"courseware.user_state.{}.{}.{}.{}".format(
+            student_id,
+            course_id,
+            generation,
+            cls._meta.get_field('module_state_key').get_prep_value(module_state_key),
+        )
+
     def __repr__(self):
         return 'StudentModule<%r>' % ({
             'course_id': self.course_id,
@@ -195,6 +253,288 @@ class XModuleStudentInfoField(XBlockFieldBase):
     student = models.ForeignKey(User, db_index=True)
 
 
+class PersistentSubsectionGrade(models.Model):
+    """
+    Stores the most recently computed grade of a graded subsection for a user.
+
+    A row is only trusted while no StudentModule row in the subsection was
+    modified since `state_read_at` and while `version` matches the subtree
+    edit timestamp of the subsection it was computed from; otherwise
+    courseware.grades recomputes that one subsection and overwrites the row.
+    """
+    class Meta(object):  # pylint: disable=missing-docstring
+        unique_together = (('user', 'course_id', 'usage_key'),)
+
+    user = models.ForeignKey(User, db_index=True)
+    course_id = CourseKeyField(max_length=255, db_index=True)
+
+    # The subsection (sequential) that was graded
+    usage_key = UsageKeyField(max_length=255, db_index=True)
+
+    # Identifies the content the grade was computed against
+    version = models.CharField(max_length=255, blank=True, default='')
+
+    # The graded total for the subsection, as passed to the course grader
+    earned = models.FloatField()
+    possible = models.FloatField()
+
+    # JSON list of [earned, possible, graded, display_name] for each scored module
+    scores = models.TextField(default='[]')
+
+    # When the StudentModules that the grade was computed from were read. This
+    # is earlier than `modified`, which would hide writes made while grading.
+    state_read_at = models.DateTimeField(null=True, blank=True)
+
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+    modified = models.DateTimeField(auto_now=True, db_index=True)
+
+    @classmethod
+    def save_grade(cls, user, course_id, usage_key, version, earned, possible, scores, state_read_at):
+        """
+        Create or overwrite the persisted grade of the subsection `usage_key`
+        for `user`. `scores` is a list of (earned, possible, graded, display_name)
+        tuples, computed from StudentModules read at `state_read_at`.
+        """
+        values = {
+            'version': version,
+            'state_read_at': state_read_at,
+            'earned': earned,
+            'possible': possible,
+            'scores': json.dumps([list(score) for score in scores]),
+        }
+        grade, created = cls.objects.get_or_create(
+            user=user,
+            course_id=course_id,
+            usage_key=usage_key,
+            defaults=values
+        )
+        if not created:
+            for field_name, value in values.iteritems():
+                setattr(grade, field_name, value)
+            grade.save()
+        return grade
+
+    def get_scores(self):
+        """
+        Return the list of (earned, possible, graded, display_name) tuples saved with this grade.
+        """
+        return [tuple(score) for score in json.loads(self.scores)]
+
+    def __unicode__(self):
+        return u"[PersistentSubsectionGrade] {}: {} {} = {}/{}".format(
+            self.user, self.course_id, self.usage_key, self.earned, self.possible
+        )
+
+
+@receiver(post_delete, sender=StudentModule)
+def invalidate_persisted_grades(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Deleting student state (e.g. an instructor resetting a problem) leaves no
+    newer StudentModule row behind to mark a persisted grade as stale, so drop
+    the student's persisted grades for the course instead.
+    """
+    PersistentSubsectionGrade.objects.filter(
+        user_id=instance.student_id,
+        course_id=instance.course_id
+    ).delete()
+
+
+@receiver(post_save, sender=StudentModule)
+@receiver(post_delete, sender=StudentModule)
+def invalidate_cached_user_state(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Start a new generation of the student's cached StudentModules for the
+    course whenever one of them is written, so that the next FieldDataCache
+    for the student reloads them from the database.
+
+    Inside a managed transaction (e.g. a request wrapped by
+    TransactionMiddleware) the write isn't visible to other requests until it
+    commits, and a reader in between would cache the old row under the new
+    generation. So the new generation is only started by
+    `start_pending_user_state_generations`, once the transaction has committed
+    (see `start_committed_user_state_generations`) or otherwise ended (see
+    courseware.middleware.UserStateCacheMiddleware). A reader that cached the
+    old row before then did so under a generation that is never read again.
+
+    Nothing is done while ENABLE_USER_STATE_CACHE is off. Rows cached before
+    the feature was turned off expire after USER_STATE_CACHE_TIMEOUT.
+    """
+    if not settings.FEATURES.get('ENABLE_USER_STATE_CACHE', False):
+        return
+
+    generation_key = StudentModule.user_state_cache_generation_key(instance.student_id, instance.course_id)
+    if transaction.is_managed():
+        _pending_user_state_generations.keys.add(generation_key)
+    else:
+        user_state_cache.set(generation_key, uuid4().hex)
+
+
+def start_pending_user_state_generations():
+    """
+    Start the new generations of cached StudentModules that
+    `invalidate_cached_user_state` deferred to the end of the transaction
+    that wrote them.
+
+    This must be called once that transaction has committed or rolled back.
+    Starting a generation after a rollback only costs a reload.
+    """
+    generation_keys = _pending_user_state_generations.keys
+    if generation_keys:
+        _pending_user_state_generations.keys = set()
+        user_state_cache.set_many(dict((key, uuid4().hex) for key in generation_keys))
+
+
+class _PendingUserStateGenerations(threading.local):
+    """
+    The generation keys of the StudentModules written by this thread's
+    current transaction.
+    """
+    def __init__(self):
+        super(_PendingUserStateGenerations, self).__init__()
+        self.keys = set()
+
+
+_pending_user_state_generations = _PendingUserStateGenerations()  # pylint: disable=invalid-name
+
+
+@receiver(post_commit)
+def start_committed_user_state_generations(sender, **kwargs):  # pylint: disable=unused-argument
+    """
+    Start the generations deferred by the transaction that just committed,
+    wherever it was made (a request, a celery task, a management command...).
+    """
+    start_pending_user_state_generations()
+
+
+@task_postrun.connect
+def start_task_user_state_generations(**kwargs):  # pylint: disable=unused-argument
+    """
+    Celery tasks don't go through UserStateCacheMiddleware, so start the
+    generations that a task's transactions deferred once it has run.
+    """
+    start_pending_user_state_generations()
+
+
+class GradeHistogramBucket(models.Model):
+    """
+    Counts the graded StudentModule rows of a module that have a given grade and max_grade.
+
+    The buckets of a module make up the grade histogram shown to staff and on
+    the class dashboard, without grouping the StudentModule table on every
+    page view. Ungraded rows (grade or max_grade None) are not counted.
+
+    Saving a StudentModule does not touch the buckets: only the code that
+    grades a student calls record_grade_change(), and only when the grade
+    actually changes. Deleted rows are taken out of their bucket. Any other
+    grade writes are picked up when the course is rebuilt with the
+    rebuild_grade_histograms management command.
+    """
+    course_id = CourseKeyField(max_length=255, db_index=True)
+    module_state_key = LocationKeyField(max_length=255, db_index=True)
+    module_type = models.CharField(max_length=32, db_index=True)
+
+    grade = models.FloatField(null=True, blank=True)
+    max_grade = models.FloatField(null=True, blank=True)
+    count = models.IntegerField(default=0)
+
+    class Meta(object):
+        unique_together = (('course_id', 'module_state_key', 'grade', 'max_grade'),)
+
+    @classmethod
+    def add(cls, student_module, grade, max_grade, delta):
+        """
+        Add `delta` to the count of the bucket for `grade` and `max_grade`
+        of `student_module`'s module. Ungraded buckets are not kept.
+        """
+        if grade is None or max_grade is None:
+            return
+        bucket_filter = dict(
+            course_id=student_module.course_id,
+            module_state_key=student_module.module_state_key,
+            grade=grade,
+            max_grade=max_grade,
+        )
+        if cls.objects.filter(**bucket_filter).update(count=F('count') + delta):
+            return
+        if delta < 0:
+            # The row was never counted (e.g. graded by something other than
+            # the LMS since the last rebuild); a rebuild will count it.
+            return
+        # First student with this grade: get_or_create handles a concurrent
+        # create of the same bucket through the unique constraint.
+        _bucket, created = cls.objects.get_or_create(
+            defaults={'module_type': student_module.module_type, 'count': delta},
+            **bucket_filter
+        )
+        if not created:
+            cls.objects.filter(**bucket_filter).update(count=F('count') + delta)
+
+    @classmethod
+    def record_grade_change(cls, student_module, old_grade, old_max_grade):
+        """
+        Move `student_module` from the bucket of its previous grade to the
+        bucket of its current one, after the new grade has been saved.
+        """
+        if (old_grade, old_max_grade) == (student_module.grade, student_module.max_grade):
+            return
+        cls.add(student_module, old_grade, old_max_grade, -1)
+        cls.add(student_module, student_module.grade, student_module.max_grade, 1)
+
+    @classmethod
+    def histogram(cls, module_state_key):
+        """
+        Return the list of (grade, count) pairs of a module's graded students, ordered by grade.
+        """
+        counts = {}
+        for grade, count in cls.objects.filter(module_state_key=module_state_key).values_list('grade', 'count'):
+            counts[grade] = counts.get(grade, 0) + count
+        return sorted((grade, count) for grade, count in counts.iteritems() if count > 0)
+
+    @classmethod
+    def rebuild(cls, course_id):
+        """
+        Recompute all the buckets of a course from the StudentModule table.
+
+        The counts are computed first, and the buckets of the course are then
+        replaced by the new ones in a single transaction, so readers never see
+        a half-built histogram. Grades changed while the counts are computed
+        may be counted twice or not at all until the next rebuild.
+        """
+        rows = StudentModule.objects.filter(
+            course_id=course_id, grade__isnull=False, max_grade__isnull=False
+        ).values(
+            'module_state_key', 'module_type', 'grade', 'max_grade'
+        ).annotate(count=Count('id'))
+        buckets = [
+            cls(
+                course_id=course_id,
+                # values() returns the serialized key, not a UsageKey
+                module_state_key=course_id.make_usage_key_from_deprecated_string(row['module_state_key']),
+                module_type=row['module_type'],
+                grade=row['grade'],
+                max_grade=row['max_grade'],
+                count=row['count'],
+            )
+            for row in rows
+        ]
+        with transaction.commit_on_success():
+            cls.objects.filter(course_id=course_id).delete()
+            cls.objects.bulk_create(buckets)
+
+    def __unicode__(self):
+        return u"[GradeHistogramBucket] {}: {}/{} x {}".format(
+            self.module_state_key, self.grade, self.max_grade, self.count
+        )
+
+
+@receiver(post_delete, sender=StudentModule)
+def remove_from_grade_histogram(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Take a deleted StudentModule out of its grade histogram bucket.
+    """
+    GradeHistogramBucket.add(instance, instance.grade, instance.max_grade, -1)
+
+
 class OfflineComputedGrade(models.Model):
     """
     Table of grades computed offline for a given user and course.
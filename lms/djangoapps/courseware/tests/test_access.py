@@ -10,6 +10,7 @@ import courseware.access as access
 from courseware.masquerade import CourseMasquerade
 from courseware.tests.factories import UserFactory, StaffFactory, InstructorFactory
 from courseware.tests.helpers import LoginEnrollmentTestCase
+from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
 from student.tests.factories import AnonymousUserFactory, CourseEnrollmentAllowedFactory, CourseEnrollmentFactory
 from xmodule.course_module import (
     CATALOG_VISIBILITY_CATALOG_AND_ABOUT, CATALOG_VISIBILITY_ABOUT,
@@ -253,6 +254,25 @@ class AccessTestCase(LoginEnrollmentTestCase, ModuleStoreTestCase):
         self.assertTrue(access._has_access_course_desc(staff, 'see_in_catalog', course))
         self.assertTrue(access._has_access_course_desc(staff, 'see_about_page', course))
 
+    @patch.dict('django.conf.settings.FEATURES', {'DISABLE_START_DATES': False})
+    def test__has_access_course_overview(self):
+        """
+        Course overviews answer the dashboard's access checks the same way
+        as the course descriptor they were built from.
+        """
+        tomorrow = datetime.datetime.now(pytz.utc) + datetime.timedelta(days=1)
+        yesterday = datetime.datetime.now(pytz.utc) - datetime.timedelta(days=1)
+        for start, visible_to_staff_only in [(tomorrow, False), (yesterday, False), (yesterday, True)]:
+            course = CourseFactory.create(start=start, visible_to_staff_only=visible_to_staff_only)
+            course_overview = CourseOverview.get_from_id(course.id)
+            staff = StaffFactory.create(course_key=course.id)
+            for user in (self.student, self.anonymous_user, staff):
+                for action in ('load', 'view_courseware_with_prerequisites', 'staff', 'see_exists'):
+                    self.assertEqual(
+                        access.has_access(user, action, course),
+                        access.has_access(user, action, course_overview),
+                    )
+
     @patch.dict("django.conf.settings.FEATURES", {'ENABLE_PREREQUISITE_COURSES': True, 'MILESTONES_APP': True})
     def test_access_on_course_with_pre_requisites(self):
         """
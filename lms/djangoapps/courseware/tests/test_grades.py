@@ -1,17 +1,26 @@
 """
 Test grade calculation.
 """
+from datetime import timedelta
+
+from django.conf import settings
 from django.http import Http404
-from mock import patch
+from django.test.client import RequestFactory
+from mock import Mock, patch
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 
-from courseware.grades import grade, iterate_grades_for
+from courseware.grades import (
+    grade, iterate_grades_for, get_score, progress_summary, _get_student_module_scores, _prefetch_scores
+)
+from courseware.models import PersistentSubsectionGrade, StudentModule
+from courseware.tests.factories import StudentModuleFactory
 from student.tests.factories import UserFactory
-from xmodule.modulestore.tests.factories import CourseFactory
+from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 
 
-def _grade_with_errors(student, request, course, keep_raw_scores=False):
+def _grade_with_errors(student, request, course, keep_raw_scores=False, prefetched_scores=None):
     """This fake grade method will throw exceptions for student3 and
     student4, but allow any other students to go through normal grading.
 
@@ -22,7 +31,7 @@ def _grade_with_errors(student, request, course, keep_raw_scores=False):
     if student.username in ['student3', 'student4']:
         raise Exception("I don't like {}".format(student.username))
 
-    return grade(student, request, course, keep_raw_scores=keep_raw_scores)
+    return grade(student, request, course, keep_raw_scores=keep_raw_scores, prefetched_scores=prefetched_scores)
 
 
 class TestGradeIteration(ModuleStoreTestCase):
@@ -119,3 +128,164 @@ class TestGradeIteration(ModuleStoreTestCase):
                 students_to_errors[student] = err_msg
 
         return students_to_gradesets, students_to_errors
+
+
+class GradedCourseTestCase(ModuleStoreTestCase):
+    """
+    Base class for tests grading a student on a course with a single graded problem.
+    """
+    def setUp(self):
+        super(GradedCourseTestCase, self).setUp()
+        course = CourseFactory.create()
+        chapter = ItemFactory.create(parent_location=course.location, category='chapter')
+        self.sequence = ItemFactory.create(
+            parent_location=chapter.location,
+            category='sequential',
+            metadata={'graded': True, 'format': 'Homework'}
+        )
+        self.problem = ItemFactory.create(parent_location=self.sequence.location, category='problem')
+        self.course = modulestore().get_course(course.id)
+
+        self.student = UserFactory.create()
+        self.request = RequestFactory().get('/')
+        self.request.user = self.student
+        self.request.session = {}
+        self.student_module = StudentModuleFactory.create(
+            student=self.student,
+            course_id=self.course.id,
+            module_state_key=self.problem.location,
+            grade=1,
+            max_grade=2
+        )
+
+    def _homework_total(self):
+        """
+        Grade the student and return the graded total of the homework subsection.
+        """
+        grade_summary = grade(self.student, self.request, self.course)
+        return grade_summary['totaled_scores']['Homework'][0]
+
+
+class TestStudentModuleScores(GradedCourseTestCase):
+    """
+    Test that grading reads all of a student's scores with a single query.
+    """
+    def test_scores_are_prefetched(self):
+        student_module_scores = _get_student_module_scores(self.student, self.course.id)
+        module_creator = Mock()
+        with self.assertNumQueries(0):
+            score = get_score(
+                self.course.id,
+                self.student,
+                self.problem,
+                module_creator,
+                student_module_scores=student_module_scores
+            )
+        self.assertEqual(score, (1, 2))
+        self.assertFalse(module_creator.called)
+
+    def test_missing_max_grade_instantiates_module(self):
+        self.student_module.max_grade = None
+        self.student_module.save()
+        student_module_scores = _get_student_module_scores(self.student, self.course.id)
+        module_creator = Mock()
+        module_creator.return_value.max_score.return_value = 3
+        score = get_score(
+            self.course.id,
+            self.student,
+            self.problem,
+            module_creator,
+            student_module_scores=student_module_scores
+        )
+        self.assertEqual(score, (0, 3))
+        module_creator.assert_called_once_with(self.problem)
+
+    def test_grading_does_not_query_per_problem(self):
+        with patch('courseware.grades.StudentModule.objects.get') as mock_get:
+            self.assertEqual(self._homework_total().earned, 1)
+        self.assertFalse(mock_get.called)
+
+
+class TestBatchedGrading(GradedCourseTestCase):
+    """
+    Test grading students in batches with bulk-loaded scores.
+    """
+    def test_prefetch_scores(self):
+        other_student = UserFactory.create()
+        prefetched_scores = _prefetch_scores([self.student, other_student], self.course)
+        self.assertEqual(
+            prefetched_scores[self.student.id].student_module_scores.values()[0][:2], (1, 2)
+        )
+        self.assertEqual(prefetched_scores[other_student.id].student_module_scores, {})
+        self.assertEqual(prefetched_scores[other_student.id].submissions_scores, {})
+
+    def test_batched_grades_match_single_grades(self):
+        other_student = UserFactory.create()
+        expected = {
+            student: grade(student, self.request, self.course)['percent']
+            for student in (self.student, other_student)
+        }
+        with patch('courseware.grades.sub_api.get_scores') as mock_get_scores:
+            mock_get_scores.return_value = {}
+            results = list(iterate_grades_for(self.course.id, [self.student, other_student], batch_size=1))
+        # Only prefetching reads the submissions scores, once per student
+        self.assertEqual(mock_get_scores.call_count, 2)
+        self.assertEqual(
+            {student: gradeset['percent'] for student, gradeset, _ in results},
+            expected
+        )
+
+
+@patch.dict(settings.FEATURES, {'ENABLE_PERSISTENT_GRADES': True})
+class TestPersistentSubsectionGrades(GradedCourseTestCase):
+    """
+    Test that subsection grades are persisted and only recomputed when stale.
+    """
+
+    def test_grade_is_persisted(self):
+        self.assertEqual(self._homework_total().earned, 1)
+        persisted_grade = PersistentSubsectionGrade.objects.get(user=self.student, course_id=self.course.id)
+        self.assertEqual(persisted_grade.usage_key, self.sequence.location)
+        self.assertEqual((persisted_grade.earned, persisted_grade.possible), (1, 2))
+
+    def test_persisted_grade_is_reused(self):
+        self._homework_total()
+        with patch('courseware.grades.get_score') as mock_get_score:
+            self.assertEqual(self._homework_total().earned, 1)
+        self.assertFalse(mock_get_score.called)
+
+    def test_changed_state_is_regraded(self):
+        self._homework_total()
+        self.student_module.grade = 2
+        self.student_module.save()
+        self.assertEqual(self._homework_total().earned, 2)
+        persisted_grade = PersistentSubsectionGrade.objects.get(user=self.student, course_id=self.course.id)
+        self.assertEqual(persisted_grade.earned, 2)
+
+    def test_state_written_while_grading_is_regraded(self):
+        self._homework_total()
+        # The new grade was written after the state was read for grading, but
+        # before the persisted grade was saved.
+        StudentModule.objects.filter(pk=self.student_module.pk).update(grade=2)
+        PersistentSubsectionGrade.objects.filter(user=self.student).update(
+            state_read_at=self.student_module.modified - timedelta(seconds=1)
+        )
+        self.assertEqual(self._homework_total().earned, 2)
+
+    def test_progress_summary_uses_persisted_grade(self):
+        self._homework_total()
+        with patch('courseware.grades.get_score') as mock_get_score:
+            chapters = progress_summary(self.student, self.request, self.course)
+        self.assertFalse(mock_get_score.called)
+        section = chapters[0]['sections'][0]
+        self.assertEqual(
+            [(score.earned, score.possible) for score in section['scores']],
+            [(1, 2)]
+        )
+
+    def test_deleted_state_drops_persisted_grades(self):
+        self._homework_total()
+        self.student_module.delete()
+        self.assertFalse(PersistentSubsectionGrade.objects.filter(user=self.student).exists())
+        self.assertEqual(self._homework_total().earned, 0)
+
@@ -3,12 +3,13 @@ Tests for courseware middleware
 """
 
 from django.core.urlresolvers import reverse
+from django.test import TestCase
 from django.test.client import RequestFactory
 from django.http import Http404
-from mock import patch
+from mock import Mock, patch
 
 import courseware.courses as courses
-from courseware.middleware import RedirectUnenrolledMiddleware
+from courseware.middleware import RedirectUnenrolledMiddleware, UserStateCacheMiddleware
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 from xmodule.modulestore.tests.factories import CourseFactory
 
@@ -50,3 +51,20 @@ class CoursewareMiddlewareTestCase(ModuleStoreTestCase):
             request, Http404()
         )
         self.assertIsNone(response)
+
+
+class UserStateCacheMiddlewareTestCase(TestCase):
+    """Tests that the user state cache generations are started at the end of requests"""
+
+    @patch('courseware.middleware.start_pending_user_state_generations')
+    def test_process_response(self, mock_start):
+        request = RequestFactory().get("dummy_url")
+        response = Mock()
+        self.assertIs(response, UserStateCacheMiddleware().process_response(request, response))
+        mock_start.assert_called_once_with()
+
+    @patch('courseware.middleware.start_pending_user_state_generations')
+    def test_process_exception(self, mock_start):
+        request = RequestFactory().get("dummy_url")
+        self.assertIsNone(UserStateCacheMiddleware().process_exception(request, Exception()))
+        mock_start.assert_called_once_with()
@@ -7,9 +7,10 @@ from functools import partial
 
 from courseware.model_data import DjangoKeyValueStore
 from courseware.model_data import InvalidScopeError, FieldDataCache
-from courseware.models import StudentModule
+from courseware.models import StudentModule, start_pending_user_state_generations
 from courseware.models import XModuleStudentInfoField, XModuleStudentPrefsField
 
+from monkey_patch.django_db_transaction import post_commit
 from student.tests.factories import UserFactory
 from courseware.tests.factories import StudentModuleFactory as cmfStudentModuleFactory, location, course_id
 from courseware.tests.factories import UserStateSummaryFactory
@@ -18,6 +19,8 @@ from courseware.tests.factories import StudentPrefsFactory, StudentInfoFactory
 from xblock.fields import Scope, BlockScope, ScopeIds
 from xblock.exceptions import KeyValueMultiSaveError
 from xblock.core import XBlock
+from django.conf import settings
+from django.core.cache import cache
 from django.test import TestCase
 from django.db import DatabaseError
 
@@ -194,6 +197,29 @@ class TestStudentModuleStorage(OtherUserFailureTestMixin, TestCase):
         for key in kv_dict:
             self.assertEquals(self.kvs.get(key), kv_dict[key])
 
+    def test_buffered_writes(self):
+        "Test that buffered writes to Scope.user_state are saved once, when the buffer is flushed"
+        with self.assertNumQueries(2):
+            with self.field_data_cache.buffer_writes():
+                with self.assertNumQueries(0):
+                    self.kvs.set(user_state_key('a_field'), 'new_value')
+                    self.kvs.set_many(self.construct_kv_dict())
+                    self.kvs.delete(user_state_key('b_field'))
+
+        self.assertEquals(1, StudentModule.objects.all().count())
+        self.assertEquals(
+            {'a_field': 'new_value', 'field_a': 'new value', 'field_b': 'newer value'},
+            json.loads(StudentModule.objects.all()[0].state)
+        )
+
+    def test_buffered_writes_keep_block_exception(self):
+        "Test that a failure to flush buffered writes doesn't hide the exception that ended the block"
+        with patch('django.db.models.Model.save', side_effect=DatabaseError):
+            with self.assertRaises(ValueError):
+                with self.field_data_cache.buffer_writes():
+                    self.kvs.set(user_state_key('a_field'), 'new_value')
+                    raise ValueError()
+
     def test_set_many_failure(self):
         "Test failures when setting many fields that are scoped to Scope.user_state"
         kv_dict = self.construct_kv_dict()
@@ -255,6 +281,120 @@ class TestMissingStudentModule(TestCase):
             self.assertFalse(self.kvs.has(user_state_key('a_field')))
 
 
+@patch.dict(settings.FEATURES, {'ENABLE_USER_STATE_CACHE': True})
+class TestCachedStudentModuleStorage(TestCase):
+    """Tests for reading user_state through the user state cache"""
+    def setUp(self):
+        super(TestCachedStudentModuleStorage, self).setUp()
+        start_pending_user_state_generations()
+        cache.clear()
+        self.user = UserFactory.create(username='user')
+        self.assertEqual(self.user.id, 1)   # check our assumption hard-coded in the key functions above.
+        self.descriptors = [mock_descriptor([mock_field(Scope.user_state, 'a_field')])]
+
+    def _field_data_cache(self):
+        """Return a new FieldDataCache for the mock descriptor"""
+        return FieldDataCache(self.descriptors, course_id, self.user)
+
+    def test_cached_student_module(self):
+        StudentModuleFactory(student=self.user, state=json.dumps({'a_field': 'a_value'}))
+
+        with self.assertNumQueries(1):
+            self._field_data_cache()
+
+        with self.assertNumQueries(0):
+            kvs = DjangoKeyValueStore(self._field_data_cache())
+        self.assertEquals('a_value', kvs.get(user_state_key('a_field')))
+
+    def test_cached_missing_student_module(self):
+        with self.assertNumQueries(1):
+            self._field_data_cache()
+
+        with self.assertNumQueries(0):
+            kvs = DjangoKeyValueStore(self._field_data_cache())
+        self.assertFalse(kvs.has(user_state_key('a_field')))
+
+    def test_set_invalidates_cache(self):
+        kvs = DjangoKeyValueStore(self._field_data_cache())
+        kvs.set(user_state_key('a_field'), 'a_value')
+        start_pending_user_state_generations()
+
+        with self.assertNumQueries(1):
+            kvs = DjangoKeyValueStore(self._field_data_cache())
+        self.assertEquals('a_value', kvs.get(user_state_key('a_field')))
+
+        kvs.set(user_state_key('a_field'), 'new_value')
+        start_pending_user_state_generations()
+        kvs = DjangoKeyValueStore(self._field_data_cache())
+        self.assertEquals('new_value', kvs.get(user_state_key('a_field')))
+
+    def test_invalidation_waits_for_transaction_end(self):
+        student_module = StudentModuleFactory(student=self.user, state=json.dumps({'a_field': 'a_value'}))
+        start_pending_user_state_generations()
+        self._field_data_cache()
+
+        # Tests run inside a transaction, so the write is still uncommitted here
+        student_module.state = json.dumps({'a_field': 'new_value'})
+        student_module.save()
+        with self.assertNumQueries(0):
+            self._field_data_cache()
+
+        start_pending_user_state_generations()
+        with self.assertNumQueries(1):
+            kvs = DjangoKeyValueStore(self._field_data_cache())
+        self.assertEquals('new_value', kvs.get(user_state_key('a_field')))
+
+    def test_invalidation_on_commit(self):
+        student_module = StudentModuleFactory(student=self.user, state=json.dumps({'a_field': 'a_value'}))
+        start_pending_user_state_generations()
+        self._field_data_cache()
+
+        student_module.state = json.dumps({'a_field': 'new_value'})
+        student_module.save()
+        post_commit.send(sender=None, using='default')
+        with self.assertNumQueries(1):
+            kvs = DjangoKeyValueStore(self._field_data_cache())
+        self.assertEquals('new_value', kvs.get(user_state_key('a_field')))
+
+    def test_delete_invalidates_cache(self):
+        StudentModuleFactory(student=self.user, state=json.dumps({'a_field': 'a_value'}))
+        start_pending_user_state_generations()
+        self._field_data_cache()
+
+        StudentModule.objects.all().delete()
+        start_pending_user_state_generations()
+
+        kvs = DjangoKeyValueStore(self._field_data_cache())
+        self.assertFalse(kvs.has(user_state_key('a_field')))
+
+    def test_select_for_update_skips_cache(self):
+        self._field_data_cache()
+
+        with self.assertNumQueries(1):
+            FieldDataCache(self.descriptors, course_id, self.user, select_for_update=True)
+
+    def test_write_cached_student_module(self):
+        StudentModuleFactory(student=self.user, state=json.dumps({'a_field': 'a_value', 'b_field': 'b_value'}))
+        start_pending_user_state_generations()
+        self._field_data_cache()
+
+        # Saved from the cached row, without reading it back from the database
+        kvs = DjangoKeyValueStore(self._field_data_cache())
+        with self.assertNumQueries(2):
+            kvs.set(user_state_key('a_field'), 'new_value')
+        self.assertEquals(
+            {'a_field': 'new_value', 'b_field': 'b_value'},
+            json.loads(StudentModule.objects.get(student=self.user).state)
+        )
+
+    def test_no_invalidation_while_disabled(self):
+        with patch.dict(settings.FEATURES, {'ENABLE_USER_STATE_CACHE': False}):
+            with patch('courseware.models.user_state_cache') as mock_cache:
+                StudentModuleFactory(student=self.user, state=json.dumps({'a_field': 'a_value'}))
+                start_pending_user_state_generations()
+        self.assertFalse(mock_cache.method_calls)
+
+
 class StorageTestBase(object):
     """
     A base class for that gets subclassed when testing each of the scopes.
@@ -356,6 +496,35 @@ class StorageTestBase(object):
         for key in kv_dict:
             self.assertEquals(self.kvs.get(key), kv_dict[key])
 
+    def test_buffered_set_missing_fields(self):
+        "Test that fields created while writes are buffered are inserted together"
+        # One query to insert the new rows, and one to reload them
+        with self.assertNumQueries(2):
+            with self.field_data_cache.buffer_writes():
+                with self.assertNumQueries(0):
+                    self.kvs.set(self.key_factory('missing_field'), 'new_value')
+                    self.kvs.set(self.key_factory('other_missing_field'), 'other_value')
+                    self.kvs.set(self.key_factory('missing_field'), 'newer_value')
+
+        self.assertEquals(3, self.storage_class.objects.all().count())
+        self.assertEquals('newer_value', json.loads(self.storage_class.objects.get(field_name='missing_field').value))
+
+        # The reloaded rows are updated rather than inserted again
+        with self.assertNumQueries(1):
+            self.kvs.set(self.key_factory('missing_field'), 'newest_value')
+        self.assertEquals(3, self.storage_class.objects.all().count())
+        self.assertEquals('newest_value', json.loads(self.storage_class.objects.get(field_name='missing_field').value))
+
+    def test_buffered_set_and_delete_missing_field(self):
+        "Test that a field created and deleted while writes are buffered is never saved"
+        with self.assertNumQueries(0):
+            with self.field_data_cache.buffer_writes():
+                self.kvs.set(self.key_factory('missing_field'), 'new_value')
+                self.kvs.delete(self.key_factory('missing_field'))
+
+        self.assertEquals(1, self.storage_class.objects.all().count())
+        self.assertFalse(self.kvs.has(self.key_factory('missing_field')))
+
     def test_set_many_failure(self):
         """Test that setting many regular fields with a DB error """
         kv_dict = self.construct_kv_dict()
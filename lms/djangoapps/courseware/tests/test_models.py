@@ -0,0 +1,87 @@
+"""
+Tests for courseware models.
+"""
+from django.test import TestCase
+from opaque_keys.edx.locations import SlashSeparatedCourseKey
+
+from courseware.models import GradeHistogramBucket
+from courseware.tests.factories import StudentModuleFactory
+
+
+class TestGradeHistogram(TestCase):
+    """
+    Test that the grade histograms follow grade changes of student state.
+    """
+    def setUp(self):
+        super(TestGradeHistogram, self).setUp()
+        self.course_key = SlashSeparatedCourseKey("MITx", "999", "Robot_Super_Course")
+        self.location = self.course_key.make_usage_key('problem', 'histogram_problem')
+
+    def _grade_student(self, grade, max_grade=2):
+        """
+        Create the student state of a new student for the problem and grade it.
+        """
+        student_module = StudentModuleFactory.create(
+            course_id=self.course_key,
+            module_state_key=self.location,
+            grade=grade,
+            max_grade=max_grade,
+        )
+        GradeHistogramBucket.record_grade_change(student_module, None, None)
+        return student_module
+
+    def test_histogram_follows_grade_changes(self):
+        first = self._grade_student(1)
+        second = self._grade_student(1)
+        self._grade_student(2)
+        self.assertEqual(GradeHistogramBucket.histogram(self.location), [(1, 2), (2, 1)])
+
+        first.grade = 2
+        first.save()
+        GradeHistogramBucket.record_grade_change(first, 1, 2)
+        self.assertEqual(GradeHistogramBucket.histogram(self.location), [(1, 1), (2, 2)])
+
+        second.delete()
+        self.assertEqual(GradeHistogramBucket.histogram(self.location), [(2, 2)])
+
+    def test_ungraded_student_modules_are_not_counted(self):
+        self._grade_student(None, max_grade=None)
+        ungraded = self._grade_student(None, max_grade=None)
+        self.assertFalse(GradeHistogramBucket.objects.exists())
+
+        ungraded.delete()
+        self.assertFalse(GradeHistogramBucket.objects.exists())
+
+    def test_saves_leave_buckets_alone(self):
+        student_module = self._grade_student(1)
+        student_module.grade = 2
+        student_module.save()
+        self.assertEqual(GradeHistogramBucket.histogram(self.location), [(1, 1)])
+
+        with self.assertNumQueries(0):
+            GradeHistogramBucket.record_grade_change(student_module, 2, 2)
+
+    def test_uncounted_grade_change_creates_no_negative_bucket(self):
+        # Graded before the histograms were built, so not counted anywhere
+        student_module = StudentModuleFactory.create(
+            course_id=self.course_key, module_state_key=self.location, grade=1, max_grade=2
+        )
+        student_module.grade = 2
+        student_module.save()
+        GradeHistogramBucket.record_grade_change(student_module, 1, 2)
+        self.assertEqual(GradeHistogramBucket.histogram(self.location), [(2, 1)])
+        self.assertFalse(GradeHistogramBucket.objects.filter(count__lt=0).exists())
+
+        student_module.delete()
+        self.assertFalse(GradeHistogramBucket.objects.filter(count__lt=0).exists())
+
+    def test_rebuild(self):
+        self._grade_student(1)
+        self._grade_student(2)
+        StudentModuleFactory.create(course_id=self.course_key, module_state_key=self.location)
+        expected = GradeHistogramBucket.histogram(self.location)
+        GradeHistogramBucket.objects.all().update(count=0)
+
+        GradeHistogramBucket.rebuild(self.course_key)
+        self.assertEqual(GradeHistogramBucket.histogram(self.location), expected)
+        self.assertFalse(GradeHistogramBucket.objects.filter(grade__isnull=True).exists())
@@ -21,6 +21,7 @@ from xblock.field_data import FieldData
 from xblock.runtime import Runtime
 from xblock.fields import ScopeIds
 from xblock.core import XBlock
+from xblock.exceptions import KeyValueMultiSaveError
 from xblock.fragment import Fragment
 
 from capa.tests.response_xml_factory import OptionResponseXMLFactory
@@ -361,6 +362,20 @@ class TestHandleXBlockCallback(ModuleStoreTestCase, LoginEnrollmentTestCase):
         )
         self.assertIsInstance(response, HttpResponse)
 
+    def test_xmodule_dispatch_save_failure(self):
+        request = self.request_factory.post('dummy_url', data={'position': 1})
+        request.user = self.mock_user
+        with patch.object(FieldDataCache, '_write_field_objects', side_effect=KeyValueMultiSaveError([])):
+            response = render.handle_xblock_callback(
+                request,
+                self.course_key.to_deprecated_string(),
+                quote_slashes(self.location.to_deprecated_string()),
+                'xmodule_handler',
+                'goto_position',
+            )
+        self.assertEqual(response.status_code, 500)
+        self.assertIn('could not be saved', json.loads(response.content)['success'])
+
     def test_bad_course_id(self):
         request = self.request_factory.post('dummy_url')
         request.user = self.mock_user
@@ -923,7 +938,7 @@ class TestStaffDebugInfo(ModuleStoreTestCase):
             self.user,
             self.descriptor
         )
-        with patch('xmodule_modifiers.grade_histogram') as mock_grade_histogram:
+        with patch('courseware.module_render.GradeHistogramBucket.histogram') as mock_grade_histogram:
             mock_grade_histogram.return_value = []
             module = render.get_module(
                 self.user,
@@ -945,7 +960,7 @@ class TestStaffDebugInfo(ModuleStoreTestCase):
             max_grade=1,
             state="{}",
         )
-        with patch('xmodule_modifiers.grade_histogram') as mock_grade_histogram:
+        with patch('courseware.module_render.GradeHistogramBucket.histogram') as mock_grade_histogram:
             mock_grade_histogram.return_value = []
             module = render.get_module(
                 self.user,
@@ -970,6 +970,24 @@ class TestAnswerDistributions(TestSubmittingProblems):
             }
         )
 
+    def test_iter_answer_distributions(self):
+        # Reading the problem states in chunks of a single row yields the
+        # same distributions, sorted by problem part.
+        self.submit_question_answer('p2', {'2_1': u'Incorrect'})
+        self.submit_question_answer('p1', {'2_1': u'Correct'})
+
+        user2 = UserFactory.create()
+        StudentModule.objects.filter(course_id=self.course.id, student=self.student_user).update(student=user2)
+        self.submit_question_answer('p1', {'2_1': u'Correct'})
+
+        self.assertEqual(
+            list(grades.iter_answer_distributions(self.course.id, chunk_size=1)),
+            [
+                (('p1', 'p1', '{}_2_1'.format(self.p1_html_id)), {'Correct': 2}),
+                (('p2', 'p2', '{}_2_1'.format(self.p2_html_id)), {'Incorrect': 1}),
+            ]
+        )
+
     def test_other_data_types(self):
         # We'll submit one problem, and then muck with the student_answers
         # dict inside its state to try different data types (str, int, float,
@@ -13,7 +13,7 @@ from xmodule.open_ended_grading_classes.openendedchild import OpenEndedChild
 
 from courseware.courses import get_course
 from courseware.models import StudentModule
-from student.models import anonymous_id_for_user, CourseEnrollment
+from student.models import anonymous_ids_for_users, CourseEnrollment
 
 from instructor.utils import get_module_for_student
 
@@ -129,8 +129,11 @@ def calculate_task_statistics(students, course, location, task_number, write_to_
         time_stamp = time.strftime("%Y%m%d-%H%M%S")
         with open('{0}.{1}.csv'.format(filename, time_stamp), 'wb') as csv_file:
             writer = csv.writer(csv_file, delimiter=' ', quoting=csv.QUOTE_MINIMAL)
+            anonymous_ids = anonymous_ids_for_users(
+                students_with_ungraded_submissions + students_with_graded_submissions, None
+            )
             for student in students_with_ungraded_submissions:
-                writer.writerow(("ungraded", student.id, anonymous_id_for_user(student, None), student.username))
+                writer.writerow(("ungraded", student.id, anonymous_ids[student.id], student.username))
             for student in students_with_graded_submissions:
-                writer.writerow(("graded", student.id, anonymous_id_for_user(student, None), student.username))
+                writer.writerow(("graded", student.id, anonymous_ids[student.id], student.username))
     return stats
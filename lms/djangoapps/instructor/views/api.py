@@ -58,7 +58,7 @@ from shoppingcart.models import (
     CourseRegistrationCodeInvoiceItem,
 )
 from student.models import (
-    CourseEnrollment, unique_id_for_user, anonymous_id_for_user,
+    CourseEnrollment, anonymous_ids_for_users,
     UserProfile, Registration, EntranceExamConfiguration
 )
 import instructor_task.api
@@ -1455,11 +1455,14 @@ def get_anon_ids(request, course_id):  # pylint: disable=unused-argument
             writer.writerow(encoded)
         return response
 
-    students = User.objects.filter(
+    students = list(User.objects.filter(
         courseenrollment__course_id=course_id,
-    ).order_by('id')
+    ).order_by('id'))
     header = ['User ID', 'Anonymized User ID', 'Course Specific Anonymized User ID']
-    rows = [[s.id, unique_id_for_user(s, save=False), anonymous_id_for_user(s, course_id, save=False)] for s in students]
+    # A course_id of None gives the per-student ids of unique_id_for_user
+    unique_ids = anonymous_ids_for_users(students, None, save=False)
+    anonymous_ids = anonymous_ids_for_users(students, course_id, save=False)
+    rows = [[s.id, unique_ids[s.id], anonymous_ids[s.id]] for s in students]
     return csv_response(course_id.to_deprecated_string().replace('/', '-') + '-anon-ids.csv', header, rows)
 
 
@@ -1951,6 +1954,28 @@ def calculate_grades_csv(request, course_id):
         })
 
 
+@ensure_csrf_cookie
+@cache_control(no_cache=True, no_store=True, must_revalidate=True)
+@require_level('staff')
+def calculate_answer_distribution_csv(request, course_id):
+    """
+    Submits a task to generate the answer distribution report of the course.
+    """
+    course_key = SlashSeparatedCourseKey.from_deprecated_string(course_id)
+    try:
+        instructor_task.api.submit_calculate_answer_distribution_csv(request, course_key)
+        success_status = _("Your answer distribution report is being generated! "
+                           "You can view the status of the generation task in the 'Pending Instructor Tasks' section.")
+        return JsonResponse({"status": success_status})
+    except AlreadyRunningError:
+        already_running_status = _("An answer distribution report generation task is already in progress. "
+                                   "Check the 'Pending Instructor Tasks' table for the status of the task. "
+                                   "When completed, the report will be available for download in the table below.")
+        return JsonResponse({
+            "status": already_running_status
+        })
+
+
 @ensure_csrf_cookie
 @cache_control(no_cache=True, no_store=True, must_revalidate=True)
 @require_level('staff')
@@ -1083,20 +1083,18 @@ def get_answers_distribution(request, course_key):
 
     Return a dict with two keys:
     'header': a header row
-    'data': a list of rows
+    'data': an iterator over the rows, computed as they are written
     """
     course = get_course_with_access(request.user, 'staff', course_key)
 
-    course_answer_distributions = grades.answer_distributions(course.id)
-
     dist = {}
     dist['header'] = ['url_name', 'display name', 'answer id', 'answer', 'count']
 
-    dist['data'] = [
+    dist['data'] = (
         [url_name, display_name, answer_id, a, answers[a]]
-        for (url_name, display_name, answer_id), answers in sorted(course_answer_distributions.items())
+        for (url_name, display_name, answer_id), answers in grades.iter_answer_distributions(course.id)
         for a in answers
-    ]
+    )
     return dist
 
 
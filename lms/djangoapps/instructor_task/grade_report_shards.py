@@ -0,0 +1,233 @@
+"""
+Grade reports split across subtasks: each subtask grades a shard of the
+enrolled students and stores its rows in the report store, and the last one
+to complete merges the shards into the final report.
+"""
+import calendar
+import json
+from datetime import datetime
+from itertools import count
+import traceback
+
+from celery.states import SUCCESS, FAILURE
+from django.conf import settings
+from django.contrib.auth.models import User
+from pytz import UTC
+
+from courseware.courses import get_course_by_id
+from instructor_task.models import ReportStore, InstructorTask
+from instructor_task.subtasks import (
+    SubtaskStatus,
+    queue_subtasks_for_query,
+    check_subtask_is_valid,
+    update_subtask_status,
+    complete_subtask_entry,
+)
+from instructor_task.tasks_helper import (
+    TASK_LOG,
+    GradeReportRowBuilder,
+    upload_csv_to_report_store,
+    upload_grades_csv,
+)
+from student.models import CourseEnrollment
+
+
+def upload_grades_csv_in_shards(shard_task, _xmodule_instance_args, entry_id, course_id, task_input, action_name):
+    """
+    Generate the grade report of `course_id` like `upload_grades_csv`, but
+    if more students are enrolled than settings.GRADES_DOWNLOAD_STUDENTS_PER_TASK,
+    have them graded by `shard_task` subtasks instead (see `queue_grade_report_shards`).
+    """
+    enrolled_students = CourseEnrollment.users_enrolled_in(course_id)
+    students_per_task = settings.GRADES_DOWNLOAD_STUDENTS_PER_TASK
+    if students_per_task and enrolled_students.count() > students_per_task:
+        return queue_grade_report_shards(
+            shard_task, entry_id, course_id, action_name, enrolled_students, students_per_task, datetime.now(UTC)
+        )
+    return upload_grades_csv(_xmodule_instance_args, entry_id, course_id, task_input, action_name)
+
+
+def _grade_report_shard_filename(entry_id, shard_index, errors=False):
+    """
+    Return the name of the hidden report file holding the rows (or the error
+    rows) of shard `shard_index` of the grade report of InstructorTask `entry_id`.
+    """
+    return u'.grade_report_{}_{}shard_{}.csv'.format(entry_id, 'err_' if errors else '', shard_index)
+
+
+def queue_grade_report_shards(shard_task, entry_id, course_id, action_name, enrolled_students,
+                              students_per_task, start_date):
+    """
+    Split the grade report of InstructorTask `entry_id` into `shard_task`
+    subtasks of at most `students_per_task` students each, using the same
+    subtask machinery as bulk email. Each subtask writes its rows to a hidden
+    file in the report store, and the last one to complete merges them with
+    `complete_grade_report`.
+
+    `shard_task` is called with (entry_id, shard_info, subtask_status_dict),
+    where `shard_info` is a dict with the keys 'shard_index', 'student_ids'
+    and 'start_time' (the timestamp of `start_date`).
+
+    Returns the task progress as stored in the InstructorTask.
+    """
+    entry = InstructorTask.objects.get(pk=entry_id)
+
+    # Check to see if the shards have already been queued, in case this task
+    # was requeued by Celery after losing its connection to the broker.
+    if len(entry.subtasks) > 0 and len(entry.task_output) > 0:
+        TASK_LOG.warning(u"Task %s has already been split into grade report shards: %s", entry.task_id, entry)
+        return json.loads(entry.task_output)
+
+    shard_indexes = count()
+    start_timestamp = calendar.timegm(start_date.utctimetuple())
+
+    def _create_grade_report_subtask(to_list, initial_subtask_status):
+        """Creates a subtask to grade a given list of students."""
+        shard_info = {
+            'shard_index': next(shard_indexes),
+            'student_ids': [item['pk'] for item in to_list],
+            'start_time': start_timestamp,
+        }
+        return shard_task.subtask(
+            (entry_id, shard_info, initial_subtask_status.to_dict()),
+            task_id=initial_subtask_status.task_id,
+            routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY,
+        )
+
+    TASK_LOG.info(u"Task %s: Preparing to queue grade report subtasks for course %s", entry.task_id, course_id)
+    return queue_subtasks_for_query(
+        entry,
+        action_name,
+        _create_grade_report_subtask,
+        [enrolled_students],
+        [],
+        students_per_task,
+    )
+
+
+def upload_grades_csv_shard(entry_id, shard_info, subtask_status_dict):
+    """
+    Grade the students of one shard of a grade report split up by
+    `queue_grade_report_shards`, and store their rows in the report store.
+    The subtask that completes the InstructorTask merges all the shards.
+
+    Returns the subtask status as a dict.
+    """
+    subtask_status = SubtaskStatus.from_dict(subtask_status_dict)
+    current_task_id = subtask_status.task_id
+    shard_index = shard_info['shard_index']
+    student_ids = shard_info['student_ids']
+
+    # Make sure that this subtask hasn't already been run, e.g. because the
+    # parent task was queued twice.
+    check_subtask_is_valid(entry_id, current_task_id, subtask_status)
+
+    entry = InstructorTask.objects.get(pk=entry_id)
+    course_id = entry.course_id
+    TASK_LOG.info(
+        u"Task %s: grading shard %s of %s students for course %s",
+        current_task_id, shard_index, len(student_ids), course_id
+    )
+
+    try:
+        row_builder = GradeReportRowBuilder(get_course_by_id(course_id))
+        students = User.objects.filter(id__in=student_ids).order_by('id')
+        for graded in row_builder.iterate_rows(students):
+            if graded:
+                subtask_status.increment(succeeded=1)
+            else:
+                subtask_status.increment(failed=1)
+
+        report_store = ReportStore.from_config()
+        report_store.store_rows(course_id, _grade_report_shard_filename(entry_id, shard_index), row_builder.rows)
+        report_store.store_rows(
+            course_id, _grade_report_shard_filename(entry_id, shard_index, errors=True), row_builder.err_rows[1:]
+        )
+    except Exception:
+        TASK_LOG.exception(u"Task %s: grade report shard %s failed unexpectedly!", current_task_id, shard_index)
+        # We don't know how far the shard got, so count all remaining students as failed.
+        subtask_status.increment(failed=len(student_ids) - subtask_status.attempted, state=FAILURE)
+        if update_subtask_status(entry_id, current_task_id, subtask_status, complete_entry=False):
+            complete_grade_report(entry_id, course_id, shard_info['start_time'])
+        raise
+
+    subtask_status.increment(state=SUCCESS)
+    if update_subtask_status(entry_id, current_task_id, subtask_status, complete_entry=False):
+        complete_grade_report(entry_id, course_id, shard_info['start_time'])
+    return subtask_status.to_dict()
+
+
+def complete_grade_report(entry_id, course_id, start_time):
+    """
+    Merge the shards of the grade report of InstructorTask `entry_id`, once
+    all of them are done, and only then mark the task as finished: as SUCCESS
+    if the merge worked and every shard was graded, and as FAILURE otherwise.
+
+    If any shard failed, the report would be missing its students, so no
+    report is written at all and the shards are only deleted.
+    """
+    entry = InstructorTask.objects.get(pk=entry_id)
+    subtask_dict = json.loads(entry.subtasks)
+    try:
+        if subtask_dict['failed'] > 0:
+            TASK_LOG.warning(
+                u"Task %s: %s of %s grade report shards failed, not writing the grade report",
+                entry.task_id, subtask_dict['failed'], subtask_dict['total']
+            )
+            delete_grade_report_shards(entry_id, course_id, subtask_dict['total'])
+        else:
+            merge_grade_report_shards(entry_id, course_id, start_time)
+    except Exception as exception:
+        TASK_LOG.exception(u"Task %s: merging grade report shards failed unexpectedly!", entry_id)
+        complete_subtask_entry(entry_id, exception, traceback.format_exc())
+        raise
+    complete_subtask_entry(entry_id)
+
+
+def merge_grade_report_shards(entry_id, course_id, start_time):
+    """
+    Stitch the shards of the grade report of InstructorTask `entry_id` into
+    the final grade report (and error report, if any student couldn't be
+    graded), then delete the shards.
+
+    Every shard must be there: a missing or unreadable one raises, rather
+    than leaving its students out of the report.
+    """
+    entry = InstructorTask.objects.get(pk=entry_id)
+    num_shards = json.loads(entry.subtasks)['total']
+    start_date = datetime.fromtimestamp(start_time, UTC)
+    report_store = ReportStore.from_config()
+
+    rows = []
+    err_rows = []
+    for shard_index in xrange(num_shards):
+        shard_rows = report_store.load_rows(course_id, _grade_report_shard_filename(entry_id, shard_index))
+        # Every shard starts with the same header row; keep only the first one.
+        rows.extend(shard_rows if not rows else shard_rows[1:])
+        err_rows.extend(
+            report_store.load_rows(course_id, _grade_report_shard_filename(entry_id, shard_index, errors=True))
+        )
+
+    TASK_LOG.info(u"Task %s: merged %s grade report shards for course %s", entry.task_id, num_shards, course_id)
+    upload_csv_to_report_store(rows, 'grade_report', course_id, start_date)
+    if err_rows:
+        err_rows.insert(0, ["id", "username", "error_msg"])
+        upload_csv_to_report_store(err_rows, 'grade_report_err', course_id, start_date)
+
+    delete_grade_report_shards(entry_id, course_id, num_shards)
+
+
+def delete_grade_report_shards(entry_id, course_id, num_shards):
+    """
+    Delete the shards of the grade report of InstructorTask `entry_id` that
+    were written.
+    """
+    report_store = ReportStore.from_config()
+    for shard_index in xrange(num_shards):
+        for errors in (False, True):
+            filename = _grade_report_shard_filename(entry_id, shard_index, errors)
+            try:
+                report_store.delete(course_id, filename)
+            except Exception:  # pylint: disable=broad-except
+                # Never written, because its subtask failed
+                TASK_LOG.info(u"Task %s: could not delete grade report shard %s", entry_id, filename)
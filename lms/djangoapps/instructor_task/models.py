@@ -12,6 +12,7 @@ file and check it in at the same time as your model changes. To do that,
 ASSUMPTIONS: modules have unique IDs, even across different module_types
 
 """
+from contextlib import contextmanager
 from cStringIO import StringIO
 from gzip import GzipFile
 from uuid import uuid4
@@ -19,6 +20,7 @@ import csv
 import json
 import hashlib
 import os.path
+import tempfile
 import urllib
 
 from boto.s3.connection import S3Connection
@@ -218,6 +220,22 @@ class ReportStore(object):
         for row in rows:
             yield [unicode(item).encode('utf-8') for item in row]
 
+    def _get_utf8_decoded_rows(self, rows):
+        """
+        The reverse of `_get_utf8_encoded_rows`, for rows read back from a CSV.
+        """
+        for row in rows:
+            yield [item.decode('utf-8') for item in row]
+
+    @staticmethod
+    def is_hidden(filename):
+        """
+        Files whose name starts with a dot are intermediate files (e.g. the
+        partial CSVs of a report generated by several subtasks) and are not
+        listed by `links_for`.
+        """
+        return filename.startswith('.')
+
 
 class S3ReportStore(ReportStore):
     """
@@ -308,19 +326,49 @@ class S3ReportStore(ReportStore):
     def store_rows(self, course_id, filename, rows):
         """
         Given a `course_id`, `filename`, and `rows` (each row is an iterable of
-        strings), create a buffer that is a gzip'd csv file, and then `store()`
-        that buffer.
+        strings), write the rows as a gzip'd csv file and upload it.
+
+        The rows are streamed to a temporary file on disk rather than held in
+        memory, so `rows` can be a generator over a large report.
 
         Even though we store it in gzip format, browsers will transparently
         download and decompress it. Filenames should end in `.csv`, not `.gz`.
         """
-        output_buffer = StringIO()
-        gzip_file = GzipFile(fileobj=output_buffer, mode="wb")
-        csvwriter = csv.writer(gzip_file)
-        csvwriter.writerows(self._get_utf8_encoded_rows(rows))
-        gzip_file.close()
+        with tempfile.TemporaryFile() as output_file:
+            gzip_file = GzipFile(fileobj=output_file, mode="wb")
+            csvwriter = csv.writer(gzip_file)
+            csvwriter.writerows(self._get_utf8_encoded_rows(rows))
+            gzip_file.close()
+
+            size = output_file.tell()
+            output_file.seek(0)
+            key = self.key_for(course_id, filename)
+            key.size = size
+            key.content_encoding = "gzip"
+            key.content_type = "text/csv"
+            key.set_contents_from_file(
+                output_file,
+                headers={
+                    "Content-Encoding": "gzip",
+                    "Content-Length": size,
+                    "Content-Type": "text/csv",
+                }
+            )
+
+    def load_rows(self, course_id, filename):
+        """
+        Return the rows of the CSV file `filename` stored by `store_rows`, as
+        lists of unicode strings.
+        """
+        key = self.key_for(course_id, filename)
+        gzip_file = GzipFile(fileobj=StringIO(key.get_contents_as_string()), mode="rb")
+        return list(self._get_utf8_decoded_rows(csv.reader(gzip_file)))
 
-        self.store(course_id, filename, output_buffer)
+    def delete(self, course_id, filename):
+        """
+        Delete the file `filename` of the given `course_id`.
+        """
+        self.key_for(course_id, filename).delete()
 
     def links_for(self, course_id):
         """
@@ -331,6 +379,7 @@ class S3ReportStore(ReportStore):
         return [
             (key.key.split("/")[-1], key.generate_url(expires_in=300))
             for key in sorted(self.bucket.list(prefix=course_dir.key), reverse=True, key=lambda k: k.last_modified)
+            if not self.is_hidden(key.key.split("/")[-1])
         ]
 
 
@@ -378,24 +427,58 @@ class LocalFSReportStore(ReportStore):
         assumed to be a StringIO objecd (or anything that can flush its contents
         to string using `.getvalue()`).
         """
-        full_path = self.path_to(course_id, filename)
-        directory = os.path.dirname(full_path)
-        if not os.path.exists(directory):
-            os.mkdir(directory)
-
-        with open(full_path, "wb") as f:
+        with self._open_for_writing(course_id, filename) as f:
             f.write(buff.getvalue())
 
     def store_rows(self, course_id, filename, rows):
         """
         Given a course_id, filename, and rows (each row is an iterable of strings),
-        write this data out.
+        write this data out. The rows are written to a hidden file as they are
+        generated, which replaces `filename` once all of them are written.
         """
-        output_buffer = StringIO()
-        csvwriter = csv.writer(output_buffer)
-        csvwriter.writerows(self._get_utf8_encoded_rows(rows))
+        with self._open_for_writing(course_id, filename) as f:
+            csvwriter = csv.writer(f)
+            csvwriter.writerows(self._get_utf8_encoded_rows(rows))
 
-        self.store(course_id, filename, output_buffer)
+    @contextmanager
+    def _open_for_writing(self, course_id, filename):
+        """
+        Open a hidden file next to the file `filename` of the given `course_id`
+        for writing, creating the course's directory if needed. The hidden file
+        is renamed to `filename` once written, so `links_for` never lists a
+        partial report, and removed if writing it fails.
+        """
+        full_path = self.path_to(course_id, filename)
+        directory = os.path.dirname(full_path)
+        if not os.path.exists(directory):
+            os.mkdir(directory)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.')
+        try:
+            # mkstemp creates the file readable by its owner only; give the
+            # report the permissions a plain open() would have.
+            umask = os.umask(0)
+            os.umask(umask)
+            os.fchmod(fd, 0o666 & ~umask)
+            with os.fdopen(fd, "wb") as f:
+                yield f
+            os.rename(temp_path, full_path)
+        except Exception:
+            os.remove(temp_path)
+            raise
+
+    def load_rows(self, course_id, filename):
+        """
+        Return the rows of the CSV file `filename` stored by `store_rows`, as
+        lists of unicode strings.
+        """
+        with open(self.path_to(course_id, filename), "rb") as f:
+            return list(self._get_utf8_decoded_rows(csv.reader(f)))
+
+    def delete(self, course_id, filename):
+        """
+        Delete the file `filename` of the given `course_id`.
+        """
+        os.remove(self.path_to(course_id, filename))
 
     def links_for(self, course_id):
         """
@@ -408,7 +491,11 @@ class LocalFSReportStore(ReportStore):
         course_dir = self.path_to(course_id, '')
         if not os.path.exists(course_dir):
             return []
-        files = [(filename, os.path.join(course_dir, filename)) for filename in os.listdir(course_dir)]
+        files = [
+            (filename, os.path.join(course_dir, filename))
+            for filename in os.listdir(course_dir)
+            if not self.is_hidden(filename)
+        ]
         files.sort(key=lambda (filename, full_path): os.path.getmtime(full_path), reverse=True)
 
         return [
@@ -31,13 +31,15 @@ from instructor_task.tasks_helper import (
     run_main_task,
     BaseInstructorTask,
     perform_module_state_update,
+    perform_module_state_update_subtask,
     rescore_problem_module_state,
     reset_attempts_module_state,
     delete_problem_module_state,
-    upload_grades_csv,
     upload_students_csv,
+    upload_answer_distribution_csv,
     cohort_students_and_upload
 )
+from instructor_task.grade_report_shards import upload_grades_csv_in_shards, upload_grades_csv_shard
 
 
 TASK_LOG = logging.getLogger('edx.celery.task')
@@ -61,6 +63,9 @@ def rescore_problem(entry_id, xmodule_instance_args):
 
     `xmodule_instance_args` provides information needed by _get_module_instance_for_task()
     to instantiate an xmodule instance.
+
+    If there are more than settings.RESCORE_MODULES_PER_TASK submissions to
+    rescore, they are rescored in parallel by `rescore_problem_subtask` subtasks.
     """
     # Translators: This is a past-tense verb that is inserted into task progress messages as {action}.
     action_name = ugettext_noop('rescored')
@@ -70,10 +75,30 @@ def rescore_problem(entry_id, xmodule_instance_args):
         """Filter that matches problems which are marked as being done"""
         return modules_to_update.filter(state__contains='"done": true')
 
-    visit_fcn = partial(perform_module_state_update, update_fcn, filter_fcn)
+    visit_fcn = partial(
+        perform_module_state_update,
+        update_fcn,
+        filter_fcn,
+        subtask=rescore_problem_subtask,
+        xmodule_instance_args=xmodule_instance_args,
+    )
     return run_main_task(entry_id, visit_fcn, action_name)
 
 
+@task  # pylint: disable=not-callable
+def rescore_problem_subtask(entry_id, module_ids, xmodule_instance_args, subtask_status_dict):
+    """
+    Rescore the StudentModules with ids `module_ids`, for one of the subtasks
+    of a `rescore_problem` task.
+
+    `subtask_status_dict` is the initial SubtaskStatus of the subtask as a dict.
+    """
+    # Translators: This is a past-tense verb that is inserted into task progress messages as {action}.
+    action_name = ugettext_noop('rescored')
+    update_fcn = partial(rescore_problem_module_state, xmodule_instance_args)
+    return perform_module_state_update_subtask(update_fcn, entry_id, action_name, module_ids, subtask_status_dict)
+
+
 @task(base=BaseInstructorTask)  # pylint: disable=not-callable
 def reset_problem_attempts(entry_id, xmodule_instance_args):
     """Resets problem attempts to zero for a particular problem for all students in a course.
@@ -151,10 +176,23 @@ def calculate_grades_csv(entry_id, xmodule_instance_args):
         xmodule_instance_args.get('task_id'), entry_id, action_name
     )
 
-    task_fn = partial(upload_grades_csv, xmodule_instance_args)
+    task_fn = partial(upload_grades_csv_in_shards, calculate_grades_csv_shard, xmodule_instance_args)
     return run_main_task(entry_id, task_fn, action_name)
 
 
+@task(routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=not-callable
+def calculate_grades_csv_shard(entry_id, shard_info, subtask_status_dict):
+    """
+    Grade one shard of the students of a course for a grade report split into
+    subtasks by `calculate_grades_csv`.
+
+    `shard_info` is a dict with the 'shard_index' of this shard, the
+    'student_ids' to grade and the 'start_time' of the report, and
+    `subtask_status_dict` the initial SubtaskStatus of the subtask as a dict.
+    """
+    return upload_grades_csv_shard(entry_id, shard_info, subtask_status_dict)
+
+
 @task(base=BaseInstructorTask, routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=not-callable
 def calculate_students_features_csv(entry_id, xmodule_instance_args):
     """
@@ -167,6 +205,18 @@ def calculate_students_features_csv(entry_id, xmodule_instance_args):
     return run_main_task(entry_id, task_fn, action_name)
 
 
+@task(base=BaseInstructorTask, routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=not-callable
+def calculate_answer_distribution_csv(entry_id, xmodule_instance_args):
+    """
+    Compute the distribution of the answers submitted to the problems of a
+    course and upload the CSV for download.
+    """
+    # Translators: This is a past-tense verb that is inserted into task progress messages as {action}.
+    action_name = ugettext_noop('generated')
+    task_fn = partial(upload_answer_distribution_csv, xmodule_instance_args)
+    return run_main_task(entry_id, task_fn, action_name)
+
+
 @task(base=BaseInstructorTask)  # pylint: disable=E1102
 def cohort_students(entry_id, xmodule_instance_args):
     """
@@ -6,11 +6,13 @@ running state of a course.
 import json
 from datetime import datetime
 from time import time
+import traceback
 import unicodecsv
 import logging
 
 from celery import Task, current_task
 from celery.states import SUCCESS, FAILURE
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.files.storage import DefaultStorage
 from django.db import transaction, reset_queries
@@ -23,13 +25,20 @@ from xmodule.modulestore.django import modulestore
 from xmodule.split_test_module import get_split_user_partitions
 
 from courseware.courses import get_course_by_id, get_problems_in_section
-from courseware.grades import iterate_grades_for
+from courseware.grades import iterate_grades_for, iter_answer_distributions
 from courseware.models import StudentModule
 from courseware.model_data import FieldDataCache
 from courseware.module_render import get_module_for_descriptor_internal
 from instructor_analytics.basic import enrolled_students_features
 from instructor_analytics.csvs import format_dictlist
 from instructor_task.models import ReportStore, InstructorTask, PROGRESS
+from instructor_task.subtasks import (
+    SubtaskStatus,
+    queue_subtasks_for_query,
+    check_subtask_is_valid,
+    update_subtask_status,
+    complete_subtask_entry,
+)
 from lms.djangoapps.lms_xblock.runtime import LmsPartitionService
 from openedx.core.djangoapps.course_groups.cohorts import get_cohort
 from openedx.core.djangoapps.course_groups.models import CourseUserGroup
@@ -263,7 +272,8 @@ def run_main_task(entry_id, task_fcn, action_name):
     return task_progress
 
 
-def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, task_input, action_name):
+def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, task_input, action_name,
+                                subtask=None, xmodule_instance_args=None):
     """
     Performs generic update by visiting StudentModule instances with the update_fcn provided.
 
@@ -281,6 +291,11 @@ def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, ta
     the update is successful; False indicates the update on the particular student module failed.
     A raised exception indicates a fatal condition -- that no other student modules should be considered.
 
+    If `subtask` is given and there are more StudentModules to update than
+    settings.RESCORE_MODULES_PER_TASK, the updates are made by `subtask`
+    subtasks instead (see `queue_module_state_update_subtasks`), which are
+    passed `xmodule_instance_args`.
+
     The return value is a dict containing the task's results, with the following keys:
 
           'attempted': number of attempts made
@@ -298,6 +313,42 @@ def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, ta
 
     """
     start_time = time()
+    problems, modules_to_update = _get_modules_to_update(course_id, task_input, filter_fcn)
+    total_modules = modules_to_update.count()
+
+    modules_per_task = settings.RESCORE_MODULES_PER_TASK
+    if subtask is not None and modules_per_task and total_modules > modules_per_task:
+        return queue_module_state_update_subtasks(
+            subtask, _entry_id, action_name, modules_to_update, modules_per_task, xmodule_instance_args
+        )
+
+    task_progress = TaskProgress(action_name, total_modules, start_time)
+    task_progress.update_task_state()
+
+    for module_to_update in modules_to_update:
+        task_progress.attempted += 1
+        update_status = _update_module_state(update_fcn, problems, module_to_update, action_name)
+        if update_status == UPDATE_STATUS_SUCCEEDED:
+            # If the update_fcn returns true, then it performed some kind of work.
+            # Logging of failures is left to the update_fcn itself.
+            task_progress.succeeded += 1
+        elif update_status == UPDATE_STATUS_FAILED:
+            task_progress.failed += 1
+        else:
+            task_progress.skipped += 1
+
+    return task_progress.update_task_state()
+
+
+def _get_modules_to_update(course_id, task_input, filter_fcn):
+    """
+    Find the StudentModules to be updated by a task with the given `task_input`
+    (see `perform_module_state_update`).
+
+    Returns a (problems, modules_to_update) pair, where `problems` maps the
+    usage keys of the problems being updated (as strings) to their
+    descriptors, and `modules_to_update` is a StudentModule queryset.
+    """
     usage_keys = []
     problem_url = task_input.get('problem_url')
     entrance_exam_url = task_input.get('entrance_exam_url')
@@ -338,28 +389,111 @@ def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, ta
     if filter_fcn is not None:
         modules_to_update = filter_fcn(modules_to_update)
 
-    task_progress = TaskProgress(action_name, modules_to_update.count(), start_time)
-    task_progress.update_task_state()
+    return problems, modules_to_update
 
-    for module_to_update in modules_to_update:
-        task_progress.attempted += 1
-        module_descriptor = problems[unicode(module_to_update.module_state_key)]
-        # There is no try here:  if there's an error, we let it throw, and the task will
-        # be marked as FAILED, with a stack trace.
-        with dog_stats_api.timer('instructor_tasks.module.time.step', tags=[u'action:{name}'.format(name=action_name)]):
-            update_status = update_fcn(module_descriptor, module_to_update)
+
+def _update_module_state(update_fcn, problems, module_to_update, action_name):
+    """
+    Call `update_fcn` on `module_to_update`, and return the update status.
+
+    Raises UpdateProblemModuleStateError if `update_fcn` returns an unexpected status.
+    """
+    module_descriptor = problems[unicode(module_to_update.module_state_key)]
+    # There is no try here:  if there's an error, we let it throw, and the task will
+    # be marked as FAILED, with a stack trace.
+    with dog_stats_api.timer('instructor_tasks.module.time.step', tags=[u'action:{name}'.format(name=action_name)]):
+        update_status = update_fcn(module_descriptor, module_to_update)
+    if update_status not in (UPDATE_STATUS_SUCCEEDED, UPDATE_STATUS_FAILED, UPDATE_STATUS_SKIPPED):
+        raise UpdateProblemModuleStateError("Unexpected update_status returned: {}".format(update_status))
+    return update_status
+
+
+def queue_module_state_update_subtasks(subtask, entry_id, action_name, modules_to_update, modules_per_task,
+                                       xmodule_instance_args):
+    """
+    Split the StudentModule updates of InstructorTask `entry_id` into
+    `subtask` subtasks of at most `modules_per_task` modules each, using the
+    same subtask machinery as bulk email. Each subtask reports its progress in
+    its SubtaskStatus, and the InstructorTask completes once all of them have.
+
+    `subtask` is called with (entry_id, module_ids, xmodule_instance_args, subtask_status_dict).
+
+    Returns the task progress as stored in the InstructorTask.
+    """
+    entry = InstructorTask.objects.get(pk=entry_id)
+
+    # Check to see if the subtasks have already been queued, in case this task
+    # was requeued by Celery after losing its connection to the broker.
+    if len(entry.subtasks) > 0 and len(entry.task_output) > 0:
+        TASK_LOG.warning(u"Task %s has already been split into subtasks: %s", entry.task_id, entry)
+        return json.loads(entry.task_output)
+
+    def _create_module_state_update_subtask(to_list, initial_subtask_status):
+        """Creates a subtask to update a given list of StudentModules."""
+        module_ids = [item['pk'] for item in to_list]
+        return subtask.subtask(
+            (entry_id, module_ids, xmodule_instance_args, initial_subtask_status.to_dict()),
+            task_id=initial_subtask_status.task_id,
+        )
+
+    TASK_LOG.info(
+        u"Task %s: Preparing to queue %s subtasks for course %s", entry.task_id, action_name, entry.course_id
+    )
+    return queue_subtasks_for_query(
+        entry,
+        action_name,
+        _create_module_state_update_subtask,
+        [modules_to_update],
+        [],
+        modules_per_task,
+    )
+
+
+def perform_module_state_update_subtask(update_fcn, entry_id, action_name, module_ids, subtask_status_dict):
+    """
+    Update the StudentModules with ids `module_ids`, for one subtask of a task
+    split up by `queue_module_state_update_subtasks`. Progress is recorded in
+    the subtask's SubtaskStatus.
+
+    Returns the subtask status as a dict.
+    """
+    subtask_status = SubtaskStatus.from_dict(subtask_status_dict)
+    current_task_id = subtask_status.task_id
+
+    # Make sure that this subtask hasn't already been run, e.g. because the
+    # parent task was queued twice.
+    check_subtask_is_valid(entry_id, current_task_id, subtask_status)
+
+    entry = InstructorTask.objects.get(pk=entry_id)
+    course_id = entry.course_id
+    TASK_LOG.info(
+        u"Task %s: updating %s student modules for course %s", current_task_id, len(module_ids), course_id
+    )
+
+    try:
+        problems, _ = _get_modules_to_update(course_id, json.loads(entry.task_input), None)
+        for module_to_update in StudentModule.objects.filter(id__in=module_ids).select_related('student'):
+            update_status = _update_module_state(update_fcn, problems, module_to_update, action_name)
             if update_status == UPDATE_STATUS_SUCCEEDED:
-                # If the update_fcn returns true, then it performed some kind of work.
-                # Logging of failures is left to the update_fcn itself.
-                task_progress.succeeded += 1
+                subtask_status.increment(succeeded=1)
             elif update_status == UPDATE_STATUS_FAILED:
-                task_progress.failed += 1
-            elif update_status == UPDATE_STATUS_SKIPPED:
-                task_progress.skipped += 1
+                subtask_status.increment(failed=1)
             else:
-                raise UpdateProblemModuleStateError("Unexpected update_status returned: {}".format(update_status))
-
-    return task_progress.update_task_state()
+                subtask_status.increment(skipped=1)
+    except Exception as exception:
+        TASK_LOG.exception(u"Task %s: student module update subtask failed unexpectedly!", current_task_id)
+        # Count the modules this subtask didn't get to as failed.
+        not_updated = len(module_ids) - subtask_status.attempted - subtask_status.skipped
+        subtask_status.increment(failed=not_updated, state=FAILURE)
+        # The parent task fails along with this subtask, whichever subtask completes it.
+        if update_subtask_status(entry_id, current_task_id, subtask_status, complete_entry=False):
+            complete_subtask_entry(entry_id, exception, traceback.format_exc())
+        raise
+
+    subtask_status.increment(state=SUCCESS)
+    if update_subtask_status(entry_id, current_task_id, subtask_status, complete_entry=False):
+        complete_subtask_entry(entry_id)
+    return subtask_status.to_dict()
 
 
 def _get_task_id_from_xmodule_args(xmodule_instance_args):
@@ -549,6 +683,76 @@ def upload_csv_to_report_store(rows, csv_name, course_id, timestamp):
     )
 
 
+class GradeReportRowBuilder(object):
+    """
+    Grades students and turns their gradesets into rows of a grade report CSV.
+
+    `rows` starts with the header row once the first student was graded
+    successfully, and `err_rows` with its own header.
+    """
+    def __init__(self, course):
+        self.course = course
+        self.course_is_cohorted = is_course_cohorted(course.id)
+        self.cohorts_header = ['Cohort Name'] if self.course_is_cohorted else []
+        self.experiment_partitions = get_split_user_partitions(course.user_partitions)
+        self.group_configs_header = [
+            u'Experiment Group ({})'.format(partition.name) for partition in self.experiment_partitions
+        ]
+        self.header = None
+        self.rows = []
+        self.err_rows = [["id", "username", "error_msg"]]
+
+    def iterate_rows(self, students):
+        """
+        Grade `students`, adding a row to `rows` (or `err_rows` if the student
+        could not be graded) for each, and yield whether the student was
+        graded successfully after each one.
+        """
+        course_id = self.course.id
+        for student, gradeset, err_msg in iterate_grades_for(course_id, students):
+            if gradeset:
+                # We were able to successfully grade this student for this course.
+                if not self.header:
+                    self.header = [section['label'] for section in gradeset[u'section_breakdown']]
+                    self.rows.append(
+                        ["id", "email", "username", "grade"] + self.header +
+                        self.cohorts_header + self.group_configs_header
+                    )
+
+                percents = {
+                    section['label']: section.get('percent', 0.0)
+                    for section in gradeset[u'section_breakdown']
+                    if 'label' in section
+                }
+
+                cohorts_group_name = []
+                if self.course_is_cohorted:
+                    group = get_cohort(student, course_id, assign=False)
+                    cohorts_group_name.append(group.name if group else '')
+
+                group_configs_group_names = []
+                for partition in self.experiment_partitions:
+                    group = LmsPartitionService(student, course_id).get_group(partition, assign=False)
+                    group_configs_group_names.append(group.name if group else '')
+
+                # Not everybody has the same gradable items. If the item is not
+                # found in the user's gradeset, just assume it's a 0. The aggregated
+                # grades for their sections and overall course will be calculated
+                # without regard for the item they didn't have access to, so it's
+                # possible for a student to have a 0.0 show up in their row but
+                # still have 100% for the course.
+                row_percents = [percents.get(label, 0.0) for label in self.header]
+                self.rows.append(
+                    [student.id, student.email, student.username, gradeset['percent']] +
+                    row_percents + cohorts_group_name + group_configs_group_names
+                )
+                yield True
+            else:
+                # An empty gradeset means we failed to grade a student.
+                self.err_rows.append([student.id, student.username, err_msg])
+                yield False
+
+
 def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input, action_name):
     """
     For a given `course_id`, generate a grades CSV file for all students that
@@ -566,7 +770,9 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
     start_date = datetime.now(UTC)
     status_interval = 100
     enrolled_students = CourseEnrollment.users_enrolled_in(course_id)
-    task_progress = TaskProgress(action_name, enrolled_students.count(), start_time)
+    total_enrolled_students = enrolled_students.count()
+
+    task_progress = TaskProgress(action_name, total_enrolled_students, start_time)
 
     fmt = u'Task: {task_id}, InstructorTask ID: {entry_id}, Course: {course_id}, Input: {task_input}'
     task_info_string = fmt.format(
@@ -578,19 +784,11 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
     TASK_LOG.info(u'%s, Task type: %s, Starting task execution', task_info_string, action_name)
 
     course = get_course_by_id(course_id)
-    course_is_cohorted = is_course_cohorted(course.id)
-    cohorts_header = ['Cohort Name'] if course_is_cohorted else []
-
-    experiment_partitions = get_split_user_partitions(course.user_partitions)
-    group_configs_header = [u'Experiment Group ({})'.format(partition.name) for partition in experiment_partitions]
 
     # Loop over all our students and build our CSV lists in memory
-    header = None
-    rows = []
-    err_rows = [["id", "username", "error_msg"]]
+    row_builder = GradeReportRowBuilder(course)
     current_step = {'step': 'Calculating Grades'}
 
-    total_enrolled_students = enrolled_students.count()
     student_counter = 0
     TASK_LOG.info(
         u'%s, Task type: %s, Current step: %s, Starting grade calculation for total students: %s',
@@ -599,7 +797,7 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
         current_step,
         total_enrolled_students
     )
-    for student, gradeset, err_msg in iterate_grades_for(course_id, enrolled_students):
+    for graded in row_builder.iterate_rows(enrolled_students):
         # Periodically update task status (this is a cache write)
         if task_progress.attempted % status_interval == 0:
             task_progress.update_task_state(extra_meta=current_step)
@@ -617,46 +815,10 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
                 total_enrolled_students
             )
 
-        if gradeset:
-            # We were able to successfully grade this student for this course.
+        if graded:
             task_progress.succeeded += 1
-            if not header:
-                header = [section['label'] for section in gradeset[u'section_breakdown']]
-                rows.append(
-                    ["id", "email", "username", "grade"] + header + cohorts_header + group_configs_header
-                )
-
-            percents = {
-                section['label']: section.get('percent', 0.0)
-                for section in gradeset[u'section_breakdown']
-                if 'label' in section
-            }
-
-            cohorts_group_name = []
-            if course_is_cohorted:
-                group = get_cohort(student, course_id, assign=False)
-                cohorts_group_name.append(group.name if group else '')
-
-            group_configs_group_names = []
-            for partition in experiment_partitions:
-                group = LmsPartitionService(student, course_id).get_group(partition, assign=False)
-                group_configs_group_names.append(group.name if group else '')
-
-            # Not everybody has the same gradable items. If the item is not
-            # found in the user's gradeset, just assume it's a 0. The aggregated
-            # grades for their sections and overall course will be calculated
-            # without regard for the item they didn't have access to, so it's
-            # possible for a student to have a 0.0 show up in their row but
-            # still have 100% for the course.
-            row_percents = [percents.get(label, 0.0) for label in header]
-            rows.append(
-                [student.id, student.email, student.username, gradeset['percent']] +
-                row_percents + cohorts_group_name + group_configs_group_names
-            )
         else:
-            # An empty gradeset means we failed to grade a student.
             task_progress.failed += 1
-            err_rows.append([student.id, student.username, err_msg])
 
     TASK_LOG.info(
         u'%s, Task type: %s, Current step: %s, Grade calculation completed for students: %s/%s',
@@ -673,11 +835,11 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
     TASK_LOG.info(u'%s, Task type: %s, Current step: %s', task_info_string, action_name, current_step)
 
     # Perform the actual upload
-    upload_csv_to_report_store(rows, 'grade_report', course_id, start_date)
+    upload_csv_to_report_store(row_builder.rows, 'grade_report', course_id, start_date)
 
     # If there are any error rows (don't count the header), write them out as well
-    if len(err_rows) > 1:
-        upload_csv_to_report_store(err_rows, 'grade_report_err', course_id, start_date)
+    if len(row_builder.err_rows) > 1:
+        upload_csv_to_report_store(row_builder.err_rows, 'grade_report_err', course_id, start_date)
 
     # One last update before we close out...
     TASK_LOG.info(u'%s, Task type: %s, Finalizing grade task', task_info_string, action_name)
@@ -715,6 +877,39 @@ def upload_students_csv(_xmodule_instance_args, _entry_id, course_id, task_input
     return task_progress.update_task_state(extra_meta=current_step)
 
 
+def upload_answer_distribution_csv(_xmodule_instance_args, _entry_id, course_id, _task_input, action_name):
+    """
+    For a given `course_id`, generate a CSV file of how many times each answer
+    was submitted to each problem part, and store it using a `ReportStore`.
+
+    The rows are computed one problem at a time as the CSV is written, so the
+    distribution of the whole course is never held in memory.
+    """
+    start_time = time()
+    start_date = datetime.now(UTC)
+    task_progress = TaskProgress(action_name, 0, start_time)
+    current_step = {'step': 'Calculating Answer Distributions'}
+    task_progress.update_task_state(extra_meta=current_step)
+
+    def rows():
+        """
+        Yield the header and the rows of the report, counting the problem parts.
+        """
+        yield ['url_name', 'display name', 'answer id', 'answer', 'count']
+        for (url_name, display_name, answer_id), answers in iter_answer_distributions(course_id):
+            task_progress.attempted += 1
+            task_progress.succeeded += 1
+            for answer, answer_count in sorted(answers.items()):
+                yield [url_name, display_name, answer_id, answer, answer_count]
+
+    # Perform the upload
+    upload_csv_to_report_store(rows(), 'answer_distribution', course_id, start_date)
+
+    task_progress.total = task_progress.attempted
+    current_step = {'step': 'Uploaded CSV'}
+    return task_progress.update_task_state(extra_meta=current_step)
+
+
 def cohort_students_and_upload(_xmodule_instance_args, _entry_id, course_id, task_input, action_name):
     """
     Within a given course, cohort students in bulk, then upload the results
@@ -4,6 +4,8 @@ Tests for instructor_task/models.py.
 
 from cStringIO import StringIO
 import mock
+import os
+import stat
 import time
 from datetime import datetime
 from unittest import TestCase
@@ -20,11 +22,22 @@ class MockKey(object):
     def __init__(self, bucket):
         self.last_modified = datetime.now()
         self.bucket = bucket
+        self.contents = None
 
     def set_contents_from_string(self, contents, headers):  # pylint: disable=unused-argument
         """ Expected method on a Key object. """
+        self.contents = contents
         self.bucket.store_key(self)
 
+    def set_contents_from_file(self, fp, headers):  # pylint: disable=unused-argument
+        """ Expected method on a Key object. """
+        self.contents = fp.read()
+        self.bucket.store_key(self)
+
+    def get_contents_as_string(self):
+        """ Expected method on a Key object. """
+        return [key for key in self.bucket.keys if key.key == self.key][-1].contents
+
     def generate_url(self, expires_in):  # pylint: disable=unused-argument
         """ Expected method on a Key object. """
         return "http://fake-edx-s3.edx.org/"
@@ -84,6 +97,15 @@ class ReportStoreTestMixin(object):
             ['new_file', 'middle_file', 'old_file']
         )
 
+    def test_store_rows_from_generator(self):
+        """
+        Test that rows stored from a generator are read back unchanged.
+        """
+        rows = [[u'id', u'name'], [u'1', u'\u00e9l\u00e8ve']]
+        report_store = self.create_report_store()
+        report_store.store_rows(self.course_id, 'report.csv', (row for row in rows))
+        self.assertEqual(report_store.load_rows(self.course_id, 'report.csv'), rows)
+
 
 class LocalFSReportStoreTestCase(ReportStoreTestMixin, TestReportMixin, TestCase):
     """
@@ -93,6 +115,34 @@ class LocalFSReportStoreTestCase(ReportStoreTestMixin, TestReportMixin, TestCase
         """ Create and return a LocalFSReportStore. """
         return LocalFSReportStore.from_config()
 
+    def test_store_rows_failure_leaves_no_report(self):
+        """
+        Test that a report whose rows fail to generate is neither listed nor
+        left half-written on disk.
+        """
+        def rows():
+            """ Yield a row, then fail. """
+            yield [u'id', u'name']
+            raise ValueError()
+
+        report_store = self.create_report_store()
+        with self.assertRaises(ValueError):
+            report_store.store_rows(self.course_id, 'report.csv', rows())
+        self.assertEqual(report_store.links_for(self.course_id), [])
+        self.assertEqual(os.listdir(report_store.path_to(self.course_id, '')), [])
+
+    def test_store_rows_permissions(self):
+        """
+        Test that a stored report gets the usual permissions for new files,
+        not the owner-only ones of its temporary file.
+        """
+        umask = os.umask(0o022)
+        self.addCleanup(os.umask, umask)
+        report_store = self.create_report_store()
+        report_store.store_rows(self.course_id, 'report.csv', [[u'id']])
+        mode = os.stat(report_store.path_to(self.course_id, 'report.csv')).st_mode
+        self.assertEqual(stat.S_IMODE(mode), 0o644)
+
 
 @mock.patch('instructor_task.models.S3Connection', new=MockS3Connection)
 @mock.patch('instructor_task.models.Key', new=MockKey)
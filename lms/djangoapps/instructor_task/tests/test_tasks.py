@@ -11,6 +11,7 @@ from uuid import uuid4
 from mock import Mock, MagicMock, patch
 
 from celery.states import SUCCESS, FAILURE
+from django.test.utils import override_settings
 
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from opaque_keys.edx.locations import i4xEncoder
@@ -258,6 +259,51 @@ class TestRescoreInstructorTask(TestInstructorTasks):
         self.assertEquals(output.get('action_name'), 'rescored')
         self.assertGreater(output.get('duration_ms'), 0)
 
+    @override_settings(RESCORE_MODULES_PER_TASK=3)
+    def test_rescoring_subtasks(self):
+        input_state = json.dumps({'done': True})
+        num_students = 10
+        students = self._create_students_with_state(num_students, input_state)
+        task_entry = self._create_input_entry()
+        mock_instance = Mock()
+        mock_instance.rescore_problem = Mock(return_value={'success': 'correct'})
+        with patch('instructor_task.tasks_helper.get_module_for_descriptor_internal') as mock_get_module:
+            mock_get_module.return_value = mock_instance
+            self._run_task_with_mock_celery(rescore_problem, task_entry.id, task_entry.task_id)
+        # every student was rescored, by 4 subtasks
+        self.assertEquals(mock_instance.rescore_problem.call_count, num_students)
+        self.assertItemsEqual(
+            [call[1]['user'] for call in mock_get_module.call_args_list],
+            students
+        )
+        entry = InstructorTask.objects.get(id=task_entry.id)
+        self.assertEquals(entry.task_state, SUCCESS)
+        subtasks = json.loads(entry.subtasks)
+        self.assertEquals(subtasks['total'], 4)
+        self.assertEquals(subtasks['succeeded'], 4)
+        output = json.loads(entry.task_output)
+        self.assertEquals(output.get('attempted'), num_students)
+        self.assertEquals(output.get('succeeded'), num_students)
+        self.assertEquals(output.get('total'), num_students)
+        self.assertEquals(output.get('action_name'), 'rescored')
+
+    @override_settings(RESCORE_MODULES_PER_TASK=3)
+    def test_rescoring_subtask_failure(self):
+        # A subtask that dies should fail the whole task
+        input_state = json.dumps({'done': True})
+        self._create_students_with_state(10, input_state)
+        task_entry = self._create_input_entry()
+        with patch('instructor_task.tasks_helper._update_module_state') as mock_update:
+            mock_update.side_effect = ValueError('rescoring broke')
+            self._run_task_with_mock_celery(rescore_problem, task_entry.id, task_entry.task_id)
+        entry = InstructorTask.objects.get(id=task_entry.id)
+        self.assertEquals(entry.task_state, FAILURE)
+        subtasks = json.loads(entry.subtasks)
+        self.assertEquals(subtasks['failed'], 4)
+        output = json.loads(entry.task_output)
+        self.assertEquals(output['exception'], 'ValueError')
+        self.assertEquals(output['message'], 'rescoring broke')
+
     def test_rescoring_bad_result(self):
         # Confirm that rescoring does not succeed if "success" key is not an expected value.
         input_state = json.dumps({'done': True})
@@ -7,11 +7,15 @@ Tests that CSV grade report generation works with unicode emails.
 
 """
 import ddt
+import json
+from celery.states import SUCCESS, FAILURE
+from django.test.utils import override_settings
 from mock import Mock, patch
 import tempfile
 import unicodecsv
 
-from xmodule.modulestore.tests.factories import CourseFactory
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+from courseware.tests.factories import StudentModuleFactory
 from student.tests.factories import UserFactory
 from student.models import CourseEnrollment
 from xmodule.partitions.partitions import Group, UserPartition
@@ -20,8 +24,13 @@ from openedx.core.djangoapps.course_groups.models import CourseUserGroupPartitio
 from openedx.core.djangoapps.course_groups.tests.helpers import CohortFactory
 import openedx.core.djangoapps.user_api.course_tag.api as course_tag_api
 from openedx.core.djangoapps.user_api.partition_schemes import RandomUserPartitionScheme
-from instructor_task.models import ReportStore
-from instructor_task.tasks_helper import cohort_students_and_upload, upload_grades_csv, upload_students_csv
+from instructor_task.grade_report_shards import upload_grades_csv_in_shards
+from instructor_task.models import InstructorTask, LocalFSReportStore, ReportStore
+from instructor_task.tasks import calculate_grades_csv_shard
+from instructor_task.tasks_helper import (
+    cohort_students_and_upload, upload_answer_distribution_csv, upload_grades_csv, upload_students_csv
+)
+from instructor_task.tests.factories import InstructorTaskFactory
 from instructor_task.tests.test_base import InstructorTaskCourseTestCase, TestReportMixin
 
 
@@ -67,6 +76,94 @@ class TestInstructorGradeReport(TestReportMixin, InstructorTaskCourseTestCase):
         report_store = ReportStore.from_config()
         self.assertTrue(any('grade_report_err' in item[0] for item in report_store.links_for(self.course.id)))
 
+    @override_settings(GRADES_DOWNLOAD_STUDENTS_PER_TASK=2)
+    def test_grade_report_shards(self):
+        """
+        Test that a grade report split across subtasks is merged into a
+        single CSV containing every student.
+        """
+        usernames = ['student{}'.format(i) for i in range(5)]
+        for username in usernames:
+            self.create_student(username)
+        entry = InstructorTaskFactory.create(course_id=self.course.id, task_type='grade_course')
+
+        with patch('instructor_task.tasks_helper._get_current_task'):
+            upload_grades_csv_in_shards(calculate_grades_csv_shard, None, entry.id, self.course.id, None, 'graded')
+
+        entry = InstructorTask.objects.get(pk=entry.id)
+        self.assertEqual(entry.task_state, SUCCESS)
+        self.assertEqual(json.loads(entry.subtasks)['total'], 3)
+        self.assertDictContainsSubset(
+            {'attempted': 5, 'succeeded': 5, 'failed': 0}, json.loads(entry.task_output)
+        )
+
+        # Only the merged report is visible, the shards have been cleaned up.
+        report_store = ReportStore.from_config()
+        links = report_store.links_for(self.course.id)
+        self.assertEqual(len(links), 1)
+        self.assertIn('grade_report', links[0][0])
+        with open(report_store.path_to(self.course.id, links[0][0])) as csv_file:
+            self.assertItemsEqual([row['username'] for row in unicodecsv.DictReader(csv_file)], usernames)
+
+    @override_settings(GRADES_DOWNLOAD_STUDENTS_PER_TASK=2)
+    def test_grade_report_merge_failure(self):
+        """
+        Test that a grade report whose shards can't be merged is marked as
+        failed rather than succeeded.
+        """
+        for i in range(5):
+            self.create_student('student{}'.format(i))
+        entry = InstructorTaskFactory.create(course_id=self.course.id, task_type='grade_course')
+
+        with patch('instructor_task.tasks_helper._get_current_task'):
+            with patch('instructor_task.grade_report_shards.merge_grade_report_shards') as mock_merge:
+                mock_merge.side_effect = ValueError('merge failed')
+                upload_grades_csv_in_shards(calculate_grades_csv_shard, None, entry.id, self.course.id, None, 'graded')
+
+        self.assertTrue(mock_merge.called)
+        entry = InstructorTask.objects.get(pk=entry.id)
+        self.assertEqual(entry.task_state, FAILURE)
+        self.assertEqual(json.loads(entry.task_output)['message'], 'merge failed')
+
+    @override_settings(GRADES_DOWNLOAD_STUDENTS_PER_TASK=2)
+    def test_grade_report_missing_shard(self):
+        """
+        Test that a grade report with a shard that can't be read is marked as
+        failed, rather than written without that shard's students.
+        """
+        for i in range(5):
+            self.create_student('student{}'.format(i))
+        entry = InstructorTaskFactory.create(course_id=self.course.id, task_type='grade_course')
+
+        with patch('instructor_task.tasks_helper._get_current_task'):
+            with patch.object(LocalFSReportStore, 'load_rows', side_effect=IOError('missing shard')):
+                upload_grades_csv_in_shards(calculate_grades_csv_shard, None, entry.id, self.course.id, None, 'graded')
+
+        entry = InstructorTask.objects.get(pk=entry.id)
+        self.assertEqual(entry.task_state, FAILURE)
+        self.assertEqual(json.loads(entry.task_output)['message'], 'missing shard')
+        links = ReportStore.from_config().links_for(self.course.id)
+        self.assertFalse(any('grade_report' in filename for filename, __ in links))
+
+    @override_settings(GRADES_DOWNLOAD_STUDENTS_PER_TASK=2)
+    def test_grade_report_failed_shard(self):
+        """
+        Test that no grade report is written if one of its shards failed, and
+        that the task reports the failed shards.
+        """
+        for i in range(5):
+            self.create_student('student{}'.format(i))
+        entry = InstructorTaskFactory.create(course_id=self.course.id, task_type='grade_course')
+
+        with patch('instructor_task.tasks_helper._get_current_task'):
+            with patch('instructor_task.grade_report_shards.get_course_by_id', side_effect=ValueError('shard failed')):
+                upload_grades_csv_in_shards(calculate_grades_csv_shard, None, entry.id, self.course.id, None, 'graded')
+
+        entry = InstructorTask.objects.get(pk=entry.id)
+        self.assertEqual(entry.task_state, FAILURE)
+        self.assertEqual(json.loads(entry.task_output)['message'], '3 of 3 subtasks failed')
+        self.assertEqual(ReportStore.from_config().links_for(self.course.id), [])
+
     def _verify_cell_data_for_user(self, username, course_id, column_header, expected_cell_content):
         """
         Verify cell data in the grades CSV for a particular user.
@@ -304,6 +401,41 @@ class TestStudentReport(TestReportMixin, InstructorTaskCourseTestCase):
         self.assertDictContainsSubset({'attempted': num_students, 'succeeded': num_students, 'failed': 0}, result)
 
 
+class TestAnswerDistributionReport(TestReportMixin, InstructorTaskCourseTestCase):
+    """
+    Tests that CSV answer distribution report generation works.
+    """
+    def setUp(self):
+        super(TestAnswerDistributionReport, self).setUp()
+        self.course = CourseFactory.create()
+        self.problem = ItemFactory.create(parent=self.course, category='problem', display_name=u'probl\xe8me')
+
+    def test_success(self):
+        part_id = u'{}_2_1'.format(self.problem.location.html_id())
+        for answer in (u'r\xe9ponse', u'r\xe9ponse', u'other'):
+            StudentModuleFactory.create(
+                course_id=self.course.id,
+                module_state_key=self.problem.location,
+                grade=1,
+                state=json.dumps({'correct_map': {}, 'student_answers': {part_id: answer}}),
+            )
+
+        with patch('instructor_task.tasks_helper._get_current_task'):
+            result = upload_answer_distribution_csv(None, None, self.course.id, None, 'generated')
+
+        self.assertDictContainsSubset({'attempted': 1, 'succeeded': 1, 'failed': 0}, result)
+        self.verify_rows_in_csv([
+            {
+                u'url_name': self.problem.url_name,
+                u'display name': u'probl\xe8me',
+                u'answer id': part_id,
+                u'answer': answer,
+                u'count': count,
+            }
+            for answer, count in ((u'other', u'1'), (u'r\xe9ponse', u'2'))
+        ])
+
+
 class MockDefaultStorage(object):
     """Mock django's DefaultStorage"""
     def __init__(self):
@@ -12,6 +12,32 @@ from xmodule.partitions.partitions import NoSuchUserPartitionError, NoSuchUserPa
 _ = lambda text: text
 
 
+def merge_group_access(parent_access, group_access):
+    """
+    Merge a block's `group_access` rules with the merged rules of its parent,
+    `parent_access`, and return the result as a new dict.  See
+    `LmsBlockMixin.merged_group_access`.
+    """
+    merged_access = parent_access.copy()
+    if group_access is not None:
+        for partition_id, group_ids in group_access.items():
+            if group_ids:  # skip if the "local" group_access for this partition is None or empty.
+                if partition_id in merged_access:
+                    if merged_access[partition_id] is False:
+                        # special case - means somewhere up the hierarchy, merged access rules have eliminated
+                        # all group_ids from this partition, so there's no possible intersection.
+                        continue
+                    # otherwise, if the parent defines group access rules for this partition,
+                    # intersect with the local ones.
+                    merged_access[partition_id] = list(
+                        set(merged_access[partition_id]).intersection(group_ids)
+                    ) or False
+                else:
+                    # add the group access rules for this partition to the merged set of rules.
+                    merged_access[partition_id] = group_ids
+    return merged_access
+
+
 class GroupAccessDict(Dict):
     """Special Dict class for serializing the group_access field"""
     def from_json(self, access_dict):
@@ -99,25 +125,7 @@ class LmsBlockMixin(XBlockMixin):
         parent = self.get_parent()
         if not parent:
             return self.group_access or {}
-
-        merged_access = parent.merged_group_access.copy()
-        if self.group_access is not None:
-            for partition_id, group_ids in self.group_access.items():
-                if group_ids:  # skip if the "local" group_access for this partition is None or empty.
-                    if partition_id in merged_access:
-                        if merged_access[partition_id] is False:
-                            # special case - means somewhere up the hierarchy, merged access rules have eliminated
-                            # all group_ids from this partition, so there's no possible intersection.
-                            continue
-                        # otherwise, if the parent defines group access rules for this partition,
-                        # intersect with the local ones.
-                        merged_access[partition_id] = list(
-                            set(merged_access[partition_id]).intersection(group_ids)
-                        ) or False
-                    else:
-                        # add the group access rules for this partition to the merged set of rules.
-                        merged_access[partition_id] = group_ids
-        return merged_access
+        return merge_group_access(parent.merged_group_access, self.group_access)
 
     # Specified here so we can see what the value set at the course-level is.
     user_partitions = UserPartitionList(
@@ -4,13 +4,12 @@ Serializer for user API
 from rest_framework import serializers
 from rest_framework.reverse import reverse
 
-from courseware.courses import course_image_url
 from student.models import CourseEnrollment, User
 from certificates.models import certificate_status_for_student, CertificateStatuses
 
 
-class CourseField(serializers.RelatedField):
-    """Custom field to wrap a CourseDescriptor object. Read-only."""
+class CourseOverviewField(serializers.RelatedField):
+    """Custom field to wrap a CourseOverview object. Read-only."""
 
     def to_native(self, course):
         course_id = unicode(course.id)
@@ -49,7 +48,7 @@ class CourseField(serializers.RelatedField):
             "org": course.display_org_with_default,
             "start": course.start,
             "end": course.end,
-            "course_image": course_image_url(course),
+            "course_image": course.course_image_url,
             "social_urls": {
                 "facebook": course.facebook_url,
             },
@@ -67,7 +66,7 @@ class CourseEnrollmentSerializer(serializers.ModelSerializer):
     """
     Serializes CourseEnrollment models
     """
-    course = CourseField()
+    course = CourseOverviewField(source='course_overview')
     certificate = serializers.SerializerMethodField('get_certificate')
 
     def get_certificate(self, model):
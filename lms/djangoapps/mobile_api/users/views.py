@@ -16,6 +16,7 @@ from courseware.access import is_mobile_available_for_user
 from courseware.model_data import FieldDataCache
 from courseware.module_render import get_module_for_descriptor
 from courseware.views import get_current_child, save_positions_recursively_up
+from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
 from student.models import CourseEnrollment, User
 
 from xblock.fields import Scope
@@ -233,13 +234,18 @@ class UserCourseEnrollmentsList(generics.ListAPIView):
     lookup_field = 'username'
 
     def get_queryset(self):
-        enrollments = self.queryset.filter(
+        enrollments = list(self.queryset.filter(
             user__username=self.kwargs['username'],
             is_active=True
-        ).order_by('created').reverse()
+        ).order_by('created').reverse())
+        # Load all the overviews at once rather than one per enrollment
+        overviews = CourseOverview.get_from_ids(enrollment.course_id for enrollment in enrollments)
+        for enrollment in enrollments:
+            enrollment.course_overview = overviews[enrollment.course_id]
         return [
             enrollment for enrollment in enrollments
-            if enrollment.course and is_mobile_available_for_user(self.request.user, enrollment.course)
+            if enrollment.course_overview and
+            is_mobile_available_for_user(self.request.user, enrollment.course_overview)
         ]
 
 
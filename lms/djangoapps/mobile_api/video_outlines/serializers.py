@@ -1,38 +1,114 @@
 """
 Serializer for video outline
 """
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.timezone import UTC
+from lazy import lazy
 from rest_framework.reverse import reverse
 
+from opaque_keys.edx.keys import UsageKey
+from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.mongo.base import BLOCK_TYPES_WITH_CHILDREN
+from xmodule.partitions.partitions import NoSuchUserPartitionGroupError
+from xmodule.split_test_module import get_split_user_partitions
 from courseware.access import has_access
+from courseware.masquerade import is_masquerading_as_student
 from courseware.model_data import FieldDataCache
-from courseware.module_render import get_module_for_descriptor
-from util.module_utils import get_dynamic_descriptor_children
+from courseware.module_render import get_module_for_descriptor, make_track_function
+from lms.djangoapps.lms_xblock.mixin import merge_group_access
+from lms.djangoapps.lms_xblock.runtime import LmsPartitionService
+from student.roles import CourseBetaTesterRole
 
 from edxval.api import (
     get_video_info_for_course_and_profile, ValInternalError
 )
 
+# How long the user-independent outline of a course version is cached. Any
+# change to the course changes its version, so this only bounds how long the
+# outlines of outdated versions linger.
+OUTLINE_CACHE_TIMEOUT = 60 * 60 * 24
+
 
 class BlockOutline(object):
     """
-    Serializes course videos, pulling data from VAL and the video modules.
+    Serializes course videos, pulling data from VAL and the course structure.
+
+    The user-independent part of the outline (the path, courseware position,
+    access settings and summary data of each block) is computed in a single
+    walk of the course and cached per course version. Serializing the outline
+    for a request then only filters those blocks for the requesting user, and
+    adds the VAL data and full URLs.
     """
-    def __init__(self, course_id, start_block, block_types, request):
-        """Create a BlockOutline using `start_block` as a starting point."""
-        self.start_block = start_block
+    def __init__(self, course, block_types, request):
+        """
+        Create a BlockOutline of `course`.
+
+        `block_types` maps each block type to include in the outline to a
+        (summary_data_fn, summary_fn) pair. summary_data_fn(descriptor) returns
+        the user-independent data of a block, which is cached with the outline;
+        summary_fn(course_id, summary_data, request, local_cache) returns the
+        block's summary for a request.
+        """
+        self.course = course
+        self.course_id = course.id
         self.block_types = block_types
-        self.course_id = course_id
         self.request = request  # needed for making full URLS
         self.local_cache = {}
         try:
             self.local_cache['course_videos'] = get_video_info_for_course_and_profile(
-                unicode(course_id), "mobile_low"
+                unicode(self.course_id), "mobile_low"
             )
         except ValInternalError:  # pragma: nocover
             self.local_cache['course_videos'] = {}
 
     def __iter__(self):
+        block_filter = OutlineBlockFilter(self.course, self.request)
+        for block in self.get_structure():
+            if not block_filter.can_load(block):
+                continue
+
+            summary_fn = self.block_types[block['block_type']][1]
+            unit_url, section_url = find_urls(self.course_id, block, self.request)
+
+            yield {
+                "path": block['path'],
+                "named_path": [b["name"] for b in block['path']],
+                "unit_url": unit_url,
+                "section_url": section_url,
+                "summary": summary_fn(self.course_id, block['summary_data'], self.request, self.local_cache)
+            }
+
+    def get_structure(self):
+        """
+        Returns the user-independent outline of the course, from the cache if
+        this version of the course has been outlined before.
+        """
+        version = _course_version(self.course)
+        if version is None:
+            return self._build_structure()
+
+        cache_key = u"mobile_api.video_outline.{}.{}.{}".format(
+            self.course_id, u'.'.join(sorted(self.block_types)), version
+        )
+        structure = cache.get(cache_key)
+        if structure is None:
+            structure = self._build_structure()
+            cache.set(cache_key, structure, OUTLINE_CACHE_TIMEOUT)
+        return structure
+
+    def _build_structure(self):
+        """
+        Walks the whole course once and returns a list with, in outline order,
+        a dict describing each block of one of `self.block_types`.
+
+        Blocks under split_test modules record which partition groups they are
+        shown to. Blocks under other modules with dynamic children record the
+        (module, child) pairs that lead to them, since which children are shown
+        can only be decided by binding the module for a user.
+        """
         def parent_or_requested_block_type(usage_key):
             """
             Returns whether the usage_key's block_type is one of self.block_types or a parent type.
@@ -42,113 +118,302 @@ class BlockOutline(object):
                 usage_key.block_type in BLOCK_TYPES_WITH_CHILDREN
             )
 
-        def create_module(descriptor):
-            """
-            Factory method for creating and binding a module for the given descriptor.
-            """
-            field_data_cache = FieldDataCache.cache_for_descriptor_descendents(
-                self.course_id, self.request.user, descriptor, depth=0,
+        store = modulestore()
+        with store.bulk_operations(self.course_id):
+            course = store.get_course(self.course_id, depth=None)
+
+            structure = []
+            # Each entry is (block, ancestors, merged group access, split conditions, dynamic parents)
+            stack = [(course, [], course.group_access or {}, [], [])]
+            while stack:
+                curr_block, ancestors, group_access, split_conditions, dynamic_parents = stack.pop()
+
+                if curr_block.hide_from_toc:
+                    # For now, if the 'hide_from_toc' setting is set on the block, do not traverse down
+                    # the hierarchy.  The reason being is that these blocks may not have human-readable names
+                    # to display on the mobile clients.
+                    # Eventually, we'll need to figure out how we want these blocks to be displayed on the
+                    # mobile clients.  As they are still accessible in the browser, just not navigatable
+                    # from the table-of-contents.
+                    continue
+
+                block_type = curr_block.location.block_type
+                if block_type in self.block_types:
+                    summary_data_fn = self.block_types[block_type][0]
+                    structure.append({
+                        "block_type": block_type,
+                        "path": path(ancestors),
+                        "courseware_position": courseware_position(ancestors),
+                        "start": curr_block.start,
+                        "days_early_for_beta": curr_block.days_early_for_beta,
+                        "visible_to_staff_only": curr_block.visible_to_staff_only,
+                        "detached": 'detached' in curr_block._class_tags,  # pylint: disable=protected-access
+                        "group_access": group_access,
+                        "split_conditions": split_conditions,
+                        "dynamic_parents": dynamic_parents,
+                        "summary_data": summary_data_fn(curr_block),
+                    })
+
+                if not curr_block.has_children:
+                    continue
+
+                children = []
+                for child in curr_block.get_children(usage_key_filter=parent_or_requested_block_type):
+                    child_split_conditions = split_conditions
+                    child_dynamic_parents = dynamic_parents
+                    if block_type == 'split_test':
+                        group_ids = [
+                            group_id for group_id, child_location in curr_block.group_id_to_child.items()
+                            if child_location == child.location
+                        ]
+                        if not group_ids:
+                            # not reachable from any group, so never shown
+                            continue
+                        child_split_conditions = split_conditions + [(curr_block.user_partition_id, group_ids)]
+                    elif curr_block.has_dynamic_children():
+                        child_dynamic_parents = dynamic_parents + [
+                            (unicode(curr_block.location), unicode(child.location))
+                        ]
+                    children.append((
+                        child,
+                        ancestors + [curr_block],
+                        merge_group_access(group_access, child.group_access),
+                        child_split_conditions,
+                        child_dynamic_parents,
+                    ))
+                stack.extend(reversed(children))
+
+        return structure
+
+
+class OutlineBlockFilter(object):
+    """
+    Decides which blocks of a course outline a user can load.
+
+    This applies the same rules as has_access(user, 'load', descriptor), but
+    looks up the user's roles and partition groups once per outline rather
+    than once per block. Blocks under split_test modules are only shown to the
+    group they are assigned to, staff included, as the split_test module does.
+    """
+    def __init__(self, course, request):
+        self.course = course
+        self.request = request
+        self.user = request.user
+        self.partitions = {partition.id: partition for partition in course.user_partitions}
+        self.user_groups = {}
+        self.split_group_ids = {}
+        self.dynamic_children = {}
+
+    @lazy
+    def is_staff(self):
+        """
+        Returns whether the user has staff access to the course.
+        """
+        return has_access(self.user, 'staff', self.course)
+
+    @lazy
+    def is_beta_tester(self):
+        """
+        Returns whether the user is a beta tester of the course.
+        """
+        return CourseBetaTesterRole(self.course.id).has_user(self.user)
+
+    @lazy
+    def start_dates_disabled(self):
+        """
+        Returns whether start dates are ignored for the user.
+        """
+        return settings.FEATURES['DISABLE_START_DATES'] and not is_masquerading_as_student(self.user, self.course.id)
+
+    @lazy
+    def only_split_partitions(self):
+        """
+        Returns whether all the course's user partitions are used by split_test
+        modules, which handle their own access.
+        """
+        user_partitions = self.course.user_partitions
+        return len(user_partitions) == len(get_split_user_partitions(user_partitions))
+
+    @lazy
+    def partition_service(self):
+        """
+        Returns the partition service assigning the user to split_test groups.
+        """
+        return LmsPartitionService(self.user, self.course.id, track_function=make_track_function(self.request))
+
+    def can_load(self, block):
+        """
+        Returns whether the user can load `block`, an entry of the outline structure.
+        """
+        for user_partition_id, group_ids in block['split_conditions']:
+            if self._get_split_group_id(user_partition_id) not in group_ids:
+                return False
+
+        for parent_id, child_id in block['dynamic_parents']:
+            if child_id not in self._get_dynamic_children(parent_id):
+                return False
+
+        if self.is_staff:
+            return True
+
+        if block['visible_to_staff_only']:
+            return False
+
+        if not self._has_group_access(block['group_access']):
+            return False
+
+        if self.start_dates_disabled:
+            return True
+
+        start = block['start']
+        if block['detached'] or start is None:
+            return True
+        if block['days_early_for_beta'] is not None and self.is_beta_tester:
+            start -= timedelta(block['days_early_for_beta'])
+        return datetime.now(UTC()) > start
+
+    def _has_group_access(self, group_access):
+        """
+        Returns whether the user's groups satisfy the merged `group_access` of a block.
+        """
+        if self.only_split_partitions:
+            return True
+
+        if False in group_access.values():
+            return False
+
+        for partition_id, group_ids in group_access.items():
+            if group_ids is None:
+                continue
+            partition = self.partitions.get(partition_id)
+            if partition is None:
+                return False
+            try:
+                groups = [partition.get_group(group_id) for group_id in group_ids]
+            except NoSuchUserPartitionGroupError:
+                return False
+            if groups and self._get_user_group(partition) not in groups:
+                return False
+
+        return True
+
+    def _get_user_group(self, partition):
+        """
+        Returns the user's group in `partition`, or None.
+        """
+        if partition.id not in self.user_groups:
+            self.user_groups[partition.id] = partition.scheme.get_group_for_user(
+                self.course.id,
+                self.user,
+                partition,
             )
-            return get_module_for_descriptor(
-                self.request.user, self.request, descriptor, field_data_cache, self.course_id
+        return self.user_groups[partition.id]
+
+    def _get_split_group_id(self, user_partition_id):
+        """
+        Returns the id of the user's group in the split_test partition
+        `user_partition_id` as a string, the way split_test modules map their
+        groups to children, or None.
+        """
+        if user_partition_id not in self.split_group_ids:
+            try:
+                group_id = self.partition_service.get_user_group_id_for_partition(user_partition_id)
+            except ValueError:
+                group_id = None
+            self.split_group_ids[user_partition_id] = str(group_id) if group_id is not None else None
+        return self.split_group_ids[user_partition_id]
+
+    def _get_dynamic_children(self, usage_id):
+        """
+        Returns the ids of the children shown to the user by the module with
+        dynamic children `usage_id`.
+        """
+        if usage_id not in self.dynamic_children:
+            course_id = self.course.id
+            descriptor = modulestore().get_item(UsageKey.from_string(usage_id))
+            field_data_cache = FieldDataCache.cache_for_descriptor_descendents(
+                course_id, self.user, descriptor, depth=0,
             )
+            module = get_module_for_descriptor(self.user, self.request, descriptor, field_data_cache, course_id)
+            self.dynamic_children[usage_id] = set(
+                unicode(child.location) for child in module.get_child_descriptors()
+            ) if module is not None else set()
+        return self.dynamic_children[usage_id]
 
-        child_to_parent = {}
-        stack = [self.start_block]
-        while stack:
-            curr_block = stack.pop()
-
-            if curr_block.hide_from_toc:
-                # For now, if the 'hide_from_toc' setting is set on the block, do not traverse down
-                # the hierarchy.  The reason being is that these blocks may not have human-readable names
-                # to display on the mobile clients.
-                # Eventually, we'll need to figure out how we want these blocks to be displayed on the
-                # mobile clients.  As they are still accessible in the browser, just not navigatable
-                # from the table-of-contents.
-                continue
 
-            if curr_block.location.block_type in self.block_types:
-                if not has_access(self.request.user, 'load', curr_block, course_key=self.course_id):
-                    continue
+def _course_version(course):
+    """
+    Returns a string that changes whenever the course or any of its content is
+    edited, or None if the modulestore doesn't keep track of edits.
+    """
+    get_subtree_edited_on = getattr(course.runtime, 'get_subtree_edited_on', None)
+    edited_on = get_subtree_edited_on(course) if get_subtree_edited_on is not None else None
+    return edited_on.isoformat() if edited_on is not None else None
+
+
+def path(ancestors):
+    """path for a block with the given ancestors, starting with the course"""
+    return [
+        {
+            # to be consistent with other edx-platform clients, return the defaulted display name
+            'name': block.display_name_with_default,
+            'category': block.category,
+            'id': unicode(block.location)
+        }
+        for block in ancestors[1:]
+    ]
 
-                summary_fn = self.block_types[curr_block.category]
-                block_path = list(path(curr_block, child_to_parent, self.start_block))
-                unit_url, section_url = find_urls(self.course_id, curr_block, child_to_parent, self.request)
-
-                yield {
-                    "path": block_path,
-                    "named_path": [b["name"] for b in block_path],
-                    "unit_url": unit_url,
-                    "section_url": section_url,
-                    "summary": summary_fn(self.course_id, curr_block, self.request, self.local_cache)
-                }
-
-            if curr_block.has_children:
-                children = get_dynamic_descriptor_children(
-                    curr_block,
-                    create_module,
-                    usage_key_filter=parent_or_requested_block_type
-                )
-                for block in reversed(children):
-                    stack.append(block)
-                    child_to_parent[block] = curr_block
-
-
-def path(block, child_to_parent, start_block):
-    """path for block"""
-    block_path = []
-    while block in child_to_parent:
-        block = child_to_parent[block]
-        if block is not start_block:
-            block_path.append({
-                # to be consistent with other edx-platform clients, return the defaulted display name
-                'name': block.display_name_with_default,
-                'category': block.category,
-                'id': unicode(block.location)
-            })
-    return reversed(block_path)
-
-
-def find_urls(course_id, block, child_to_parent, request):
+
+def courseware_position(ancestors):
     """
-    Find the section and unit urls for a block.
+    Find the courseware position of a block with the given ancestors, starting with the course.
 
     Returns:
-        unit_url, section_url:
-            unit_url (str): The url of a unit
-            section_url (str): The url of a section
+        chapter_id, section_name, position:
+            chapter_id (str): The block id of the chapter, or None
+            section_name (str): The url name of the section, or None
+            position (int): The position of the unit within the section, or None
 
     """
-    block_path = []
-    while block in child_to_parent:
-        block = child_to_parent[block]
-        block_path.append(block)
-
-    block_list = list(reversed(block_path))
-    block_count = len(block_list)
+    block_count = len(ancestors)
 
-    chapter_id = block_list[1].location.block_id if block_count > 1 else None
-    section = block_list[2] if block_count > 2 else None
+    chapter_id = ancestors[1].location.block_id if block_count > 1 else None
+    section = ancestors[2] if block_count > 2 else None
     position = None
 
     if block_count > 3:
         position = 1
         for block in section.children:
-            if block.name == block_list[3].url_name:
+            if block.name == ancestors[3].url_name:
                 break
             position += 1
 
+    return chapter_id, section.url_name if section is not None else None, position
+
+
+def find_urls(course_id, block, request):
+    """
+    Find the section and unit urls for a block of the outline structure.
+
+    Returns:
+        unit_url, section_url:
+            unit_url (str): The url of a unit
+            section_url (str): The url of a section
+
+    """
+    chapter_id, section_name, position = block['courseware_position']
+
     kwargs = {'course_id': unicode(course_id)}
     if chapter_id is None:
         no_chapter_url = reverse("courseware", kwargs=kwargs, request=request)
         return no_chapter_url, no_chapter_url
 
     kwargs['chapter'] = chapter_id
-    if section is None:
+    if section_name is None:
         no_section_url = reverse("courseware_chapter", kwargs=kwargs, request=request)
         return no_section_url, no_section_url
 
-    kwargs['section'] = section.url_name
+    kwargs['section'] = section_name
     if position is None:
         no_position_url = reverse("courseware_section", kwargs=kwargs, request=request)
         return no_position_url, no_position_url
@@ -159,38 +424,55 @@ def find_urls(course_id, block, child_to_parent, request):
     return unit_url, section_url
 
 
-def video_summary(course, course_id, video_descriptor, request, local_cache):
+def video_summary_data(video_descriptor):
+    """
+    returns the user-independent data of the summary of the given video descriptor
+    """
+    # Fall back to VideoDescriptor fields for video URLs if VAL doesn't have the video
+    if video_descriptor.html5_sources:
+        fallback_video_url = video_descriptor.html5_sources[0]
+    else:
+        fallback_video_url = video_descriptor.source
+
+    return {
+        "edx_video_id": video_descriptor.edx_video_id,
+        "fallback_video_url": fallback_video_url,
+        "name": video_descriptor.display_name,
+        "transcript_languages": list(video_descriptor.available_translations(verify_assets=False)),
+        "language": video_descriptor.get_default_transcript_language(),
+        "category": video_descriptor.category,
+        "id": unicode(video_descriptor.scope_ids.usage_id),
+        "block_id": video_descriptor.scope_ids.usage_id.block_id,
+    }
+
+
+def video_summary(course_id, video_data, request, local_cache):
     """
-    returns summary dict for the given video module
+    returns summary dict for the given video summary data
     """
     # First try to check VAL for the URLs we want.
-    val_video_info = local_cache['course_videos'].get(video_descriptor.edx_video_id, {})
+    val_video_info = local_cache['course_videos'].get(video_data['edx_video_id'], {})
     if val_video_info:
         video_url = val_video_info['url']
-    # Then fall back to VideoDescriptor fields for video URLs
-    elif video_descriptor.html5_sources:
-        video_url = video_descriptor.html5_sources[0]
     else:
-        video_url = video_descriptor.source
+        video_url = video_data['fallback_video_url']
 
     # If we have the video information from VAL, we also have duration and size.
     duration = val_video_info.get('duration', None)
     size = val_video_info.get('file_size', 0)
 
     # Transcripts...
-    transcript_langs = video_descriptor.available_translations(verify_assets=False)
-
     transcripts = {
         lang: reverse(
             'video-transcripts-detail',
             kwargs={
                 'course_id': unicode(course_id),
-                'block_id': video_descriptor.scope_ids.usage_id.block_id,
+                'block_id': video_data['block_id'],
                 'lang': lang
             },
             request=request,
         )
-        for lang in transcript_langs
+        for lang in video_data['transcript_languages']
     }
 
     return {
@@ -198,9 +480,9 @@ def video_summary(course, course_id, video_descriptor, request, local_cache):
         "video_thumbnail_url": None,
         "duration": duration,
         "size": size,
-        "name": video_descriptor.display_name,
+        "name": video_data['name'],
         "transcripts": transcripts,
-        "language": video_descriptor.get_default_transcript_language(),
-        "category": video_descriptor.category,
-        "id": unicode(video_descriptor.scope_ids.usage_id),
+        "language": video_data['language'],
+        "category": video_data['category'],
+        "id": video_data['id'],
     }
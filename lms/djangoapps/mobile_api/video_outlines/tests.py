@@ -7,6 +7,7 @@ import ddt
 import itertools
 from uuid import uuid4
 from collections import namedtuple
+from mock import patch
 
 from edxval import api
 from xmodule.modulestore.tests.factories import ItemFactory
@@ -18,6 +19,7 @@ from openedx.core.djangoapps.course_groups.tests.helpers import CohortFactory
 from openedx.core.djangoapps.course_groups.models import CourseUserGroupPartitionGroup
 
 from ..testutils import MobileAPITestCase, MobileAuthTestMixin, MobileEnrolledCourseAccessTestMixin
+from .serializers import BlockOutline
 
 
 class TestVideoAPITestCase(MobileAPITestCase):
@@ -450,6 +452,27 @@ class TestVideoSummaryList(
         self.assertEqual(course_outline[2]['summary']['video_url'], self.html5_video_url)
         self.assertEqual(course_outline[2]['summary']['size'], 0)
 
+    def test_outline_is_cached(self):
+        self.login_and_enroll()
+        self._create_video_with_subs()
+        self.api_response()
+
+        with patch.object(BlockOutline, '_build_structure') as mock_build_structure:
+            course_outline = self.api_response().data
+        self.assertFalse(mock_build_structure.called)
+        self.assertEqual(len(course_outline), 1)
+
+        # editing the course invalidates the cached outline
+        ItemFactory.create(
+            parent=self.other_unit,
+            category="video",
+            display_name=u"test video omega 2 \u03a9",
+            html5_sources=[self.html5_video_url]
+        )
+        course_outline = self.api_response().data
+        self.assertEqual(len(course_outline), 2)
+        self.assertEqual(course_outline[1]['summary']['video_url'], self.html5_video_url)
+
     def test_with_nameless_unit(self):
         self.login_and_enroll()
         ItemFactory.create(
@@ -6,8 +6,6 @@ only displayed at the course level. This is because it makes it a lot easier to
 optimize and reason about, and it avoids having to tackle the bigger problem of
 general XBlock representation in this rather specialized formatting.
 """
-from functools import partial
-
 from django.http import Http404, HttpResponse
 
 from rest_framework import generics
@@ -18,7 +16,7 @@ from xmodule.exceptions import NotFoundError
 from xmodule.modulestore.django import modulestore
 
 from ..utils import mobile_view, mobile_course_access
-from .serializers import BlockOutline, video_summary
+from .serializers import BlockOutline, video_summary, video_summary_data
 
 
 @mobile_view()
@@ -76,13 +74,12 @@ class VideoSummaryList(generics.ListAPIView):
                 * size: The size of the video file
     """
 
-    @mobile_course_access(depth=None)
+    @mobile_course_access()
     def list(self, request, course, *args, **kwargs):
         video_outline = list(
             BlockOutline(
-                course.id,
                 course,
-                {"video": partial(video_summary, course)},
+                {"video": (video_summary_data, video_summary)},
                 request,
             )
         )
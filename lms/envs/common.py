@@ -361,6 +361,14 @@ FEATURES = {
 
     # Certificates Web/HTML Views
     'CERTIFICATES_HTML_VIEW': False,
+
+    # Persist subsection grades and only recompute the subsections whose
+    # student state or content changed since they were last graded
+    'ENABLE_PERSISTENT_GRADES': False,
+
+    # Cache students' StudentModule rows (in the 'user_state' cache, or the
+    # default cache if that isn't configured) between courseware requests
+    'ENABLE_USER_STATE_CACHE': False,
 }
 
 # Ignore static asset files on import which match this pattern
@@ -995,6 +1003,11 @@ TEMPLATE_LOADERS = (
 
 )
 
+# Assets too large to keep in memcached can be cached on local disk by the
+# StaticContentServer middleware instead, e.g.
+#   {'ROOT_PATH': '/tmp/edx-asset-cache', 'MAX_SIZE': 1024 * 1024 * 1024}
+STATIC_CONTENT_DISK_CACHE = None
+
 MIDDLEWARE_CLASSES = (
     'request_cache.middleware.RequestCache',
     'microsite_configuration.middleware.MicrositeMiddleware',
@@ -1036,6 +1049,8 @@ MIDDLEWARE_CLASSES = (
     # Detects user-requested locale from 'accept-language' header in http request
     'django.middleware.locale.LocaleMiddleware',
 
+    # must come before TransactionMiddleware
+    'courseware.middleware.UserStateCacheMiddleware',
     'django.middleware.transaction.TransactionMiddleware',
     # 'debug_toolbar.middleware.DebugToolbarMiddleware',
 
@@ -1493,6 +1508,14 @@ BULK_EMAIL_LOG_SENT_EMAILS = False
 # parallel, and what the SES rate is.
 BULK_EMAIL_RETRY_DELAY_BETWEEN_SENDS = 0.02
 
+# Maximum number of individual mail messages sent per second by all bulk email
+# subtasks together, across workers.  Sends are spaced evenly over the second
+# through slots claimed in the default cache, so it must be shared by the
+# workers (e.g. memcached).  Set this a little
+# below the SES send rate.  When None, sends are only slowed down (by
+# BULK_EMAIL_RETRY_DELAY_BETWEEN_SENDS) after a task has been throttled.
+BULK_EMAIL_MAX_SENDS_PER_SECOND = None
+
 ############################# Email Opt In ####################################
 
 # Minimum age for organization-wide email opt in
@@ -1659,6 +1682,7 @@ INSTALLED_APPS = (
     'lms.djangoapps.lms_xblock',
 
     'openedx.core.djangoapps.content.course_structures',
+    'openedx.core.djangoapps.content.course_overviews',
     'course_structure_api',
 
     # CORS and cross-domain CSRF
@@ -1833,6 +1857,17 @@ GRADES_DOWNLOAD = {
     'ROOT_PATH': '/tmp/edx-s3/grades',
 }
 
+# Grade reports for courses with more enrolled students than this are split
+# into subtasks grading this many students each. None grades every student
+# in a single task.
+GRADES_DOWNLOAD_STUDENTS_PER_TASK = None
+
+###################### Problem Rescoring ######################
+# Rescoring a problem for more student submissions than this is split into
+# subtasks rescoring this many submissions each. None rescores every
+# submission in a single task.
+RESCORE_MODULES_PER_TASK = None
+
 
 #### PASSWORD POLICY SETTINGS #####
 PASSWORD_MIN_LENGTH = 8
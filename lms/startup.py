@@ -12,7 +12,7 @@ settings.INSTALLED_APPS  # pylint: disable=pointless-statement
 from openedx.core.lib.django_startup import autostartup
 import edxmako
 import logging
-from monkey_patch import django_utils_translation
+from monkey_patch import django_db_transaction, django_utils_translation
 import analytics
 from util import keyword_substitution
 
@@ -25,6 +25,7 @@ def run():
     Executed during django startup
     """
     django_utils_translation.patch()
+    django_db_transaction.patch()
 
     autostartup()
 
@@ -0,0 +1,262 @@
+"""
+Declaration of CourseOverview model
+"""
+import json
+import logging
+from datetime import datetime
+
+from django.db import IntegrityError, models
+from django.utils.timezone import UTC
+from django.utils.translation import ugettext
+from model_utils.models import TimeStampedModel
+
+from util.date_utils import strftime_localized
+from xmodule.course_module import CourseFields
+from xmodule.error_module import ErrorDescriptor
+from xmodule.fields import Date
+from xmodule.modulestore.django import modulestore
+from xmodule_django.models import CourseKeyField, UsageKeyField
+
+
+log = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+
+class CourseOverview(TimeStampedModel):
+    """
+    A denormalized, read-only summary of a course.
+
+    Pages that list many courses (the student dashboard, the mobile enrollment
+    list) only need a handful of course-level fields. Loading a full course
+    descriptor for each of them is expensive, so the fields are copied here the
+    first time they are needed and thrown away whenever the course is
+    published.
+
+    Bump VERSION whenever the set of cached fields or the way they are computed
+    changes; rows written by an older version are rebuilt on read.
+    """
+    VERSION = 1
+
+    version = models.IntegerField()
+
+    id = CourseKeyField(max_length=255, primary_key=True, verbose_name='Course ID')
+    location = UsageKeyField(max_length=255)
+
+    # Display information
+    display_name = models.TextField(null=True)
+    display_number_with_default = models.TextField()
+    display_org_with_default = models.TextField()
+    course_image_url = models.TextField()
+    facebook_url = models.TextField(null=True)
+
+    # Schedule
+    start = models.DateTimeField(null=True)
+    end = models.DateTimeField(null=True)
+    advertised_start = models.TextField(null=True)
+    days_early_for_beta = models.FloatField(null=True)
+
+    # Certificates
+    certificates_display_behavior = models.TextField(null=True)
+    certificates_show_before_end = models.BooleanField(default=False)
+    cert_name_short = models.TextField()
+    cert_name_long = models.TextField()
+    lowest_passing_grade = models.FloatField(null=True)
+    end_of_course_survey_url = models.TextField(null=True)
+
+    # Access
+    mobile_available = models.BooleanField(default=False)
+    visible_to_staff_only = models.BooleanField(default=False)
+    pre_requisite_courses_json = models.TextField(default='[]')
+
+    @classmethod
+    def _create_from_course(cls, course):
+        """
+        Build an (unsaved) CourseOverview from a course descriptor.
+        """
+        # Import here to avoid a circular import; course_image_url lives in the LMS.
+        from courseware.courses import course_image_url
+
+        try:
+            lowest_passing_grade = course.lowest_passing_grade
+        except (KeyError, ValueError):
+            lowest_passing_grade = None
+
+        return cls(
+            version=cls.VERSION,
+            id=course.id,
+            location=course.location,
+            display_name=course.display_name,
+            display_number_with_default=course.display_number_with_default,
+            display_org_with_default=course.display_org_with_default,
+            course_image_url=course_image_url(course),
+            facebook_url=course.facebook_url,
+            start=course.start,
+            end=course.end,
+            advertised_start=course.advertised_start,
+            days_early_for_beta=course.days_early_for_beta,
+            certificates_display_behavior=course.certificates_display_behavior,
+            certificates_show_before_end=course.certificates_show_before_end,
+            cert_name_short=course.cert_name_short,
+            cert_name_long=course.cert_name_long,
+            lowest_passing_grade=lowest_passing_grade,
+            end_of_course_survey_url=course.end_of_course_survey_url,
+            mobile_available=course.mobile_available,
+            visible_to_staff_only=course.visible_to_staff_only,
+            pre_requisite_courses_json=json.dumps(course.pre_requisite_courses),
+        )
+
+    @classmethod
+    def _load_from_module_store(cls, course_id):
+        """
+        Build and save the overview of a course, or return None if the course
+        does not exist or fails to load.
+        """
+        store = modulestore()
+        with store.bulk_operations(course_id):
+            course = store.get_course(course_id)
+            if course is None or isinstance(course, ErrorDescriptor):
+                return None
+            overview = cls._create_from_course(course)
+
+        try:
+            overview.save()
+        except IntegrityError:
+            # Another request cached it first; the copy we built is just as good.
+            log.info(u"Could not save the course overview for %s", course_id)
+        return overview
+
+    @classmethod
+    def get_from_ids(cls, course_ids):
+        """
+        Return a dict mapping each of `course_ids` to its CourseOverview.
+
+        Cached overviews are fetched with a single query; missing or outdated
+        ones are built from the modulestore. Courses that do not exist or fail
+        to load map to None.
+        """
+        course_ids = list(course_ids)
+        overviews = {
+            overview.id: overview
+            for overview in cls.objects.filter(id__in=course_ids, version=cls.VERSION)
+        }
+        for course_id in course_ids:
+            if course_id not in overviews:
+                overviews[course_id] = cls._load_from_module_store(course_id)
+        return overviews
+
+    @classmethod
+    def get_from_id(cls, course_id):
+        """
+        Return the CourseOverview of a course, or None if the course does not
+        exist or fails to load.
+        """
+        return cls.get_from_ids([course_id])[course_id]
+
+    @property
+    def number(self):
+        """
+        Return the course number, as in the course's location.
+        """
+        return self.location.course
+
+    @property
+    def org(self):
+        """
+        Return the organization of the course, as in the course's location.
+        """
+        return self.location.org
+
+    @property
+    def display_name_with_default(self):
+        """
+        Return the display name of the course, falling back to its url name.
+        """
+        name = self.display_name
+        if name is None:
+            name = self.location.name.replace('_', ' ')
+        return name.replace('<', '&lt;').replace('>', '&gt;')
+
+    @property
+    def pre_requisite_courses(self):
+        """
+        Return the list of ids of the courses that must be passed before this one.
+        """
+        return json.loads(self.pre_requisite_courses_json)
+
+    def has_started(self):
+        """
+        Return whether the course has started. Courses without a start date have not.
+        """
+        if self.start is None:
+            return False
+        return datetime.now(UTC()) > self.start
+
+    def has_ended(self):
+        """
+        Returns True if the current time is after the course end date.
+        Returns False if there is no end date specified.
+        """
+        if self.end is None:
+            return False
+
+        return datetime.now(UTC()) > self.end
+
+    def may_certify(self):
+        """
+        Return True if it is acceptable to show the student a certificate download link
+        """
+        show_early = (
+            self.certificates_display_behavior in ('early_with_info', 'early_no_info') or
+            self.certificates_show_before_end
+        )
+        return show_early or self.has_ended()
+
+    @property
+    def start_date_is_still_default(self):
+        """
+        Checks if the start date set for the course is still default, i.e. .start has not been modified,
+        and .advertised_start has not been set.
+        """
+        return self.advertised_start is None and self.start == CourseFields.start.default
+
+    def start_datetime_text(self, format_string="SHORT_DATE"):
+        """
+        Returns the desired text corresponding the course's start date and time in UTC.  Prefers .advertised_start,
+        then falls back to .start
+
+        Mirrors CourseDescriptor.start_datetime_text.
+        """
+        if self.advertised_start is not None:
+            try:
+                when = Date().from_json(self.advertised_start)
+            except ValueError:
+                when = None
+            if when is None:
+                return self.advertised_start.title()
+        elif self.start_date_is_still_default:
+            # Translators: TBD stands for 'To Be Determined' and is used when a course
+            # does not yet have an announced start date.
+            return ugettext('TBD')
+        else:
+            when = self.start
+
+        text = strftime_localized(when, format_string)
+        return text + u" UTC" if format_string == "DATE_TIME" else text
+
+    def end_datetime_text(self, format_string="SHORT_DATE"):
+        """
+        Returns the end date or date_time for the course formatted as a string.
+
+        If the course does not have an end date set (course.end is None), an empty string will be returned.
+        """
+        if self.end is None:
+            return ''
+        text = strftime_localized(self.end, format_string)
+        return text if format_string == "SHORT_DATE" else text + u" UTC"
+
+    def __unicode__(self):
+        return unicode(self.id)
+
+
+# Signals must be imported in a file that is automatically loaded at app startup (e.g. models.py). We import them
+# at the end of this file to avoid circular dependencies.
+import signals  # pylint: disable=unused-import
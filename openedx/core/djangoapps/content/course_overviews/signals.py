@@ -0,0 +1,18 @@
+"""
+Signal handlers that keep CourseOverviews in sync with the modulestore.
+"""
+from django.dispatch.dispatcher import receiver
+
+from xmodule.modulestore.django import SignalHandler
+
+
+@receiver(SignalHandler.course_published)
+def listen_for_course_publish(sender, course_key, **kwargs):  # pylint: disable=unused-argument
+    """
+    Drop the CourseOverview of a course when it is published, so that it is
+    rebuilt from the new version of the course the next time it is read.
+    """
+    # Import the model here to avoid a circular import.
+    from .models import CourseOverview
+
+    CourseOverview.objects.filter(id=course_key).delete()
@@ -0,0 +1,74 @@
+"""
+Tests for course_overviews app.
+"""
+import datetime
+
+from mock import patch
+import pytz
+
+from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory
+
+from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
+
+
+class CourseOverviewTests(ModuleStoreTestCase):
+    """
+    Tests for CourseOverview model.
+    """
+    def setUp(self):
+        super(CourseOverviewTests, self).setUp()
+        self.course = CourseFactory.create(
+            display_name='Overview <Test>',
+            start=datetime.datetime(2014, 1, 1, tzinfo=pytz.utc),
+            end=datetime.datetime(2015, 1, 1, tzinfo=pytz.utc),
+            certificates_display_behavior='early_no_info',
+            pre_requisite_courses=['org/number/run'],
+        )
+
+    def test_fields_match_course(self):
+        overview = CourseOverview.get_from_id(self.course.id)
+        for attr in ('id', 'location', 'number', 'org', 'display_name', 'display_name_with_default',
+                     'display_number_with_default', 'display_org_with_default', 'start', 'end',
+                     'cert_name_short', 'cert_name_long', 'lowest_passing_grade', 'mobile_available',
+                     'pre_requisite_courses', 'start_date_is_still_default'):
+            self.assertEqual(getattr(overview, attr), getattr(self.course, attr), attr)
+        for method in ('has_started', 'has_ended', 'may_certify'):
+            self.assertEqual(getattr(overview, method)(), getattr(self.course, method)(), method)
+        for format_string in ('SHORT_DATE', 'DATE_TIME'):
+            for method in ('start_datetime_text', 'end_datetime_text'):
+                self.assertEqual(
+                    getattr(overview, method)(format_string),
+                    getattr(self.course, method)(format_string),
+                    method
+                )
+
+    def test_overview_is_cached(self):
+        CourseOverview.get_from_id(self.course.id)
+        with patch.object(modulestore(), 'get_course') as mock_get_course:
+            overviews = CourseOverview.get_from_ids([self.course.id])
+        self.assertFalse(mock_get_course.called)
+        self.assertEqual(overviews[self.course.id].display_name, self.course.display_name)
+
+    def test_publish_refreshes_overview(self):
+        self.assertEqual(CourseOverview.get_from_id(self.course.id).display_name, 'Overview <Test>')
+        self.course.display_name = 'Renamed'
+        self.store.update_item(self.course, self.user.id)
+        self.assertEqual(CourseOverview.get_from_id(self.course.id).display_name, 'Renamed')
+
+    def test_outdated_version_is_rebuilt(self):
+        CourseOverview.get_from_id(self.course.id)
+        CourseOverview.objects.filter(id=self.course.id).update(version=CourseOverview.VERSION - 1, display_name='Old')
+        self.assertEqual(CourseOverview.get_from_id(self.course.id).display_name, self.course.display_name)
+        self.assertEqual(CourseOverview.objects.get(id=self.course.id).version, CourseOverview.VERSION)
+
+    def test_missing_course(self):
+        course_key = self.store.make_course_key('nonexistent', 'course', 'run')
+        self.assertEqual(CourseOverview.get_from_ids([course_key, self.course.id])[course_key], None)
+        self.assertFalse(CourseOverview.objects.filter(id=course_key).exists())
+
+    def test_no_start_date_has_not_started(self):
+        overview = CourseOverview.get_from_id(self.course.id)
+        overview.start = None
+        self.assertFalse(overview.has_started())